@@ -0,0 +1,141 @@
+"""Concurrency load test for /chat against the fake OpenAI server.
+
+Boots the API in a subprocess with ``OPENAI_BASE_URL`` pointed at the stub
+and a throwaway ``DATA_DIR`` seeded with the markdown knowledge base, then
+fires concurrent chat requests. With a non-blocking /chat the wall time
+stays close to a single LLM round trip instead of ``concurrency * latency``,
+and /health keeps answering while completions are in flight. With
+``--stream`` the requests go to /chat/stream and time-to-first-token is
+reported alongside the full response time.
+
+    python -m benchmarks.chat_load --concurrency 10 --chat-latency 1.0
+    python -m benchmarks.chat_load --stream
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmarks.fake_openai import FakeOpenAIServer
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+QUESTIONS = [
+    "How much can I afford?",
+    "What documents do I need for a mortgage?",
+    "What is the difference between fixed and variable rates?",
+    "How does the First Home Savings Account work?",
+    "What is the mortgage stress test?",
+]
+
+
+def seed_data_dir(data_dir: Path, corpus: Path) -> None:
+    raw_docs = data_dir / "raw_docs"
+    raw_docs.mkdir(parents=True)
+    for md_file in corpus.glob("*.md"):
+        shutil.copy(md_file, raw_docs / md_file.name)
+
+
+def start_backend(port: int, openai_base_url: str, data_dir: Path, extra_env=None) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        OPENAI_API_KEY="sk-fake",
+        OPENAI_BASE_URL=openai_base_url,
+        DATA_DIR=str(data_dir),
+        **(extra_env or {})
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env
+    )
+
+
+def wait_until_healthy(base_url: str, process: subprocess.Popen, timeout: float = 120.0) -> float:
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f"Backend exited with code {process.returncode} during startup")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1.0).status_code == 200:
+                return time.perf_counter() - start
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise TimeoutError(f"Backend at {base_url} did not become healthy within {timeout}s")
+
+
+async def run_load(base_url: str, concurrency: int, stream: bool = False):
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0) as client:
+        async def one(i: int):
+            start = time.perf_counter()
+            payload = {"message": QUESTIONS[i % len(QUESTIONS)]}
+            if not stream:
+                response = await client.post("/chat", json=payload)
+                response.raise_for_status()
+                elapsed = time.perf_counter() - start
+                return elapsed, elapsed
+            first_token = None
+            async with client.stream("POST", "/chat/stream", json=payload) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if first_token is None and line == "event: token":
+                        first_token = time.perf_counter() - start
+            return first_token, time.perf_counter() - start
+
+        async def health_probe() -> float:
+            await asyncio.sleep(0.05)
+            start = time.perf_counter()
+            (await client.get("/health")).raise_for_status()
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        *timings, health_latency = await asyncio.gather(
+            *(one(i) for i in range(concurrency)), health_probe()
+        )
+        return time.perf_counter() - start, timings, health_latency
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--chat-latency", type=float, default=1.0)
+    parser.add_argument("--fake-port", type=int, default=9100)
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--stream", action="store_true", help="Use /chat/stream and report time-to-first-token")
+    parser.add_argument("--corpus", type=Path, default=BACKEND_DIR / "data" / "raw_docs")
+    args = parser.parse_args()
+
+    with FakeOpenAIServer(port=args.fake_port, chat_latency=args.chat_latency) as fake, \
+            tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        seed_data_dir(data_dir, args.corpus)
+        base_url = f"http://127.0.0.1:{args.port}"
+        backend = start_backend(args.port, fake.base_url, data_dir)
+        try:
+            wait_until_healthy(base_url, backend)
+            wall, timings, health_latency = asyncio.run(run_load(base_url, args.concurrency, args.stream))
+        finally:
+            backend.terminate()
+            backend.wait()
+
+    serial = args.concurrency * args.chat_latency
+    print(f"requests:        {args.concurrency}")
+    print(f"llm latency:     {args.chat_latency:.2f}s")
+    print(f"wall time:       {wall:.2f}s (serial would be >= {serial:.2f}s)")
+    print(f"max latency:     {max(total for _, total in timings):.2f}s")
+    if args.stream:
+        print(f"max first token: {max(ttft for ttft, _ in timings) * 1000:.1f}ms")
+    print(f"/health latency: {health_latency * 1000:.1f}ms during load")
+    overlapped = wall < serial / 2
+    print("result:          " + ("requests overlapped" if overlapped else "requests ran serially"))
+    sys.exit(0 if overlapped else 1)
+
+
+if __name__ == "__main__":
+    main()
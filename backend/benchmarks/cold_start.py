@@ -0,0 +1,116 @@
+"""Cold-start benchmark: import time and time-to-probe for a read-only worker.
+
+Measures, each in a fresh interpreter, how long ``import config``,
+``import main`` and ``import rag`` take. Then it builds an index for the
+markdown knowledge base with ``build_index.py`` against the fake OpenAI
+server and starts the API with ``INDEX_READ_ONLY=true``, the same way the
+deploy start command does. It reports when /health/live and /health/ready
+first answer 200.
+
+With ``--max-live-seconds`` / ``--max-ready-seconds`` it exits non-zero when
+a budget is exceeded, so CI can track cold-start regressions:
+
+    python -m benchmarks.cold_start
+    python -m benchmarks.cold_start --runs 5 --max-live-seconds 2 --output cold_start.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmarks.chat_load import BACKEND_DIR, seed_data_dir, start_backend
+from benchmarks.fake_openai import FakeOpenAIServer
+
+IMPORT_TARGETS = ["config", "main", "rag"]
+
+
+def time_import(module: str, env: dict) -> float:
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def wait_for(url: str, process: subprocess.Popen, start: float, timeout: float = 120.0) -> float:
+    while time.perf_counter() - start < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f"Backend exited with code {process.returncode} during startup")
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return time.perf_counter() - start
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.02)
+    raise TimeoutError(f"{url} did not answer 200 within {timeout}s")
+
+
+def measure_cold_start(env: dict, openai_base_url: str, data_dir: Path, port: int, runs: int) -> dict:
+    """Median import times and time-to-live/ready over ``runs`` starts, with the index in ``data_dir`` built."""
+    imports = {
+        module: statistics.median(time_import(module, env) for _ in range(runs))
+        for module in IMPORT_TARGETS
+    }
+    base_url = f"http://127.0.0.1:{port}"
+    live, ready = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        backend = start_backend(port, openai_base_url, data_dir, {"INDEX_READ_ONLY": "true"})
+        try:
+            live.append(wait_for(f"{base_url}/health/live", backend, start))
+            ready.append(wait_for(f"{base_url}/health/ready", backend, start))
+        finally:
+            backend.terminate()
+            backend.wait()
+    return {
+        "imports": {module: round(seconds, 3) for module, seconds in imports.items()},
+        "live_seconds": round(statistics.median(live), 3),
+        "ready_seconds": round(statistics.median(ready), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3, help="Repetitions per measurement (median is reported)")
+    parser.add_argument("--fake-port", type=int, default=9100)
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--corpus", type=Path, default=BACKEND_DIR / "data" / "raw_docs")
+    parser.add_argument("--max-live-seconds", type=float, help="Fail if /health/live takes longer than this")
+    parser.add_argument("--max-ready-seconds", type=float, help="Fail if /health/ready takes longer than this")
+    parser.add_argument("--output", type=Path, help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    with FakeOpenAIServer(port=args.fake_port, embed_latency=0.0) as fake, \
+            tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        seed_data_dir(data_dir, args.corpus)
+        env = dict(os.environ, OPENAI_API_KEY="sk-fake", OPENAI_BASE_URL=fake.base_url, DATA_DIR=str(data_dir))
+        subprocess.run([sys.executable, "build_index.py"], cwd=BACKEND_DIR, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        results = measure_cold_start(env, fake.base_url, data_dir, args.port, args.runs)
+
+    for module, seconds in results["imports"].items():
+        print(f"import {module:<8} {seconds * 1000:8.1f}ms")
+    print(f"/health/live  {results['live_seconds'] * 1000:8.1f}ms after process start")
+    print(f"/health/ready {results['ready_seconds'] * 1000:8.1f}ms after process start")
+    if args.output:
+        args.output.write_text(json.dumps({"benchmark": "cold_start", "runs": args.runs, **results}, indent=2))
+
+    failed = []
+    if args.max_live_seconds is not None and results["live_seconds"] > args.max_live_seconds:
+        failed.append(f"/health/live took {results['live_seconds']}s (budget {args.max_live_seconds}s)")
+    if args.max_ready_seconds is not None and results["ready_seconds"] > args.max_ready_seconds:
+        failed.append(f"/health/ready took {results['ready_seconds']}s (budget {args.max_ready_seconds}s)")
+    if failed:
+        raise SystemExit("; ".join(failed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Crawl frontier micro-benchmark: queueing cost on link-heavy sites.
+
+Simulates a crawl of a site where every page links to ``--links`` other
+pages, most of them already seen (navigation, search and feed listings).
+Compares ``scraper.CrawlFrontier`` with the original list frontier
+(``to_visit.pop(0)`` plus ``url not in to_visit``), whose cost grows with
+the queue length. No network or disk is involved.
+
+    python -m benchmarks.crawl_frontier --pages 250 500 1000 2000 --links 100
+"""
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+
+SITE = "https://www.example.com/"
+
+
+def page_links(pages: int, links: int, rng: random.Random):
+    return [f"{SITE}section{n % 50}/page{n}.html" for n in (rng.randrange(pages * 4) for _ in range(links))]
+
+
+def list_frontier(pages: int, links: int, seed: int) -> int:
+    rng = random.Random(seed)
+    to_visit = [SITE]
+    visited = set()
+    crawled = 0
+    while to_visit and crawled < pages:
+        url = to_visit.pop(0)
+        if url in visited:
+            continue
+        visited.add(url)
+        crawled += 1
+        for full_url in page_links(pages, links, rng):
+            if full_url not in visited and full_url not in to_visit:
+                to_visit.append(full_url)
+    return crawled
+
+
+def crawl_frontier(pages: int, links: int, seed: int) -> int:
+    from scraper import CrawlFrontier
+
+    rng = random.Random(seed)
+    frontier = CrawlFrontier(SITE, priority_keywords=["mortgage", "rate"])
+    frontier.start()
+    crawled = 0
+    while not frontier.queue.empty() and crawled < pages:
+        _, depth, _, _ = frontier.queue.get_nowait()
+        crawled += 1
+        frontier.push(page_links(pages, links, rng), depth + 1)
+    return crawled
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[250, 500, 1000, 2000])
+    parser.add_argument("--links", type=int, default=100, help="Links per page")
+    parser.add_argument("--skip-list", action="store_true", help="Only time CrawlFrontier")
+    parser.add_argument("--output", type=Path, help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    # Imported up front so the first timing does not include it
+    import scraper  # noqa: F401
+
+    results = []
+    for pages in args.pages:
+        row = {"pages": pages, "links": args.links}
+        implementations = [("frontier", crawl_frontier)] + ([] if args.skip_list else [("list", list_frontier)])
+        for name, run in implementations:
+            start = time.perf_counter()
+            crawled = run(pages, args.links, seed=pages)
+            row[f"{name}_seconds"] = round(time.perf_counter() - start, 4)
+            row[f"{name}_pages"] = crawled
+        results.append(row)
+        line = f"pages={pages:<6} frontier {row['frontier_seconds'] * 1000:9.1f}ms"
+        if "list_seconds" in row:
+            line += f"  list {row['list_seconds'] * 1000:9.1f}ms  x{row['list_seconds'] / row['frontier_seconds']:.1f}"
+        print(line)
+
+    if args.output:
+        args.output.write_text(json.dumps({"benchmark": "crawl_frontier", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
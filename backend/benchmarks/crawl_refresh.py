@@ -0,0 +1,98 @@
+"""Re-crawl benchmark: what a refresh of mostly unchanged sites costs.
+
+Crawls two local fixture sites into one output directory with a persistent
+``scraper.CrawlCache``, then crawls them again several times:
+
+* ``cold``: empty cache, every page is downloaded and written.
+* ``refresh``: nothing changed; the site with validators should answer only
+  304s, the one without should return 200s whose content hash matches.
+* ``edited``: ``--edits`` pages per site changed; only those files are rewritten.
+
+After each run it compares file mtimes with the previous run. The refresh
+run must not touch any output file, because a new mtime changes the index
+source hash and triggers re-embedding. It exits non-zero if that happens.
+
+    python -m benchmarks.crawl_refresh --pages 30 --edits 2
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.fixture_site import FixtureSite
+
+
+def file_state(directory: Path) -> dict:
+    return {path.name: path.stat().st_mtime_ns for path in directory.glob("*.txt")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=30, help="Pages per fixture site")
+    parser.add_argument("--edits", type=int, default=2, help="Pages changed per site before the last run")
+    parser.add_argument("--latency", type=float, default=0.02, help="Fixture response latency")
+    parser.add_argument("--delay", type=float, default=0.0, help="Politeness delay per host")
+    parser.add_argument("--output", type=Path, help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    from scraper import AsyncCrawler, CrawlCache, WebScraper
+
+    extract = WebScraper()._extract
+    results = []
+    with FixtureSite(pages=args.pages, latency=args.latency) as conditional, \
+            FixtureSite(pages=args.pages, latency=args.latency, validators=False) as plain, \
+            tempfile.TemporaryDirectory() as tmp:
+        sites = {"validators": conditional, "no_validators": plain}
+        output_dir = Path(tmp) / "web"
+        output_dir.mkdir()
+        cache = CrawlCache(Path(tmp) / "crawl_cache.sqlite3")
+        before = {}
+        try:
+            for run in ("cold", "refresh", "edited"):
+                if run == "edited":
+                    for site in sites.values():
+                        for page in range(1, args.edits + 1):
+                            site.edit(page)
+                for site in sites.values():
+                    site.statuses.clear()
+                crawler = AsyncCrawler(extract, per_host_concurrency=2, host_delay=args.delay, cache=cache)
+                base_urls = [site.base_url for site in sites.values()]
+                start = time.perf_counter()
+                # A limit above the site size crawls every page, so runs see the same set of URLs
+                counts = asyncio.run(crawler.crawl(base_urls, output_dir, args.pages * 2))
+                elapsed = time.perf_counter() - start
+                after = file_state(output_dir)
+                touched = sorted(name for name, mtime in after.items() if before.get(name) != mtime)
+                before = after
+                result = {
+                    "run": run,
+                    "seconds": round(elapsed, 3),
+                    "pages": sum(counts.values()),
+                    "written": crawler.stats["written"],
+                    "unchanged": crawler.stats["unchanged"],
+                    "not_modified": crawler.stats["not_modified"],
+                    "files_touched": len(touched),
+                    "responses": {name: dict(site.statuses) for name, site in sites.items()},
+                }
+                results.append(result)
+                print(f"{run:<8} {result['pages']:4d} pages in {elapsed:6.2f}s  "
+                      f"written={result['written']:<4} unchanged={result['unchanged']:<4} "
+                      f"304={result['not_modified']:<4} files touched={len(touched)}")
+        finally:
+            cache.close()
+
+    refresh, edited = results[1], results[2]
+    if args.output:
+        args.output.write_text(json.dumps({
+            "benchmark": "crawl_refresh", "pages_per_site": args.pages, "edits": args.edits, "results": results
+        }, indent=2))
+    if refresh["files_touched"] or refresh["written"]:
+        raise SystemExit("A refresh with no content changes rewrote output files")
+    if edited["written"] != args.edits * len(sites) or edited["files_touched"] != edited["written"]:
+        raise SystemExit(f"Expected {args.edits * len(sites)} rewritten files after edits, got {edited['written']}")
+
+
+if __name__ == "__main__":
+    main()
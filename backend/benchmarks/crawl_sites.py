@@ -0,0 +1,77 @@
+"""Crawler throughput benchmark over local fixture sites, one host per site.
+
+Starts ``hosts`` fixture servers and crawls all of them at once with
+``scraper.AsyncCrawler``, for each host count. Politeness is per host, so
+pages/s should grow roughly linearly with the number of hosts. Every run
+also checks, from the servers' own logs, that no host saw more concurrent
+requests than the per-host limit. It also checks that request starts to a
+host were at least the politeness delay apart.
+
+    python -m benchmarks.crawl_sites --hosts 1 2 4 8 --pages 20 --delay 0.2
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from contextlib import ExitStack
+from pathlib import Path
+
+from benchmarks.fixture_site import FixtureSite
+
+# Start gaps are measured on the server, so a new connection's setup time can shorten one gap
+GAP_TOLERANCE = 0.8
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--pages", type=int, default=20, help="Pages crawled per host")
+    parser.add_argument("--latency", type=float, default=0.1, help="Fixture response latency")
+    parser.add_argument("--delay", type=float, default=0.2, help="Politeness delay per host")
+    parser.add_argument("--per-host-concurrency", type=int, default=2)
+    parser.add_argument("--output", type=Path, help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    from scraper import AsyncCrawler, WebScraper
+
+    extract = WebScraper()._extract
+    results = []
+    baseline = None
+    for hosts in sorted(set(args.hosts)):
+        with ExitStack() as stack, tempfile.TemporaryDirectory() as tmp:
+            sites = [stack.enter_context(FixtureSite(pages=args.pages * 2, latency=args.latency)) for _ in range(hosts)]
+            crawler = AsyncCrawler(extract, per_host_concurrency=args.per_host_concurrency, host_delay=args.delay)
+            start = time.perf_counter()
+            counts = asyncio.run(crawler.crawl([site.base_url for site in sites], Path(tmp), args.pages))
+            elapsed = time.perf_counter() - start
+            pages = sum(counts.values())
+        polite = all(
+            site.max_in_flight <= args.per_host_concurrency and site.min_start_gap() >= args.delay * GAP_TOLERANCE
+            for site in sites
+        )
+        rate = pages / elapsed
+        baseline = baseline or rate
+        results.append({
+            "hosts": hosts,
+            "pages": pages,
+            "seconds": round(elapsed, 3),
+            "pages_per_second": round(rate, 2),
+            "scaling": round(rate / baseline, 2),
+            "max_in_flight_per_host": max(site.max_in_flight for site in sites),
+            "polite": polite,
+        })
+        print(f"hosts={hosts:<3} {pages:4d} pages in {elapsed:6.2f}s  {rate:7.2f} pages/s  "
+              f"scaling x{rate / baseline:.2f}  ({'polite' if polite else 'POLITENESS VIOLATED'})")
+        if not polite:
+            raise SystemExit("A host received requests faster or more concurrently than allowed")
+
+    if args.output:
+        args.output.write_text(json.dumps({
+            "benchmark": "crawl_sites", "pages_per_host": args.pages, "latency": args.latency,
+            "delay": args.delay, "per_host_concurrency": args.per_host_concurrency, "results": results
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
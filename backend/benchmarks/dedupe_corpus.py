@@ -0,0 +1,88 @@
+"""Near-duplicate report for a document corpus, without calling any API.
+
+Loads and splits ``raw_docs`` the way an index build does, runs
+``dedupe.Deduplicator`` over the chunks, and reports how many documents and
+chunks it would drop, the embedding tokens that saves and the fingerprinting
+time. Files are visited in build order (``web/`` first), so the first copy of
+a near-duplicate is the one that is kept. The largest duplicate groups are
+listed so the distance thresholds can be sanity-checked:
+
+    python -m benchmarks.dedupe_corpus
+    python -m benchmarks.dedupe_corpus --corpus data/raw_docs --chunk-distance 6
+"""
+import argparse
+import json
+import time
+from collections import Counter
+from pathlib import Path
+
+import config
+from benchmarks.chat_load import BACKEND_DIR
+from dedupe import Deduplicator
+from loaders import iter_loaded_files
+from rag import MortgageRAG
+
+
+def estimate_tokens(text: str) -> int:
+    # Same estimate as the embedding batcher
+    return len(text) // 4 + 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", type=Path, default=BACKEND_DIR / "data" / "raw_docs")
+    parser.add_argument("--document-distance", type=int, default=config.DEDUPE_DOCUMENT_DISTANCE)
+    parser.add_argument("--chunk-distance", type=int, default=config.DEDUPE_CHUNK_DISTANCE)
+    parser.add_argument("--top", type=int, default=10, help="Duplicate groups to list")
+    parser.add_argument("--output", type=Path, help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=config.CHUNK_SIZE, chunk_overlap=config.CHUNK_OVERLAP, separators=["\n\n", "\n", " ", ""]
+    )
+    deduplicator = Deduplicator(args.document_distance, args.chunk_distance)
+    files = MortgageRAG._gather_source_files(args.corpus)
+    totals = Counter()
+    groups = Counter()
+    dedupe_seconds = 0.0
+    for path, docs, error in iter_loaded_files(files, workers=1):
+        if error is not None:
+            print(f"skipped {path.name}: {error}")
+            continue
+        texts = [chunk.page_content for chunk in splitter.split_documents(docs)]
+        start = time.perf_counter()
+        kept, entry = deduplicator.filter(path.relative_to(args.corpus).as_posix(), texts)
+        dedupe_seconds += time.perf_counter() - start
+        kept_texts = [texts[i] for i in kept]
+        totals["files"] += 1
+        totals["chunks"] += len(texts)
+        totals["kept_chunks"] += len(kept)
+        totals["duplicate_documents"] += entry["duplicate_document"]
+        totals["tokens"] += sum(map(estimate_tokens, texts))
+        totals["kept_tokens"] += sum(map(estimate_tokens, kept_texts))
+        for original in entry["duplicate_of"]:
+            groups[original] += 1
+
+    dropped = totals["chunks"] - totals["kept_chunks"]
+    results = {
+        **totals,
+        "dropped_chunks": dropped,
+        "dropped_fraction": round(dropped / max(1, totals["chunks"]), 3),
+        "tokens_saved": totals["tokens"] - totals["kept_tokens"],
+        "dedupe_ms_per_chunk": round(dedupe_seconds * 1000 / max(1, totals["chunks"]), 3),
+        "largest_groups": [{"original": key, "duplicates": count} for key, count in groups.most_common(args.top)],
+    }
+    print(f"{totals['files']} files, {totals['chunks']} chunks, ~{totals['tokens']} embedding tokens")
+    print(f"dropped {dropped} chunks ({results['dropped_fraction']:.0%}); ~{results['tokens_saved']} tokens saved; "
+          f"{totals['duplicate_documents']} documents are near-duplicates of another")
+    print(f"fingerprinting: {results['dedupe_ms_per_chunk']:.3f} ms per chunk")
+    for group in results["largest_groups"]:
+        print(f"  {group['duplicates']:3d} files repeat content from {group['original']}")
+    if args.output:
+        args.output.write_text(json.dumps({"benchmark": "dedupe_corpus", **results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Embedding throughput benchmark for index builds against the fake OpenAI server.
+
+Embeds a synthetic corpus of chunk-sized texts through ``rag.EmbeddingBatcher``
+at increasing concurrency, with the stub enforcing a tokens-per-minute limit
+so 429 handling is exercised. Every run checks that each returned vector is
+the stub's vector for the text at that position, i.e. that results come back
+in input order.
+
+    python -m benchmarks.embed_batches --chunks 2000 --concurrency 1 2 4 8
+    python -m benchmarks.embed_batches --embed-tpm 300000 --tpm 300000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.fake_openai import FakeOpenAIServer, fake_embedding
+
+SENTENCES = [
+    "The stress test requires qualifying at the greater of the contract rate plus two percent or the benchmark rate.",
+    "Mortgage default insurance is mandatory when the down payment is under twenty percent of the purchase price.",
+    "An amortization period is the total time it takes to pay off the mortgage in full.",
+    "Closing costs usually add between one and a half and four percent of the purchase price.",
+    "A pre-approval sets a maximum amount and holds an interest rate for a limited time.",
+]
+
+
+def make_chunks(count: int, chunk_chars: int):
+    chunks = []
+    for i in range(count):
+        text = f"Chunk {i}. "
+        j = i
+        while len(text) < chunk_chars:
+            text += SENTENCES[j % len(SENTENCES)] + " "
+            j += 1
+        chunks.append(text[:chunk_chars])
+    return chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--chunk-chars", type=int, default=1500)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--batch-tokens", type=int, default=16000)
+    parser.add_argument("--tpm", type=int, default=0, help="Client-side TPM budget (0 = none)")
+    parser.add_argument("--embed-tpm", type=int, default=2_000_000, help="Stub server TPM limit (0 = none)")
+    parser.add_argument("--embed-latency", type=float, default=0.25)
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--output", type=Path, help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATA_DIR"] = tmp
+        os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+        from rag import EmbeddingBatcher
+
+        texts = make_chunks(args.chunks, args.chunk_chars)
+        expected = [fake_embedding(text) for text in texts]
+        results = []
+        baseline = None
+        for concurrency in sorted(set(args.concurrency)):
+            # A fresh server per run so the stub's TPM bucket starts full each time
+            with FakeOpenAIServer(port=args.port, embed_latency=args.embed_latency, embed_tpm=args.embed_tpm) as server:
+                batcher = EmbeddingBatcher(
+                    None,
+                    model="text-embedding-3-small",
+                    api_key=os.environ["OPENAI_API_KEY"],
+                    base_url=server.base_url,
+                    batch_tokens=args.batch_tokens,
+                    concurrency=concurrency,
+                    tpm=args.tpm,
+                    max_retries=10
+                )
+                start = time.perf_counter()
+                vectors = batcher.embed_documents(texts)
+                elapsed = time.perf_counter() - start
+            in_order = len(vectors) == len(expected) and all(
+                max(abs(a - b) for a, b in zip(got, want)) < 1e-6 for got, want in zip(vectors, expected)
+            )
+            baseline = baseline or elapsed
+            results.append({
+                "concurrency": concurrency,
+                "seconds": round(elapsed, 3),
+                "chunks_per_second": round(len(texts) / elapsed, 1),
+                "requests": batcher.requests,
+                "rate_limited": batcher.rate_limited,
+                "in_order": in_order,
+                "speedup": round(baseline / elapsed, 2),
+            })
+            print(f"concurrency={concurrency:<3} {elapsed:7.2f}s  {len(texts) / elapsed:8.1f} chunks/s  "
+                  f"speedup x{baseline / elapsed:.2f}  ({batcher.requests} requests, "
+                  f"{batcher.rate_limited} rate limited, {'in order' if in_order else 'OUT OF ORDER'})")
+            if not in_order:
+                raise SystemExit("Embedding results did not match the input order")
+
+    if args.output:
+        args.output.write_text(json.dumps({
+            "benchmark": "embed_batches", "chunks": args.chunks, "chunk_chars": args.chunk_chars,
+            "batch_tokens": args.batch_tokens, "tpm": args.tpm, "embed_tpm": args.embed_tpm,
+            "results": results
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""Minimal OpenAI-compatible stub server for load tests and benchmarks.
+
+Serves ``/v1/embeddings`` with deterministic hash-based vectors and
+``/v1/chat/completions`` with a canned answer after a configurable delay
+(spread across the tokens when the client asks for ``stream``),
+so the backend can be exercised end to end without network or API spend.
+
+With ``--embed-tpm`` the embeddings endpoint enforces a tokens-per-minute
+budget and answers 429 with ``retry-after-ms`` once it is spent, the way the
+real API does, so the index build's rate-limit handling can be exercised.
+
+    python -m benchmarks.fake_openai --port 9100 --chat-latency 0.5
+    python -m benchmarks.fake_openai --embed-tpm 200000
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from typing import Any, List
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+EMBEDDING_DIM = 256
+ANSWER = (
+    "This is a stubbed answer from the fake OpenAI server. "
+    "It exists so latency and throughput can be measured without calling the real API."
+)
+
+
+def fake_embedding(value: Any, dim: int = EMBEDDING_DIM) -> List[float]:
+    """Deterministic unit vector for a string or a list of token IDs."""
+    key = value if isinstance(value, str) else ",".join(str(t) for t in value)
+    seed = int.from_bytes(hashlib.sha256(key.encode()).digest()[:8], "little")
+    vec = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    vec /= np.linalg.norm(vec)
+    return vec.tolist()
+
+
+def estimate_tokens(value: Any) -> int:
+    """Token count for an embeddings input: ~4 characters per token, or the token ID list length."""
+    return len(value) // 4 + 1 if isinstance(value, str) else len(value)
+
+
+class TokenBudget:
+    """Tokens-per-minute bucket; ``take`` returns 0 when allowed, else the seconds until it would be."""
+
+    def __init__(self, tpm: int):
+        self.tpm = tpm
+        self.allowance = float(tpm)
+        self.refilled_at = time.monotonic()
+
+    def take(self, tokens: int) -> float:
+        now = time.monotonic()
+        self.allowance = min(self.tpm, self.allowance + (now - self.refilled_at) * self.tpm / 60)
+        self.refilled_at = now
+        tokens = min(tokens, self.tpm)
+        if self.allowance >= tokens:
+            self.allowance -= tokens
+            return 0.0
+        return (tokens - self.allowance) * 60 / self.tpm
+
+
+async def stream_completion(completion_id: str, model: str, latency: float):
+    tokens = [word + " " for word in ANSWER.split()]
+    for token in tokens:
+        await asyncio.sleep(latency / len(tokens))
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+    final = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+    }
+    yield f"data: {json.dumps(final)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+def create_app(chat_latency: float = 0.5, embed_latency: float = 0.02, embed_tpm: int = 0) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI")
+    app.state.stats = {
+        "embedding_requests": 0, "embedding_inputs": 0, "embedding_rate_limited": 0, "chat_requests": 0
+    }
+    budget = TokenBudget(embed_tpm) if embed_tpm else None
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        inputs = body["input"]
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        tokens = sum(estimate_tokens(item) for item in inputs)
+        wait = budget.take(tokens) if budget else 0.0
+        if wait:
+            app.state.stats["embedding_rate_limited"] += 1
+            return JSONResponse(
+                status_code=429,
+                headers={"retry-after-ms": str(int(wait * 1000) + 1)},
+                content={"error": {
+                    "message": f"Rate limit reached: {embed_tpm} TPM", "type": "tokens", "code": "rate_limit_exceeded"
+                }},
+            )
+        app.state.stats["embedding_requests"] += 1
+        app.state.stats["embedding_inputs"] += len(inputs)
+        await asyncio.sleep(embed_latency)
+        return {
+            "object": "list",
+            "model": body.get("model", "fake-embedding"),
+            "data": [
+                {"object": "embedding", "index": i, "embedding": fake_embedding(item)}
+                for i, item in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.stats["chat_requests"] += 1
+        completion_id = f"chatcmpl-fake-{app.state.stats['chat_requests']}"
+        model = body.get("model", "fake-chat")
+        if body.get("stream"):
+            return StreamingResponse(
+                stream_completion(completion_id, model, chat_latency),
+                media_type="text/event-stream"
+            )
+        await asyncio.sleep(chat_latency)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": ANSWER},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(ANSWER.split()), "total_tokens": 0},
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return app.state.stats
+
+    return app
+
+
+class FakeOpenAIServer:
+    """Runs the stub in a background thread; use as a context manager."""
+
+    def __init__(self, port: int = 9100, **app_kwargs):
+        self.port = port
+        self.base_url = f"http://127.0.0.1:{port}/v1"
+        self.server = uvicorn.Server(uvicorn.Config(
+            create_app(**app_kwargs), host="127.0.0.1", port=port, log_level="warning"
+        ))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--chat-latency", type=float, default=0.5)
+    parser.add_argument("--embed-latency", type=float, default=0.02)
+    parser.add_argument("--embed-tpm", type=int, default=0, help="Embedding tokens-per-minute limit (0 = none)")
+    args = parser.parse_args()
+    uvicorn.run(
+        create_app(args.chat_latency, args.embed_latency, args.embed_tpm),
+        host="127.0.0.1", port=args.port, log_level="info"
+    )
@@ -0,0 +1,162 @@
+"""Local HTTP fixture site for crawler tests and benchmarks.
+
+Serves a tree of linked HTML pages under ``/docs/`` with a configurable
+response latency. Every page links to its children, back to the index and
+to an out-of-scope page. It records the start time of each request and the
+highest number of requests it served at once, so per-host politeness can be
+checked. Each instance listens on its own port, which the crawler treats as
+a separate host.
+
+Pages carry an ETag and Last-Modified and answer conditional requests with
+304 unless ``validators=False``. ``edit(page)`` changes a page's text, and
+``statuses`` counts the response codes sent.
+
+    python -m benchmarks.fixture_site --port 9300 --pages 50 --latency 0.1
+"""
+import argparse
+import collections
+import hashlib
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+PARAGRAPH = (
+    "Mortgage default insurance is required when the down payment is under twenty percent. "
+    "The stress test qualifies borrowers at the greater of the benchmark rate or the contract rate plus two percent."
+)
+
+
+def render_page(page: int, pages: int, fanout: int, revision: int = 0) -> bytes:
+    children = [c for c in range(page * fanout + 1, page * fanout + fanout + 1) if c < pages]
+    links = "".join(f'<li><a href="/docs/page{c}.html">Page {c}</a></li>' for c in children)
+    body = "".join(f"<p>Page {page}, section {s}. {PARAGRAPH}</p>" for s in range(6))
+    if revision:
+        body += f"<p>Revision {revision}: rates were updated.</p>"
+    return (
+        "<!DOCTYPE html><html><head><title>Page {page}</title>"
+        "<script>var tracking = true;</script><style>p {{ margin: 0 }}</style></head><body>"
+        "<header>Site header</header><nav><a href=\"/docs/\">Home</a> <a href=\"/about/\">About</a></nav>"
+        "<main><h1>Fixture page {page}</h1>{body}<ul>{links}</ul>"
+        "<a href=\"/docs/page{page}.html#top\">Top</a></main><footer>Footer text</footer></body></html>"
+    ).format(page=page, body=body, links=links).encode()
+
+
+class FixtureSite:
+    """A threaded HTTP server in the background; use as a context manager."""
+
+    def __init__(self, port: int = 0, pages: int = 50, fanout: int = 3, latency: float = 0.05,
+                 validators: bool = True):
+        self.pages = pages
+        self.fanout = fanout
+        self.latency = latency
+        self.validators = validators
+        self.revisions: Dict[int, int] = {}
+        self.modified: Dict[int, str] = {}
+        self.started = formatdate(usegmt=True)
+        self.request_starts: List[float] = []
+        self.statuses: collections.Counter = collections.Counter()
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with site._lock:
+                    site.request_starts.append(time.monotonic())
+                    site._in_flight += 1
+                    site.max_in_flight = max(site.max_in_flight, site._in_flight)
+                try:
+                    time.sleep(site.latency)
+                    status, body, headers = site.respond(self.path, self.headers)
+                    with site._lock:
+                        site.statuses[status] += 1
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    if status != 304:
+                        self.send_header("Content-Type", "text/html; charset=utf-8")
+                        self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with site._lock:
+                        site._in_flight -= 1
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.base_url = f"http://127.0.0.1:{self.port}/docs/"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def edit(self, page: int):
+        """Change the text of ``page`` (0 is the index), giving it a new ETag and Last-Modified."""
+        with self._lock:
+            self.revisions[page] = self.revisions.get(page, 0) + 1
+            self.modified[page] = formatdate(usegmt=True)
+
+    def _page_number(self, path: str):
+        if path in ("/docs/", "/docs/index.html"):
+            return 0
+        if path.startswith("/docs/page") and path.endswith(".html"):
+            number = path[len("/docs/page"):-len(".html")]
+            if number.isdigit() and int(number) < self.pages:
+                return int(number)
+        return None
+
+    def respond(self, path: str, request_headers=None):
+        page = self._page_number(path.split("?", 1)[0])
+        if page is None:
+            return 404, b"<html><body>Not found</body></html>", {}
+        body = render_page(page, self.pages, self.fanout, self.revisions.get(page, 0))
+        if not self.validators:
+            return 200, body, {}
+        headers = {
+            "ETag": '"' + hashlib.sha1(body).hexdigest()[:16] + '"',
+            "Last-Modified": self.modified.get(page, self.started),
+        }
+        if request_headers is not None:
+            if_none_match = request_headers.get("If-None-Match")
+            if if_none_match is not None:
+                fresh = if_none_match == headers["ETag"]
+            else:
+                fresh = request_headers.get("If-Modified-Since") == headers["Last-Modified"]
+            if fresh:
+                return 304, b"", headers
+        return 200, body, headers
+
+    def min_start_gap(self) -> float:
+        """Smallest gap between consecutive request starts (inf with fewer than two requests)."""
+        starts = sorted(self.request_starts)
+        return min((b - a for a, b in zip(starts, starts[1:])), default=float("inf"))
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=9300)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+    with FixtureSite(args.port, args.pages, latency=args.latency) as site:
+        print(f"Serving {args.pages} pages at {site.base_url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,173 @@
+"""HTML extraction benchmark: lxml single pass vs BeautifulSoup + html2text.
+
+Extracts the same pages with ``html_extract.extract_page`` (what the
+scraper uses) and with the previous path: parse with BeautifulSoup, drop
+script/style/nav/header/footer, serialize with ``str(soup)`` and re-parse in
+html2text. Each engine runs in its own process. It reports pages/s, MB/s
+and the peak RSS increase while extracting. The parent also checks that
+both engines find the same links and reports the word overlap of their text
+and the share of html2text's table rows that come out as the same row.
+
+Pages are HTML files from ``--pages-dir`` (for example pages saved with
+``curl -o``), or synthetic pages with realistic chrome when none is given:
+
+    python -m benchmarks.html_extract
+    python -m benchmarks.html_extract --pages-dir ~/saved_pages --rounds 5
+"""
+import argparse
+import json
+import re
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+from benchmarks.chat_load import BACKEND_DIR
+from benchmarks.fixture_site import PARAGRAPH
+
+ENGINES = ["html2text", "lxml"]
+
+
+def synthetic_page(page: int) -> bytes:
+    nav = "".join(f'<li><a href="/en/section{n}/topic{n}.html">Section {n}</a></li>' for n in range(120))
+    footer = "".join(f'<a href="/en/footer/link{n}.html">Footer link {n}</a> ' for n in range(60))
+    script = "var config = {" + ",".join(f'"key{n}": {n}' for n in range(1500)) + "};"
+    rows = "".join(f"<tr><td>{n}-year fixed</td><td>{4 + n / 10:.2f}%</td><td>{5 + n / 10:.2f}%</td></tr>"
+                   for n in range(1, 11))
+    # Rate tables often wrap cell values in block elements
+    wrapped_rows = "".join(f"<tr><td><p>{n}-year variable</p></td><td><div><span>{3 + n / 10:.2f}%</span></div></td>"
+                           f"<td><p>Prime <strong>- {n / 10:.2f}%</strong></p></td></tr>" for n in range(1, 6))
+    sections = "".join(
+        f"<section><h2>Section {s}</h2><p>{PARAGRAPH} <strong>Page {page}.</strong> "
+        f'See <a href="/en/mortgages/topic{page}-{s}.html">related guidance</a>.</p>'
+        f"<ul><li>Down payment of <em>5%</em> on the first $500,000</li><li>10% on the portion above</li>"
+        f"<li>20% or more avoids mortgage default insurance</li></ul><p>{PARAGRAPH}</p></section>"
+        for s in range(12)
+    )
+    return (
+        f'<!DOCTYPE html><html lang="en"><head><meta charset="utf-8"><title>Page {page}</title>'
+        f"<style>body {{ font-family: sans-serif }} .nav li {{ display: inline }}</style>"
+        f"<script>{script}</script></head><body>"
+        f'<header><div class="brand">Government of Canada</div><nav><ul class="nav">{nav}</ul></nav></header>'
+        f'<main><h1>Buying a home, part {page}</h1>{sections}'
+        f"<table><thead><tr><th>Term</th><th>Posted</th><th>Qualifying</th></tr></thead><tbody>{rows}</tbody></table>"
+        f"<table><tr><th><p>Term</p></th><th><p>Rate</p></th><th><p>Discount</p></th></tr>{wrapped_rows}</table>"
+        f'</main><footer>{footer}</footer><script>analytics("{page}");</script></body></html>'
+    ).encode()
+
+
+def load_pages(pages_dir: Path, count: int) -> List[bytes]:
+    if pages_dir:
+        return [path.read_bytes() for path in sorted(pages_dir.glob("*.htm*"))]
+    return [synthetic_page(page) for page in range(count)]
+
+
+def html2text_extract(content: bytes):
+    import html2text
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(content, 'html.parser')
+    for script in soup(["script", "style", "nav", "footer", "header"]):
+        script.decompose()
+    hrefs = [link['href'] for link in soup.find_all('a', href=True)]
+    converter = html2text.HTML2Text()
+    converter.ignore_links = False
+    converter.ignore_images = True
+    return converter.handle(str(soup)), hrefs
+
+
+def engine(name: str):
+    if name == "lxml":
+        from html_extract import extract_page
+        return extract_page
+    return html2text_extract
+
+
+def run_worker(args) -> dict:
+    pages = load_pages(args.pages_dir, args.count)
+    extract = engine(args.engine)
+    extract(pages[0])
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        for content in pages:
+            extract(content)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    extracted = len(pages) * args.rounds
+    return {
+        "engine": args.engine,
+        "pages": extracted,
+        "seconds": round(elapsed, 3),
+        "pages_per_second": round(extracted / elapsed, 1),
+        "mb_per_second": round(sum(map(len, pages)) * args.rounds / elapsed / 1e6, 2),
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_increase_mb": round((peak - baseline) / 1024, 1),
+    }
+
+
+def table_rows(text: str) -> set:
+    return {tuple(re.findall(r"\w+", line)) for line in text.splitlines() if "|" in line and re.search(r"\w", line)}
+
+
+def compare(pages: List[bytes]) -> dict:
+    old, new = engine("html2text"), engine("lxml")
+    same_links, overlap, rows = 0, 0.0, 0.0
+    for content in pages:
+        old_text, old_links = old(content)
+        new_text, new_links = new(content)
+        same_links += old_links == new_links
+        # Word tokens, so markdown punctuation such as table pipes does not count as a difference
+        old_words, new_words = set(re.findall(r"\w+", old_text)), set(re.findall(r"\w+", new_text))
+        overlap += len(old_words & new_words) / max(1, len(old_words | new_words))
+        # Table rows must keep their cells together, not only their words
+        old_rows = table_rows(old_text)
+        rows += len(old_rows & table_rows(new_text)) / len(old_rows) if old_rows else 1.0
+    return {"same_links": same_links / len(pages), "word_overlap": overlap / len(pages),
+            "same_table_rows": rows / len(pages)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages-dir", type=Path, help="Directory of saved .html pages")
+    parser.add_argument("--count", type=int, default=100, help="Synthetic pages when --pages-dir is not given")
+    parser.add_argument("--rounds", type=int, default=3, help="Passes over the page set")
+    parser.add_argument("--engine", choices=ENGINES, help=argparse.SUPPRESS)
+    parser.add_argument("--output", type=Path, help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    if args.engine:
+        print(json.dumps(run_worker(args)))
+        return
+
+    pages = load_pages(args.pages_dir, args.count)
+    if not pages:
+        raise SystemExit(f"No .html files in {args.pages_dir}")
+    print(f"{len(pages)} pages, {sum(map(len, pages)) / len(pages) / 1024:.0f} KiB on average")
+    results = []
+    for name in ENGINES:
+        command = [sys.executable, "-m", "benchmarks.html_extract", "--engine", name,
+                   "--count", str(args.count), "--rounds", str(args.rounds)]
+        if args.pages_dir:
+            command += ["--pages-dir", str(args.pages_dir)]
+        output = subprocess.run(command, cwd=BACKEND_DIR, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        results.append(result)
+        print(f"{name:<10} {result['pages_per_second']:8.1f} pages/s  {result['mb_per_second']:6.2f} MB/s  "
+              f"peak RSS +{result['peak_rss_increase_mb']:.1f} MB")
+    speedup = results[1]["pages_per_second"] / results[0]["pages_per_second"]
+    agreement = compare(pages)
+    print(f"lxml is x{speedup:.1f} faster; identical links on {agreement['same_links']:.0%} of pages, "
+          f"{agreement['word_overlap']:.0%} word overlap, {agreement['same_table_rows']:.0%} of table rows intact")
+
+    if args.output:
+        args.output.write_text(json.dumps({
+            "benchmark": "html_extract", "page_count": len(pages), "rounds": args.rounds,
+            "results": results, "speedup": round(speedup, 2), **agreement
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Document loading benchmark over a synthetic PDF corpus.
+
+Generates a few hundred multi-page text PDFs and times the index build's
+loading stage (``loaders.iter_loaded_files``) at increasing worker counts, so
+the speedup from the process pool can be read off directly.
+
+    python -m benchmarks.load_docs --files 300 --pages 8 --workers 1 2 4 8
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from loaders import iter_loaded_files
+
+PARAGRAPH = (
+    "A fixed-rate mortgage keeps the same interest rate for the whole term, while a "
+    "variable-rate mortgage moves with the lender's prime rate. First-time buyers may "
+    "qualify for the FHSA, the Home Buyers' Plan and CMHC insured financing with a "
+    "down payment of as little as five percent on the first 500,000 dollars."
+)
+
+
+def write_pdf(path: Path, pages: int, seed: int) -> None:
+    """Write a minimal, valid text PDF with ``pages`` pages of mortgage prose."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_refs = []
+    for page in range(pages):
+        lines = [f"Document {seed} page {page + 1}"] + [PARAGRAPH[i:i + 90] for i in range(0, len(PARAGRAPH), 90)] * 6
+        text = " T* ".join(f"({line})'" if i else f"({line}) Tj" for i, line in enumerate(lines))
+        stream = f"BT /F1 10 Tf 14 TL 50 780 Td {text} ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content_ref = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_ref} 0 R >>"
+        )
+        page_refs.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(page_refs)}] /Count {pages} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(bytes(out))
+
+
+def time_loading(files, workers: int):
+    start = time.perf_counter()
+    documents = errors = 0
+    for _, docs, error in iter_loaded_files(files, workers):
+        if error is not None:
+            errors += 1
+        else:
+            documents += len(docs)
+    return time.perf_counter() - start, documents, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=300)
+    parser.add_argument("--pages", type=int, default=8)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--output", type=Path, help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = Path(tmp)
+        for i in range(args.files):
+            write_pdf(corpus / f"synthetic_{i:04d}.pdf", args.pages, i)
+        files = sorted(corpus.glob("*.pdf"))
+
+        results = []
+        baseline = None
+        for workers in sorted(set(args.workers)):
+            elapsed, documents, errors = time_loading(files, workers)
+            baseline = baseline or elapsed
+            results.append({
+                "workers": workers,
+                "seconds": round(elapsed, 3),
+                "files_per_second": round(len(files) / elapsed, 1),
+                "pages": documents,
+                "errors": errors,
+                "speedup": round(baseline / elapsed, 2),
+            })
+            print(f"workers={workers:<3} {elapsed:7.2f}s  {len(files) / elapsed:7.1f} files/s  "
+                  f"speedup x{baseline / elapsed:.2f}  ({documents} pages, {errors} errors)")
+
+    if args.output:
+        args.output.write_text(json.dumps({
+            "benchmark": "load_docs", "files": args.files, "pages_per_file": args.pages,
+            "cpu_count": os.cpu_count(), "results": results
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""End-to-end performance suite against the fake OpenAI server, with JSON results.
+
+For each corpus scale it measures:
+- a full index build with an empty embedding cache;
+- an incremental rebuild after one file is edited, one added and one
+  removed;
+- a no-op rebuild with the sources unchanged.
+Each build is a ``build_index.py`` run, as at deploy time. Scale 1 is the
+shipped ``data/raw_docs`` corpus. Scale N adds N-1 altered copies of its
+text documents, so their chunks and embeddings are all distinct.
+
+On the scale-1 index it then times a read-only worker's cold start and
+drives /chat at each concurrency level with a closed loop of clients. It
+reports p50/p95/p99 latency and throughput, plus time to first token with
+``--stream``. The answer cache is off unless ``--answer-cache`` is passed,
+so every request runs the full pipeline.
+
+Results are written as JSON, tagged with the git commit. With ``--compare``
+the run is checked against an earlier results file, and the command exits
+non-zero if a metric regressed by more than ``--tolerance``.
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --scales 1 10 --concurrency 1 8 32 --compare baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+import numpy as np
+
+from benchmarks.chat_load import BACKEND_DIR, QUESTIONS, start_backend, wait_until_healthy
+from benchmarks.cold_start import measure_cold_start
+from benchmarks.fake_openai import FakeOpenAIServer
+
+TEXT_SUFFIXES = {".md", ".txt"}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def build_corpus(source: Path, raw_docs: Path, scale: int) -> int:
+    """Copy ``source`` into ``raw_docs`` plus ``scale - 1`` altered copies of its text files."""
+    shutil.copytree(source, raw_docs)
+    text_files = [p for p in source.rglob("*") if p.suffix.lower() in TEXT_SUFFIXES]
+    for copy in range(1, scale):
+        for path in text_files:
+            paragraphs = path.read_text(encoding="utf-8").split("\n\n")
+            altered = "\n\n".join(f"[Copy {copy}] {paragraph}" for paragraph in paragraphs)
+            (raw_docs / f"scaled_{copy:03d}_{path.name}").write_text(altered, encoding="utf-8")
+    return sum(1 for p in raw_docs.rglob("*") if p.is_file())
+
+
+def mutate_corpus(raw_docs: Path):
+    """Edit one text file, add one and remove one, as a typical content update would."""
+    text_files = sorted(p for p in raw_docs.rglob("*") if p.suffix.lower() in TEXT_SUFFIXES)
+    edited, removed = text_files[0], text_files[-1]
+    with open(edited, "a", encoding="utf-8") as f:
+        f.write("\n\nUpdated: lenders may now offer 30-year amortizations to first-time buyers.\n")
+    (raw_docs / "added_update.md").write_text(
+        "# Rate update\n\nThe benchmark rate for the stress test was reviewed this quarter.\n", encoding="utf-8"
+    )
+    removed.unlink()
+
+
+def fake_stats(fake: FakeOpenAIServer) -> Dict[str, int]:
+    return httpx.get(fake.base_url.removesuffix("/v1") + "/stats").json()
+
+
+def run_build(env: dict, fake: FakeOpenAIServer, *extra_args: str) -> Dict[str, float]:
+    before = fake_stats(fake)
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "build_index.py", *extra_args], cwd=BACKEND_DIR, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    elapsed = time.perf_counter() - start
+    after = fake_stats(fake)
+    return {
+        "seconds": round(elapsed, 3),
+        "embedding_requests": after["embedding_requests"] - before["embedding_requests"],
+        "embedded_chunks": after["embedding_inputs"] - before["embedding_inputs"],
+    }
+
+
+def bench_index(fake: FakeOpenAIServer, corpus: Path, data_dir: Path, scale: int, env: dict) -> dict:
+    files = build_corpus(corpus, data_dir / "raw_docs", scale)
+    full = run_build(env, fake)
+    mutate_corpus(data_dir / "raw_docs")
+    incremental = run_build(env, fake)
+    noop = run_build(env, fake)
+    print(f"index x{scale:<3} {files} files: full {full['seconds']:.2f}s ({full['embedded_chunks']} chunks), "
+          f"incremental {incremental['seconds']:.2f}s ({incremental['embedded_chunks']} chunks), "
+          f"unchanged {noop['seconds']:.2f}s")
+    return {"files": files, "full_build": full, "incremental_rebuild": incremental, "unchanged_rebuild": noop}
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50_ms": round(p50 * 1000, 1), "p95_ms": round(p95 * 1000, 1), "p99_ms": round(p99 * 1000, 1)}
+
+
+async def drive_chat(base_url: str, concurrency: int, total: int, stream: bool) -> dict:
+    latencies, first_tokens, errors = [], [], 0
+    counter = iter(range(total))
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0) as client:
+        async def one(i: int):
+            # A distinct question per request; the answer cache is off by default anyway
+            payload = {"message": f"{QUESTIONS[i % len(QUESTIONS)]} (request {i})"}
+            start = time.perf_counter()
+            if not stream:
+                response = await client.post("/chat", json=payload)
+                response.raise_for_status()
+            else:
+                first_token = None
+                async with client.stream("POST", "/chat/stream", json=payload) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if first_token is None and line == "event: token":
+                            first_token = time.perf_counter() - start
+                if first_token is not None:
+                    first_tokens.append(first_token)
+            latencies.append(time.perf_counter() - start)
+
+        async def client_loop():
+            nonlocal errors
+            for i in counter:
+                try:
+                    await one(i)
+                except httpx.HTTPError:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+        wall = time.perf_counter() - start
+
+    result = {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "requests_per_second": round(len(latencies) / wall, 2),
+        **percentiles(latencies),
+    }
+    if stream:
+        result["first_token"] = percentiles(first_tokens)
+    return result
+
+
+def bench_chat(fake: FakeOpenAIServer, data_dir: Path, args) -> List[dict]:
+    extra_env = {
+        "INDEX_READ_ONLY": "true",
+        "CHAT_RATE_LIMIT": "1000000/minute",
+        "ANSWER_CACHE_ENABLED": "true" if args.answer_cache else "false",
+    }
+    base_url = f"http://127.0.0.1:{args.port}"
+    backend = start_backend(args.port, fake.base_url, data_dir, extra_env)
+    results = []
+    try:
+        wait_until_healthy(base_url, backend)
+        asyncio.run(drive_chat(base_url, 1, min(3, args.requests), args.stream))  # warm-up
+        for concurrency in sorted(set(args.concurrency)):
+            total = max(args.requests, concurrency * 2)
+            result = asyncio.run(drive_chat(base_url, concurrency, total, args.stream))
+            results.append(result)
+            print(f"chat c={concurrency:<4} {result['requests_per_second']:7.2f} req/s  "
+                  f"p50 {result.get('p50_ms', 0):7.1f}ms  p95 {result.get('p95_ms', 0):7.1f}ms  "
+                  f"p99 {result.get('p99_ms', 0):7.1f}ms  ({result['errors']} errors)")
+    finally:
+        backend.terminate()
+        backend.wait()
+    return results
+
+
+def flatten(results: dict) -> Dict[str, float]:
+    """Comparable metrics keyed by a stable path, e.g. ``chat.c8.p95_ms``."""
+    flat = {}
+    for scale, index in results.get("index", {}).items():
+        for phase in ("full_build", "incremental_rebuild", "unchanged_rebuild"):
+            flat[f"index.x{scale}.{phase}.seconds"] = index[phase]["seconds"]
+    cold = results.get("cold_start")
+    if cold:
+        flat["cold_start.live_seconds"] = cold["live_seconds"]
+        flat["cold_start.ready_seconds"] = cold["ready_seconds"]
+        for module, seconds in cold["imports"].items():
+            flat[f"cold_start.import_{module}_seconds"] = seconds
+    for run in results.get("chat", []):
+        prefix = f"chat.c{run['concurrency']}"
+        flat[f"{prefix}.requests_per_second"] = run["requests_per_second"]
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            if key in run:
+                flat[f"{prefix}.{key}"] = run[key]
+    return flat
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> List[str]:
+    now, before = flatten(current), flatten(baseline)
+    regressions = []
+    print(f"\ncompared with {baseline.get('git_commit', 'unknown')[:12]}:")
+    for key in sorted(now.keys() & before.keys()):
+        old, new = before[key], now[key]
+        if not old:
+            continue
+        change = (new - old) / old
+        # Throughput regresses when it drops; every other metric is a duration
+        worse = -change if key.endswith("_per_second") else change
+        flag = "REGRESSION" if worse > tolerance else ""
+        print(f"  {key:<45} {old:>10} -> {new:<10} {change:+7.1%} {flag}")
+        if flag:
+            regressions.append(key)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 5], help="Corpus size multipliers to index")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--requests", type=int, default=64, help="Requests per concurrency level")
+    parser.add_argument("--stream", action="store_true", help="Use /chat/stream and report time to first token")
+    parser.add_argument("--answer-cache", action="store_true", help="Leave the answer cache on")
+    parser.add_argument("--chat-latency", type=float, default=0.5)
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    parser.add_argument("--cold-start-runs", type=int, default=3)
+    parser.add_argument("--skip", nargs="*", default=[], choices=["index", "cold_start", "chat"])
+    parser.add_argument("--fake-port", type=int, default=9100)
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--corpus", type=Path, default=BACKEND_DIR / "data" / "raw_docs")
+    parser.add_argument("--output", type=Path, help="Write results as JSON to this path")
+    parser.add_argument("--compare", type=Path, help="Earlier results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative slowdown before failing")
+    args = parser.parse_args()
+
+    results = {
+        "benchmark": "suite",
+        "git_commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {
+            "chat_latency": args.chat_latency, "embed_latency": args.embed_latency,
+            "requests": args.requests, "stream": args.stream, "answer_cache": args.answer_cache,
+        },
+        "index": {},
+    }
+    scales = sorted(set(args.scales) | {1})
+    with FakeOpenAIServer(port=args.fake_port, chat_latency=args.chat_latency,
+                          embed_latency=args.embed_latency) as fake, \
+            tempfile.TemporaryDirectory() as tmp:
+        data_dirs = {}
+        for scale in scales:
+            if "index" in args.skip and scale != 1:
+                continue
+            data_dir = data_dirs[scale] = Path(tmp) / f"x{scale}"
+            env = dict(os.environ, OPENAI_API_KEY="sk-fake", OPENAI_BASE_URL=fake.base_url, DATA_DIR=str(data_dir))
+            if "index" in args.skip:
+                # Cold start and chat still need an index to serve
+                build_corpus(args.corpus, data_dir / "raw_docs", 1)
+                run_build(env, fake)
+            else:
+                results["index"][str(scale)] = bench_index(fake, args.corpus, data_dir, scale, env)
+
+        env = dict(os.environ, OPENAI_API_KEY="sk-fake", OPENAI_BASE_URL=fake.base_url, DATA_DIR=str(data_dirs[1]))
+        if "cold_start" not in args.skip:
+            results["cold_start"] = measure_cold_start(
+                env, fake.base_url, data_dirs[1], args.port, args.cold_start_runs
+            )
+            print(f"cold start: live {results['cold_start']['live_seconds']:.2f}s, "
+                  f"ready {results['cold_start']['ready_seconds']:.2f}s")
+        if "chat" not in args.skip:
+            results["chat"] = bench_chat(fake, data_dirs[1], args)
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+        print(f"\nresults written to {args.output}")
+    if args.compare:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.tolerance)
+        if regressions:
+            raise SystemExit(f"{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Build or sync the vector index once, under the index build lock, then exit.
+
+Run this before starting several API workers so none of them has to build
+the index; the workers then open it with INDEX_READ_ONLY=true:
+
+    python build_index.py && INDEX_READ_ONLY=true uvicorn main:app --workers 4
+    python build_index.py --force    # new index version even if sources are unchanged
+
+Offline, it can package the built index as a checksummed snapshot. A server
+started with INDEX_SNAPSHOT (or ``--from-snapshot``) installs and serves the
+snapshot without loading documents or calling the embeddings API:
+
+    python -m build_index --force --snapshot dist/index.tar.gz
+    INDEX_SNAPSHOT=https://example.com/index.tar.gz python build_index.py
+
+Deploys boot with ``--no-build``: install INDEX_SNAPSHOT if it is set,
+otherwise serve the index already in DATA_DIR as is, and fail rather than
+embed the corpus when there is none. A missing BM25 index is saved here,
+so the read-only workers never write:
+
+    python build_index.py --no-build && INDEX_READ_ONLY=true uvicorn main:app
+"""
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+import config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--force", action="store_true", help="Build a new index version from scratch")
+    parser.add_argument("--snapshot", type=Path, help="Write the built index to this snapshot archive (.tar.gz)")
+    parser.add_argument("--from-snapshot", help="Install this snapshot (path or URL) instead of building")
+    parser.add_argument("--sha256", help="Expected sha256 of the --from-snapshot archive")
+    parser.add_argument("--no-build", action="store_true",
+                        help="Never load documents or embed: install a snapshot or keep the existing index")
+    args = parser.parse_args()
+
+    # This process owns the build, whatever the workers' environment says
+    config.INDEX_READ_ONLY = False
+    config.FORCE_REBUILD_INDEX = config.FORCE_REBUILD_INDEX or args.force
+    if args.from_snapshot:
+        config.INDEX_SNAPSHOT = args.from_snapshot
+        config.INDEX_SNAPSHOT_SHA256 = args.sha256
+
+    from rag import MortgageRAG
+    if args.no_build and not config.INDEX_SNAPSHOT:
+        index_dir = MortgageRAG._resolve_index_dir()
+        if MortgageRAG._index_chunk_count(index_dir) == 0:
+            logger.error(
+                f"No usable index in {index_dir} and INDEX_SNAPSHOT is not set. Set INDEX_SNAPSHOT to a prebuilt "
+                f"snapshot, or build one into DATA_DIR with `python build_index.py`."
+            )
+            sys.exit(1)
+        logger.info(f"--no-build: serving the existing index in {index_dir} without checking sources")
+    rag = MortgageRAG(build=not args.no_build)
+    logger.info(f"Index ready: {rag.index_dir} ({rag.index_chunks} chunks)")
+    if args.no_build and rag.index_chunks == 0:
+        logger.error(f"Snapshot {config.INDEX_SNAPSHOT} installed an empty index")
+        sys.exit(1)
+
+    if args.snapshot:
+        snapshot = rag.export_snapshot(args.snapshot)
+        logger.info(f"Snapshot {args.snapshot} sha256 {snapshot['sha256']}")
+
+
+if __name__ == "__main__":
+    main()
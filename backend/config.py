@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 import logging
 from dotenv import load_dotenv
@@ -14,18 +15,49 @@ else:
     logger.debug(f".env not found at {env_path}, relying on process environment")
 
 BASE_DIR = Path(__file__).resolve().parent
-DATA_DIR = BASE_DIR / "data"
+DATA_DIR = Path(os.getenv("DATA_DIR", BASE_DIR / "data"))
 RAW_DOCS_DIR = DATA_DIR / "raw_docs"
 CHROMA_DB_DIR = DATA_DIR / "chroma_db"
-
-RAW_DOCS_DIR.mkdir(parents=True, exist_ok=True)
-CHROMA_DB_DIR.mkdir(parents=True, exist_ok=True)
+# Blue/green index builds: each rebuild lands in its own directory and CHROMA_DB_DIR/ACTIVE names the live one
+INDEX_VERSIONS_DIR = CHROMA_DB_DIR / "versions"
+INDEX_POINTER_FILE = CHROMA_DB_DIR / "ACTIVE"
+# Content-addressed chunk embeddings; lives outside CHROMA_DB_DIR so rebuilds keep it
+EMBEDDING_CACHE_PATH = DATA_DIR / "embedding_cache.sqlite3"
+# Held while an index is built or synced; outside CHROMA_DB_DIR so it never makes an empty index look built
+INDEX_BUILD_LOCK_PATH = DATA_DIR / ".index_build.lock"
+# Rebuild job records, shared by all API workers so any of them can answer a status poll
+REBUILD_JOBS_PATH = DATA_DIR / "rebuild_jobs.sqlite3"
+# Per-URL validators and content hashes from the last crawl; outside RAW_DOCS_DIR so it is never indexed
+CRAWL_CACHE_PATH = DATA_DIR / "crawl_cache.sqlite3"
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
-if not OPENAI_API_KEY:
-    raise ValueError("OPENAI_API_KEY environment variable must be set")
+
+
+# Importing config has no side effects; code that writes data or calls OpenAI checks first
+def ensure_data_dirs():
+    RAW_DOCS_DIR.mkdir(parents=True, exist_ok=True)
+    CHROMA_DB_DIR.mkdir(parents=True, exist_ok=True)
+
+
+def require_openai_api_key() -> str:
+    if not OPENAI_API_KEY:
+        raise ValueError("OPENAI_API_KEY environment variable must be set")
+    return OPENAI_API_KEY
+
+
+# Optional OpenAI-compatible endpoint (e.g. a local stub server for load tests)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "").strip() or None
 
 FORCE_REBUILD_INDEX = os.getenv("FORCE_REBUILD_INDEX", "false").lower() == "true"
+# Multi-worker mode: workers only open the index that build_index.py prepared and never build, sync or write to a
+# served index. Blue/green rebuilds and rollbacks stay allowed: they write a new version under the build lock.
+INDEX_READ_ONLY = os.getenv("INDEX_READ_ONLY", "false").lower() == "true"
+# How often each worker checks whether another process activated a new index version
+INDEX_POINTER_CHECK_SECONDS = float(os.getenv("INDEX_POINTER_CHECK_SECONDS", 5))
+# Prebuilt index snapshot (local path or http(s) URL) to install and serve instead of building one
+INDEX_SNAPSHOT = os.getenv("INDEX_SNAPSHOT", "").strip() or None
+# Expected sha256 of the snapshot archive; defaults to the .sha256 file published next to it
+INDEX_SNAPSHOT_SHA256 = os.getenv("INDEX_SNAPSHOT_SHA256", "").strip() or None
 
 # --- Agent / Broker Profile ---
 AGENT_NAME = os.getenv("AGENT_NAME", "").strip()
@@ -64,13 +96,107 @@ AGENT_PROFILE = (
 EMBEDDING_MODEL = "text-embedding-3-small"
 CHUNK_SIZE = 1500
 CHUNK_OVERLAP = 300
+# Processes used to parse PDF/Word files during index builds
+LOADER_WORKERS = int(os.getenv("LOADER_WORKERS", os.cpu_count() or 1))
+# Chunks embedded and upserted per batch; together with LOADER_WORKERS this bounds build memory
+INDEX_BATCH_SIZE = int(os.getenv("INDEX_BATCH_SIZE", 256))
+# Drop near-duplicate chunks (SimHash) before embedding; changing these rebuilds the index
+DEDUPE_ENABLED = os.getenv("DEDUPE_ENABLED", "true").lower() == "true"
+# Max differing bits (of 64) for two documents / chunks to count as near-duplicates
+DEDUPE_DOCUMENT_DISTANCE = int(os.getenv("DEDUPE_DOCUMENT_DISTANCE", 3))
+DEDUPE_CHUNK_DISTANCE = int(os.getenv("DEDUPE_CHUNK_DISTANCE", 3))
+
+# --- Embedding batcher (index builds) ---
+# Estimated tokens packed into one embeddings request (OpenAI also caps a request at 2048 inputs)
+EMBEDDING_BATCH_TOKENS = int(os.getenv("EMBEDDING_BATCH_TOKENS", 16000))
+# Embedding requests kept in flight at once
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", 4))
+# Tokens-per-minute budget for the embedding model; 0 disables client-side throttling
+EMBEDDING_TPM = int(os.getenv("EMBEDDING_TPM", 1_000_000))
+# Attempts per batch before a rate-limited or failed request is given up on
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", 6))
 
 RETRIEVAL_K = 6
+# Tokens of retrieved context allowed in one prompt; lowest-ranked chunks are trimmed first
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 1500))
+
+# --- Hybrid retrieval (BM25 lexical index fused with vector search) ---
+HYBRID_RETRIEVAL_ENABLED = os.getenv("HYBRID_RETRIEVAL_ENABLED", "true").lower() == "true"
+# Results taken from each of the vector and lexical searches before reciprocal-rank fusion
+HYBRID_CANDIDATE_K = int(os.getenv("HYBRID_CANDIDATE_K", 20))
+HYBRID_RRF_K = 60
+# Keyword queries (acronyms/numbers, at most this many terms) skip the query embedding entirely
+HYBRID_LEXICAL_ONLY_MAX_TERMS = int(os.getenv("HYBRID_LEXICAL_ONLY_MAX_TERMS", 4))
+
+# --- Local reranking (MMR over a wider candidate pool) ---
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "true").lower() == "true"
+# Candidates reranked per query, and how many of them go to the LLM (in place of RETRIEVAL_K)
+RERANK_POOL_K = int(os.getenv("RERANK_POOL_K", 20))
+RERANK_K = int(os.getenv("RERANK_K", 4))
+# 1.0 ranks purely by relevance; lower values trade relevance for diversity
+RERANK_MMR_LAMBDA = float(os.getenv("RERANK_MMR_LAMBDA", 0.7))
+# Share of the relevance score that comes from query-term overlap instead of cosine similarity
+RERANK_LEXICAL_WEIGHT = float(os.getenv("RERANK_LEXICAL_WEIGHT", 0.3))
 LLM_MODEL = "gpt-4o-mini"
 LLM_TEMPERATURE = 0.1
 
 COLLECTION_NAME = "mortgage_documents"
 
+# --- Query embeddings (LRU + micro-batching of concurrent questions) ---
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", 2048))
+# How long a query embedding waits for others to share its API call
+QUERY_EMBEDDING_BATCH_WINDOW_MS = float(os.getenv("QUERY_EMBEDDING_BATCH_WINDOW_MS", 5))
+QUERY_EMBEDDING_MAX_BATCH = int(os.getenv("QUERY_EMBEDDING_MAX_BATCH", 64))
+
+# --- Answer cache (exact + semantic, in front of the QA chain) ---
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 512))
+ANSWER_CACHE_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", 6 * 3600))
+# Cosine similarity a query embedding needs to reuse a cached answer
+ANSWER_CACHE_SIMILARITY_THRESHOLD = float(os.getenv("ANSWER_CACHE_SIMILARITY_THRESHOLD", 0.95))
+
+# --- Web crawler (scraper.py) ---
+# Requests in flight per host; hosts are crawled in parallel with each other
+SCRAPER_PER_HOST_CONCURRENCY = int(os.getenv("SCRAPER_PER_HOST_CONCURRENCY", 2))
+# Minimum seconds between request starts to the same host (politeness)
+SCRAPER_HOST_DELAY_SECONDS = float(os.getenv("SCRAPER_HOST_DELAY_SECONDS", 1.0))
+# Pooled keep-alive connections shared by all hosts
+SCRAPER_MAX_CONNECTIONS = int(os.getenv("SCRAPER_MAX_CONNECTIONS", 32))
+SCRAPER_TIMEOUT_SECONDS = float(os.getenv("SCRAPER_TIMEOUT_SECONDS", 30))
+# Link hops from the start URL
+SCRAPER_MAX_DEPTH = int(os.getenv("SCRAPER_MAX_DEPTH", 5))
+# Pages queued per directory (or per page, across query-string variants); stops search/feed pages from swamping a crawl
+SCRAPER_PATH_BUDGET = int(os.getenv("SCRAPER_PATH_BUDGET", 100))
+# URL path substrings that move a page up the crawl queue
+SCRAPER_PRIORITY_KEYWORDS = [
+    k.strip().lower() for k in os.getenv(
+        "SCRAPER_PRIORITY_KEYWORDS",
+        "mortgage,rate,down-payment,insurance,amortization,buying-home,first-time,closing-cost,"
+        "renew,refinanc,stress-test,prime,heloc,home-equity"
+    ).split(",") if k.strip()
+]
+# Continue an interrupted crawl from its saved frontier (finished crawls always start over)
+SCRAPER_RESUME = os.getenv("SCRAPER_RESUME", "true").lower() == "true"
+
+# --- Observability (Prometheus /metrics is always on) ---
+# Also emit OpenTelemetry spans per pipeline stage; needs opentelemetry-api and a configured tracer provider
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+
+# Per-client limit on /chat and /chat/stream (slowapi syntax); benchmarks raise it to drive load
+CHAT_RATE_LIMIT = os.getenv("CHAT_RATE_LIMIT", "20/minute")
+# Where rate-limit counters live (limits storage URI). memory:// counts per worker process, so with several
+# workers a client gets the limit once per worker; point all workers at shared storage such as redis://host:6379
+RATE_LIMIT_STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI", "memory://")
+# Worker processes uvicorn starts (it reads the same variable)
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", 1))
+# With several workers each one writes its metrics here and /metrics on any worker sums them all;
+# empty keeps metrics per process (the default for a single worker)
+METRICS_DIR = os.getenv(
+    "METRICS_DIR", str(Path(tempfile.gettempdir()) / "mortgagebot-metrics") if WEB_CONCURRENCY > 1 else ""
+).strip() or None
+# How often each worker writes its metrics to METRICS_DIR; a scrape can lag other workers by this much
+METRICS_WRITE_SECONDS = float(os.getenv("METRICS_WRITE_SECONDS", 5))
+
 API_HOST = "0.0.0.0"
 API_PORT = int(os.getenv("PORT", 8080))
 
@@ -206,18 +332,22 @@ CORE BEHAVIOR RULES
     Make it clear you cannot request identifying details (name, SIN,
     employer name, full address), but that you can give a ballpark payment
     using these basics or point them to the approved calculator link.
+"""
 
+# Per-request part of the prompt, sent as a user message after SYSTEM_PROMPT.
+# SYSTEM_PROMPT stays byte-identical across requests so the provider can cache it as a prefix.
+CONTEXT_PROMPT = """
 =====================
 RETRIEVED CONTEXT
 =====================
 
-{{context}}
+{context}
 
 =====================
 USER QUESTION
 =====================
 
-{{question}}
+{question}
 
 =====================
 FINAL INSTRUCTIONS
@@ -0,0 +1,126 @@
+"""Near-duplicate detection for index builds with 64-bit SimHash.
+
+Texts are fingerprinted from their lowercase word 3-shingles. Two texts are
+near-duplicates when their fingerprints differ in at most ``max_distance``
+bits. Fingerprints are split into ``max_distance + 1`` bands. By pigeonhole,
+two fingerprints within that distance agree exactly on at least one band,
+so a lookup only compares texts that share a band (LSH) instead of scanning
+everything kept so far.
+
+Fingerprints use blake2b, not ``hash()``, so they are stable across
+processes and can be stored in the index manifest.
+"""
+import hashlib
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+SHINGLE_SIZE = 3
+_TOKEN = re.compile(r"\w+")
+
+
+def _shingle_hashes(text: str) -> np.ndarray:
+    tokens = _TOKEN.findall(text.lower())
+    if len(tokens) > SHINGLE_SIZE:
+        shingles = [" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)]
+    else:
+        shingles = [" ".join(tokens)] if tokens else []
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "little") for s in shingles],
+        dtype="<u8"
+    )
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash of ``text``; 0 for text without words."""
+    hashes = _shingle_hashes(text)
+    if not len(hashes):
+        return 0
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    majority = bits.sum(axis=0, dtype=np.int64) * 2 > len(hashes)
+    return int(np.packbits(majority, bitorder="little").view("<u8")[0])
+
+
+class NearDuplicateIndex:
+    """Fingerprints with an owner each; ``find`` returns the owner of any within ``max_distance`` bits."""
+
+    def __init__(self, max_distance: int = 3):
+        if not 0 <= max_distance < 16:
+            raise ValueError("max_distance must be between 0 and 15 bits")
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        width = 64 // bands
+        # The last band takes the leftover bits
+        self._bands = [(i * width, width if i < bands - 1 else 64 - i * width) for i in range(bands)]
+        self._tables: List[Dict[int, List[Tuple[int, str]]]] = [{} for _ in self._bands]
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _keys(self, fingerprint: int):
+        return [(fingerprint >> shift) & ((1 << width) - 1) for shift, width in self._bands]
+
+    def find(self, fingerprint: int) -> Optional[str]:
+        for table, key in zip(self._tables, self._keys(fingerprint)):
+            for other, owner in table.get(key, ()):
+                if (fingerprint ^ other).bit_count() <= self.max_distance:
+                    return owner
+        return None
+
+    def add(self, fingerprint: int, owner: str):
+        for table, key in zip(self._tables, self._keys(fingerprint)):
+            table.setdefault(key, []).append((fingerprint, owner))
+        self._size += 1
+
+
+class Deduplicator:
+    """Keeps the first copy of each near-duplicate chunk across the files of an index.
+
+    ``filter`` is called once per file with its chunk texts and returns
+    which chunks to embed, plus the fields to store in that file's manifest
+    entry. A file that is a near-duplicate of an indexed document is still
+    filtered chunk by chunk, so what differs (a rate table, a heading) is
+    kept; the match is recorded in ``duplicate_document`` / ``duplicate_of``.
+    ``load`` restores a previously indexed file from those fields, so
+    incremental syncs compare new files against everything already indexed.
+    """
+
+    def __init__(self, document_distance: int = 3, chunk_distance: int = 3):
+        self.documents = NearDuplicateIndex(document_distance)
+        self.chunks = NearDuplicateIndex(chunk_distance)
+
+    def load(self, key: str, entry: Dict[str, Any]):
+        if entry.get("simhash") is not None and not entry.get("duplicate_document"):
+            self.documents.add(entry["simhash"], key)
+        for fingerprint in entry.get("chunk_simhashes", []):
+            self.chunks.add(fingerprint, key)
+
+    def filter(self, key: str, chunk_texts: List[str]) -> Tuple[List[int], Dict[str, Any]]:
+        """Indices of the chunks of file ``key`` to keep, and its dedupe manifest fields."""
+        document = simhash("\n".join(chunk_texts))
+        original = self.documents.find(document)
+        duplicate_document = original is not None and original != key
+        originals = {original} if duplicate_document else set()
+        if not duplicate_document:
+            self.documents.add(document, key)
+
+        kept, fingerprints = [], []
+        for i, text in enumerate(chunk_texts):
+            fingerprint = simhash(text)
+            original = self.chunks.find(fingerprint)
+            if original is not None:
+                if original != key:
+                    originals.add(original)
+                continue
+            self.chunks.add(fingerprint, key)
+            kept.append(i)
+            fingerprints.append(fingerprint)
+        return kept, {
+            "simhash": document,
+            "chunk_simhashes": fingerprints,
+            "duplicate_document": duplicate_document,
+            "duplicate_of": sorted(originals),
+            "dropped_chunks": len(chunk_texts) - len(kept),
+        }
@@ -158,6 +158,7 @@ class PIIRedactor:
 class EmailProcessor:
     
     def __init__(self, redact_pii: bool = True):
+        config.ensure_data_dirs()
         self.output_dir = config.RAW_DOCS_DIR
         self.redact_pii = redact_pii
         self.redactor = PIIRedactor() if redact_pii else None
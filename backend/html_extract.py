@@ -0,0 +1,202 @@
+"""Single-pass HTML to markdown-ish text extraction with lxml.
+
+The page is parsed once and walked once. Boilerplate subtrees (scripts,
+styles, navigation, header, footer, ARIA landmarks for the same, hidden
+nodes) are skipped as they are reached rather than removed and
+re-serialized. Headings, paragraphs, lists, tables, links, emphasis and
+code come out as markdown. Links are collected in the same walk, so the
+crawler and the text agree on which parts of the page count.
+
+Output is close to what BeautifulSoup + html2text produced, except
+that paragraphs are not hard-wrapped.
+"""
+import re
+from typing import List, Optional, Tuple
+
+from lxml import etree
+
+# Never page content; skipped with their whole subtree
+SKIP_TAGS = {
+    'script', 'style', 'noscript', 'template', 'nav', 'footer', 'header', 'head',
+    'svg', 'canvas', 'iframe', 'object', 'embed', 'button', 'select', 'input', 'textarea', 'img'
+}
+SKIP_ROLES = {'navigation', 'banner', 'contentinfo', 'search'}
+BLOCK_TAGS = {
+    'p', 'div', 'section', 'article', 'main', 'aside', 'address', 'figure', 'figcaption', 'form',
+    'fieldset', 'details', 'summary', 'dl', 'dt', 'dd', 'body', 'html', 'caption'
+}
+HEADINGS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+INLINE_MARKS = {'strong': '**', 'b': '**', 'em': '_', 'i': '_', 'code': '`'}
+
+_WHITESPACE = re.compile(r'\s+')
+_DECLARED_CHARSET = re.compile(rb'<meta[^>]+charset', re.IGNORECASE)
+# Stands in for <br> until inline whitespace has been collapsed
+_LINE_BREAK = '\x00'
+
+
+class _Writer:
+
+    def __init__(self):
+        self.blocks: List[Tuple[str, bool]] = []
+        self.links: List[str] = []
+        self._inline: List[str] = []
+        self._prefix = ''
+        self._list_item = False
+        self._lists: List[List[int]] = []
+        self._in_cell = False
+
+    def flush(self):
+        text = _WHITESPACE.sub(' ', ''.join(self._inline))
+        self._inline = []
+        lines = [line.strip() for line in text.split(_LINE_BREAK)]
+        text = '  \n'.join(line for line in lines if line)
+        if not text:
+            return
+        self.blocks.append((self._prefix + text, self._list_item))
+        # Later blocks of the same list item are indented under it, without another bullet
+        self._prefix = ' ' * len(self._prefix)
+
+    def text(self) -> str:
+        self.flush()
+        out = []
+        for i, (block, list_item) in enumerate(self.blocks):
+            if i:
+                out.append('\n' if list_item and self.blocks[i - 1][1] else '\n\n')
+            out.append(block)
+        return ''.join(out) + '\n' if out else ''
+
+    def block(self, element, prefix: Optional[str] = None, list_item: bool = False):
+        self.flush()
+        saved = (self._prefix, self._list_item)
+        if prefix is not None:
+            self._prefix = prefix
+        self._list_item = list_item or self._list_item
+        self.children(element)
+        self.flush()
+        self._prefix, self._list_item = saved
+
+    def children(self, element):
+        if element.text:
+            self._inline.append(element.text)
+        for child in element:
+            self.walk(child)
+            if child.tail:
+                self._inline.append(child.tail)
+
+    def walk(self, element):
+        tag = element.tag
+        if not isinstance(tag, str):
+            return
+        if (
+            tag in SKIP_TAGS
+            or element.get('role') in SKIP_ROLES
+            or element.get('hidden') is not None
+            or element.get('aria-hidden') == 'true'
+        ):
+            return
+
+        if tag == 'a':
+            href = element.get('href')
+            if href is None:
+                self.children(element)
+                return
+            self.links.append(href)
+            start = len(self._inline)
+            self.children(element)
+            label = _WHITESPACE.sub(' ', ''.join(self._inline[start:])).strip()
+            del self._inline[start:]
+            if label and not href.startswith(('#', 'javascript:')):
+                self._inline.append(f'[{label}]({href})')
+            elif label:
+                self._inline.append(label)
+        elif tag in INLINE_MARKS:
+            start = len(self._inline)
+            self.children(element)
+            inner = ''.join(self._inline[start:])
+            del self._inline[start:]
+            if inner.strip():
+                mark = INLINE_MARKS[tag]
+                lead = ' ' if inner[0].isspace() else ''
+                trail = ' ' if inner[-1].isspace() else ''
+                self._inline.append(f'{lead}{mark}{inner.strip()}{mark}{trail}')
+        elif tag == 'br':
+            self._inline.append(_LINE_BREAK)
+        elif tag in HEADINGS:
+            self.block(element, '#' * HEADINGS[tag] + ' ')
+        elif tag in ('ul', 'ol'):
+            self.flush()
+            self._lists.append([0 if tag == 'ol' else -1])
+            self.children(element)
+            self.flush()
+            self._lists.pop()
+        elif tag == 'li':
+            indent = '  ' * len(self._lists)
+            if self._lists and self._lists[-1][0] >= 0:
+                self._lists[-1][0] += 1
+                bullet = f'{self._lists[-1][0]}. '
+            else:
+                bullet = '* '
+            self.block(element, indent + bullet, list_item=True)
+        elif tag == 'pre':
+            self.flush()
+            code = ''.join(element.itertext()).strip('\n')
+            if code.strip():
+                self.blocks.append(('\n'.join('    ' + line for line in code.split('\n')), False))
+        elif tag == 'blockquote':
+            self.block(element, '> ')
+        elif tag == 'hr':
+            self.flush()
+            self.blocks.append(('* * *', False))
+        elif tag == 'table':
+            self.table(element)
+        elif tag in BLOCK_TAGS:
+            self.block(element)
+        else:
+            self.children(element)
+
+    def table(self, element):
+        self.flush()
+        rows = []
+        # Own rows only; a nested table is flattened into the text of its cell
+        for row in element.xpath('./tr | ./thead/tr | ./tbody/tr | ./tfoot/tr'):
+            cells = []
+            for cell in row:
+                if cell.tag in ('td', 'th'):
+                    cells.append(self.cell(cell))
+            if any(cells):
+                rows.append(cells)
+        if rows:
+            width = len(rows[0])
+            rows = [' | '.join(cells) for cells in rows]
+            if not self._in_cell:
+                rows.insert(1, ' | '.join(['---'] * width))
+            self.blocks.append(('\n'.join(rows), False))
+
+    def cell(self, cell) -> str:
+        # Cells often wrap their value in <p> or <div>; a separate writer keeps those blocks in the cell
+        writer = _Writer()
+        writer.links = self.links
+        writer._in_cell = True
+        writer.children(cell)
+        writer.flush()
+        return _WHITESPACE.sub(' ', ' '.join(block for block, _ in writer.blocks)).strip()
+
+
+def _parse(content: bytes):
+    # libxml2 falls back to latin-1 without a declared charset; pages served without one are almost always utf-8
+    encoding = None if _DECLARED_CHARSET.search(content[:2048]) else 'utf-8'
+    parser = etree.HTMLParser(encoding=encoding, remove_comments=True, remove_pis=True)
+    return etree.fromstring(content, parser)
+
+
+def extract_page(content: bytes) -> Tuple[str, List[str]]:
+    """Markdown text of an HTML page (without scripts and page chrome) and its raw hrefs."""
+    if not content or not content.strip():
+        return '', []
+    root = _parse(content)
+    if root is None:
+        return '', []
+    body = root.find('body')
+    writer = _Writer()
+    writer.walk(body if body is not None else root)
+    return writer.text(), writer.links
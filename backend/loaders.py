@@ -0,0 +1,80 @@
+"""Source document loading for index builds.
+
+Kept free of the OpenAI/Chroma stack so loader worker processes start
+quickly; the LangChain loaders themselves are imported on first use.
+"""
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+# CPU-bound formats that are worth shipping to the loader process pool
+POOLED_SUFFIXES = {".pdf", ".docx"}
+
+
+def load_source_file(file_path: Path) -> List[Document]:
+    """Parse one source file and tag its documents with ``metadata["type"]``."""
+    from langchain_community.document_loaders import Docx2txtLoader, PyPDFLoader, TextLoader
+
+    suffix = file_path.suffix.lower()
+    if suffix == ".pdf":
+        loader, doc_type = PyPDFLoader(str(file_path)), "pdf"
+    elif suffix == ".docx":
+        loader, doc_type = Docx2txtLoader(str(file_path)), "docx"
+    elif suffix == ".md":
+        loader, doc_type = TextLoader(str(file_path), encoding="utf-8"), "markdown"
+    else:
+        loader, doc_type = TextLoader(str(file_path), encoding="utf-8"), "text"
+    docs = loader.load()
+    for doc in docs:
+        doc.metadata["type"] = doc_type
+    return docs
+
+
+def iter_loaded_files(
+    files: List[Path], workers: int
+) -> Iterator[Tuple[Path, Optional[List[Document]], Optional[Exception]]]:
+    """Yield ``(path, docs, error)`` for each file, in the order of ``files``.
+
+    PDF and Word files are parsed across a process pool with at most
+    ``2 * workers`` files in flight; text and markdown are cheap to read and
+    load inline while the pool works. Results are handed over in input
+    order, so the near-duplicate filter keeps the same copy on every build.
+    A failing file yields its error instead of aborting the run.
+    """
+    pooled = [p for p in files if p.suffix.lower() in POOLED_SUFFIXES]
+    if workers <= 1 or len(pooled) <= 1:
+        pooled = []
+
+    def load_inline(file_path: Path):
+        try:
+            return file_path, load_source_file(file_path), None
+        except Exception as e:
+            return file_path, None, e
+
+    if not pooled:
+        for file_path in files:
+            yield load_inline(file_path)
+        return
+
+    max_in_flight = workers * 2
+    queued = iter(pooled)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        # Futures in input order; the pool keeps parsing ahead while earlier files are handed over
+        pending = deque(pool.submit(load_source_file, p) for p in islice(queued, max_in_flight))
+        for file_path in files:
+            if file_path.suffix.lower() not in POOLED_SUFFIXES:
+                yield load_inline(file_path)
+                continue
+            future = pending.popleft()
+            next_path = next(queued, None)
+            if next_path is not None:
+                pending.append(pool.submit(load_source_file, next_path))
+            try:
+                yield file_path, future.result(), None
+            except Exception as e:
+                yield file_path, None, e
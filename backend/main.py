@@ -1,39 +1,66 @@
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
+import asyncio
+import json
 import logging
+import time
+from pathlib import Path
 from typing import Optional
 from contextlib import asynccontextmanager
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
-from rag import get_rag_instance
 import config
+import metrics
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 rag_system = None
+# Set when the RAG system failed to start; readiness reports it and liveness fails
+rag_init_error: Optional[str] = None
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    # Startup
-    global rag_system
+def _load_rag_system():
+    # Imported here so the app accepts probes before the LangChain/Chroma stack has loaded
+    from rag import get_rag_instance
+    return get_rag_instance()
+
+
+async def _initialize_rag_system():
+    global rag_system, rag_init_error
+    started = time.perf_counter()
     try:
         logger.info("Initializing RAG system...")
-        rag_system = get_rag_instance()
-        logger.info("RAG system initialized successfully")
+        rag_system = await asyncio.to_thread(_load_rag_system)
+        logger.info(f"RAG system initialized in {time.perf_counter() - started:.2f}s")
     except Exception as e:
+        rag_init_error = str(e)
         logger.error(f"Failed to initialize RAG system: {e}")
-        raise
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if config.WEB_CONCURRENCY > 1 and config.RATE_LIMIT_STORAGE_URI.startswith("memory://"):
+        logger.warning(
+            f"{config.WEB_CONCURRENCY} workers with in-memory rate limits: each client gets "
+            f"{config.CHAT_RATE_LIMIT} per worker. Set RATE_LIMIT_STORAGE_URI to shared storage (e.g. redis://)."
+        )
+    if config.METRICS_DIR:
+        metrics.start_multiprocess(Path(config.METRICS_DIR), config.METRICS_WRITE_SECONDS)
+    # Startup: open the index in the background so /health/live answers immediately
+    init_task = asyncio.create_task(_initialize_rag_system())
     
     yield
     
     # Shutdown (if needed)
     logger.info("Shutting down...")
+    init_task.cancel()
+    # Counters of this worker stay in the other workers' totals
+    metrics.write_worker_file()
 
 
 app = FastAPI(
@@ -44,9 +71,54 @@ app = FastAPI(
 )
 
 # Rate limiting setup
-limiter = Limiter(key_func=get_remote_address)
+limiter = Limiter(key_func=get_remote_address, storage_uri=config.RATE_LIMIT_STORAGE_URI)
 app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+
+
+def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
+    metrics.RATE_LIMITED.inc(limiter="api")
+    return _rate_limit_exceeded_handler(request, exc)
+
+
+app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
+
+
+class RequestMetricsMiddleware:
+    """Counts requests and times them until the response starts (time to first byte for streams)."""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        started = time.perf_counter()
+        status = 500
+        
+        def route_label() -> str:
+            # The route template keeps label cardinality bounded (/rebuild-index/{job_id})
+            route = scope.get("route")
+            return route.path if route is not None else "unmatched"
+        
+        async def send_with_metrics(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                metrics.REQUEST_SECONDS.observe(
+                    time.perf_counter() - started, method=scope["method"], route=route_label()
+                )
+            await send(message)
+        
+        with metrics.span(f"{scope['method']} {scope['path']}"):
+            try:
+                await self.app(scope, receive, send_with_metrics)
+            finally:
+                metrics.REQUESTS.inc(method=scope["method"], route=route_label(), status=str(status))
+
+
+app.add_middleware(RequestMetricsMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -74,6 +146,7 @@ class SourceInfo(BaseModel):
 class ChatResponse(BaseModel):
     answer: str = Field(..., description="AI-generated answer")
     sources: list[SourceInfo] = Field(default=[], description="Source documents used")
+    chunk_ids: list[Optional[str]] = Field(default=[], description="IDs of the chunks used as context")
     
     class Config:
         json_schema_extra = {
@@ -84,7 +157,8 @@ class ChatResponse(BaseModel):
                         "content": "Required documents include proof of income...",
                         "metadata": {"source": "mortgage_requirements.md"}
                     }
-                ]
+                ],
+                "chunk_ids": ["3f1c9a0d2b7e4c55a1e8f0b6d4c2a917"]
             }
         }
 
@@ -97,19 +171,49 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "chat": "/chat",
+            "chat_stream": "/chat/stream",
             "health": "/health",
+            "health_live": "/health/live",
+            "health_ready": "/health/ready",
+            "cache_stats": "/cache-stats",
+            "metrics": "/metrics",
+            "rebuild_index": "/rebuild-index",
+            "rollback_index": "/rollback-index",
             "docs": "/docs"
         }
     }
 
 
+@app.get("/health/live")
+async def liveness_check():
+    if rag_init_error is not None:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "unhealthy", "message": rag_init_error}
+        )
+    
+    return {"status": "alive"}
+
+
 @app.get("/health")
+@app.get("/health/ready")
 async def health_check():
     try:
+        if rag_init_error is not None:
+            return JSONResponse(
+                status_code=503,
+                content={"status": "unhealthy", "message": rag_init_error}
+            )
         if rag_system is None:
             return JSONResponse(
                 status_code=503,
-                content={"status": "unhealthy", "message": "RAG system not initialized"}
+                content={"status": "starting", "message": "RAG system is still initializing"}
+            )
+        if rag_system.index_chunks == 0:
+            # Chat would answer without any context
+            return JSONResponse(
+                status_code=503,
+                content={"status": "unhealthy", "message": "The active index has no chunks"}
             )
         
         return {
@@ -126,7 +230,7 @@ async def health_check():
 
 
 @app.post("/chat", response_model=ChatResponse)
-@limiter.limit("20/minute")
+@limiter.limit(config.CHAT_RATE_LIMIT)
 async def chat(request: Request, chat_request: ChatRequest):
     try:
         logger.info(f"Received chat request: {chat_request.message[:100]}...")
@@ -137,21 +241,25 @@ async def chat(request: Request, chat_request: ChatRequest):
                 detail="RAG system not initialized. Please try again later."
             )
         
-        result = rag_system.query(chat_request.message)
+        result = await rag_system.aquery(chat_request.message)
         
-        response = ChatResponse(
-            answer=result["answer"],
-            sources=[
-                SourceInfo(
-                    content=source["content"],
-                    metadata=source["metadata"]
-                )
-                for source in result["sources"]
-            ]
-        )
+        with metrics.stage("serialization"):
+            response = ChatResponse(
+                answer=result["answer"],
+                sources=[
+                    SourceInfo(
+                        content=source["content"],
+                        metadata=source["metadata"]
+                    )
+                    for source in result["sources"]
+                ],
+                chunk_ids=result["chunk_ids"]
+            )
+            # Serialized here (not re-validated by FastAPI) so the stage covers the JSON encoding
+            body = response.model_dump_json()
         
         logger.info("Chat request processed successfully")
-        return response
+        return Response(content=body, media_type="application/json")
         
     except HTTPException:
         raise
@@ -163,30 +271,104 @@ async def chat(request: Request, chat_request: ChatRequest):
         )
 
 
-@app.post("/rebuild-index")
+@app.post("/chat/stream")
+@limiter.limit(config.CHAT_RATE_LIMIT)
+async def chat_stream(request: Request, chat_request: ChatRequest):
+    logger.info(f"Received streaming chat request: {chat_request.message[:100]}...")
+    
+    if rag_system is None:
+        raise HTTPException(
+            status_code=503,
+            detail="RAG system not initialized. Please try again later."
+        )
+    
+    async def event_stream():
+        async for event in rag_system.astream_query(chat_request.message):
+            yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/cache-stats")
+async def cache_stats():
+    if rag_system is None:
+        raise HTTPException(
+            status_code=503,
+            detail="RAG system not initialized"
+        )
+    
+    extra = {
+        "prompt_cache": rag_system.llm_metrics.prompt_cache_stats(),
+        "query_embeddings": rag_system.query_embeddings.stats()
+    }
+    if rag_system.answer_cache is None:
+        return {"enabled": False, **extra}
+    
+    return {"enabled": True, **rag_system.answer_cache.stats(), **extra}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/rebuild-index", status_code=202)
 async def rebuild_index():
+    if rag_system is None:
+        raise HTTPException(
+            status_code=503,
+            detail="RAG system not initialized"
+        )
+    
+    logger.info("Starting background vectorstore rebuild...")
+    job = rag_system.start_rebuild()
+    return {
+        **job,
+        "status_url": f"/rebuild-index/{job['job_id']}"
+    }
+
+
+@app.get("/rebuild-index/{job_id}")
+async def rebuild_status(job_id: str):
+    if rag_system is None:
+        raise HTTPException(
+            status_code=503,
+            detail="RAG system not initialized"
+        )
+    
+    job = rag_system.get_rebuild_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown rebuild job: {job_id}")
+    return job
+
+
+@app.post("/rollback-index")
+async def rollback_index():
+    if rag_system is None:
+        raise HTTPException(
+            status_code=503,
+            detail="RAG system not initialized"
+        )
+    
     try:
-        logger.info("Rebuilding vectorstore index...")
-        
-        if rag_system is None:
-            raise HTTPException(
-                status_code=503,
-                detail="RAG system not initialized"
-            )
-        
-        rag_system.rebuild_index()
-        
-        return {
-            "status": "success",
-            "message": "Vectorstore index rebuilt successfully"
-        }
-        
+        index_dir = await asyncio.to_thread(rag_system.rollback_index)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
-        logger.error(f"Error rebuilding index: {e}")
+        logger.error(f"Error rolling back index: {e}")
         raise HTTPException(
             status_code=500,
-            detail=f"Failed to rebuild index: {str(e)}"
+            detail=f"Failed to roll back index: {str(e)}"
         )
+    
+    return {
+        "status": "success",
+        "message": f"Now serving index version {index_dir.name}"
+    }
 
 
 @app.exception_handler(404)
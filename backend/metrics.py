@@ -0,0 +1,305 @@
+"""In-process metrics in the Prometheus text exposition format, plus optional tracing.
+
+Counters and histograms are plain dicts guarded by a lock, so recording a
+sample costs about a microsecond and can stay on in production. Values that
+other components already count (cache stats, index size) are read only when
+/metrics is scraped, through collectors registered with ``register_collector``.
+
+With several API workers a scrape reaches one of them at random, so with
+METRICS_DIR set each worker also writes its samples to a file there
+(``<parent pid>/<pid>.json``, refreshed every METRICS_WRITE_SECONDS) and
+``render`` sums every worker's file of the current server. Counters and
+histograms of exited workers stay in the sum so totals never go backwards;
+gauges are reported per live worker with a ``worker`` label.
+
+With TRACING_ENABLED, every ``stage`` also opens an OpenTelemetry span on the
+configured tracer provider (for example under ``opentelemetry-instrument``).
+If opentelemetry is not installed, tracing stays off.
+"""
+import bisect
+import json
+import logging
+import math
+import os
+import shutil
+import threading
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import config
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "mortgagebot_"
+# Seconds; spans the range from a cached embedding lookup to a long LLM completion
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (250, 500, 1000, 1500, 2000, 3000, 4000, 8000, 16000)
+
+# (name, type, help, [(labels, value), ...]) as produced by a collector
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+# (name, type, help, [(sample name, labels, value), ...]) as rendered
+Samples = Tuple[str, str, str, List[Tuple[str, Dict[str, str], float]]]
+
+_metrics: List["_Metric"] = []
+_collectors: List[Callable[[], Iterable[Family]]] = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+        _metrics.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            return [(self.name, self._labels(key), value) for key, value in self._values.items()]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels: str):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, then sum and count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        out = []
+        with self._lock:
+            states = [(key, [list(state[0]), state[1], state[2]]) for key, state in self._values.items()]
+        for key, (counts, total, count) in states:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                out.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            out.append((f"{self.name}_sum", labels, total))
+            out.append((f"{self.name}_count", labels, count))
+        return out
+
+
+def register_collector(collector: Callable[[], Iterable[Family]]):
+    """Add a callable whose metric families are read at scrape time."""
+    _collectors.append(collector)
+
+
+def _families() -> List[Samples]:
+    """This process's metrics and collector families."""
+    families = [(metric.name, metric.type, metric.documentation, metric.samples()) for metric in _metrics]
+    for collector in _collectors:
+        try:
+            for name, metric_type, documentation, samples in collector():
+                families.append((PREFIX + name, metric_type, documentation,
+                                 [(PREFIX + name, labels, value) for labels, value in samples]))
+        except Exception as e:
+            logger.warning(f"Metrics collector failed: {e}")
+    return families
+
+
+_metrics_dir: Optional[Path] = None
+
+
+def _worker_file() -> Path:
+    # One directory per server start: workers of the same uvicorn supervisor share a parent pid
+    return _metrics_dir / str(os.getppid()) / f"{os.getpid()}.json"
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def write_worker_file():
+    """Write this worker's samples for the other workers' scrapes; a no-op without METRICS_DIR."""
+    if _metrics_dir is None:
+        return
+    path = _worker_file()
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(_families()))
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.warning(f"Could not write metrics to {path}: {e}")
+
+
+def start_multiprocess(directory: Path, interval: float):
+    """Share metrics through ``directory`` with the other workers of this server."""
+    global _metrics_dir
+    _metrics_dir = directory
+    # Files of earlier server starts would otherwise accumulate
+    if directory.exists():
+        for server_dir in directory.iterdir():
+            if server_dir.is_dir() and server_dir.name.isdigit() and not _alive(int(server_dir.name)):
+                shutil.rmtree(server_dir, ignore_errors=True)
+    write_worker_file()
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            write_worker_file()
+
+    threading.Thread(target=loop, name="metrics-writer", daemon=True).start()
+
+
+def _merged_families() -> List[Samples]:
+    """Every worker's families summed; gauges of live workers are kept apart by a ``worker`` label."""
+    write_worker_file()
+    merged: Dict[str, Tuple[str, str, Dict[Tuple[str, Tuple], float]]] = {}
+    for path in sorted(_worker_file().parent.glob("*.json")):
+        try:
+            pid = int(path.stem)
+            families = json.loads(path.read_text())
+        except Exception as e:
+            logger.warning(f"Skipping metrics file {path}: {e}")
+            continue
+        alive = pid == os.getpid() or _alive(pid)
+        for name, metric_type, documentation, samples in families:
+            if metric_type == "gauge" and not alive:
+                continue
+            _, _, values = merged.setdefault(name, (metric_type, documentation, {}))
+            for sample_name, labels, value in samples:
+                if metric_type == "gauge":
+                    labels = {**labels, "worker": str(pid)}
+                key = (sample_name, tuple(labels.items()))
+                values[key] = values.get(key, 0.0) + value
+    return [
+        (name, metric_type, documentation,
+         [(sample_name, dict(labels), value) for (sample_name, labels), value in values.items()])
+        for name, (metric_type, documentation, values) in merged.items()
+    ]
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for name, metric_type, documentation, samples in (_merged_families() if _metrics_dir else _families()):
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for sample_name, labels, value in samples:
+            lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = Histogram(
+    "stage_seconds", "Time spent in each query pipeline stage.", ["stage"]
+)
+REQUEST_SECONDS = Histogram(
+    "http_request_seconds", "HTTP request latency until the response starts.", ["method", "route"]
+)
+REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route and status code.", ["method", "route", "status"]
+)
+RATE_LIMITED = Counter(
+    "rate_limited_total", "Requests rejected by a rate limit.", ["limiter"]
+)
+PROMPT_TOKENS = Histogram(
+    "prompt_tokens", "Estimated prompt tokens per LLM call after context packing.", buckets=TOKEN_BUCKETS
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total", "Tokens reported by the LLM provider.", ["kind"]
+)
+QUERIES = Counter(
+    "queries_total", "Queries answered, by where the answer came from.", ["source"]
+)
+
+
+_tracer = None
+if config.TRACING_ENABLED:
+    try:
+        from opentelemetry import trace
+        _tracer = trace.get_tracer("mortgagebot")
+    except ImportError:
+        logger.warning("TRACING_ENABLED is set but opentelemetry is not installed; tracing disabled")
+
+
+class stage:
+    """Time a block into ``stage_seconds{stage=name}`` (and a span when tracing)."""
+
+    __slots__ = ("name", "started", "span")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.span = None
+
+    def __enter__(self):
+        if _tracer is not None:
+            self.span = _tracer.start_as_current_span(self.name)
+            self.span.__enter__()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        STAGE_SECONDS.observe(time.perf_counter() - self.started, stage=self.name)
+        if self.span is not None:
+            self.span.__exit__(*exc)
+        return False
+
+
+def span(name: str):
+    """An OpenTelemetry span when tracing is on, otherwise a no-op context manager."""
+    if _tracer is None:
+        return nullcontext()
+    return _tracer.start_as_current_span(name)
@@ -1,101 +1,1531 @@
 import os
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import TYPE_CHECKING, List, Dict, Any, AsyncIterator, Iterator, Optional, Tuple
+from collections import Counter, OrderedDict
+from operator import itemgetter
 import logging
-import mailbox
 import hashlib
 import json
+import asyncio
+import random
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, contextmanager
+
+import numpy as np
+from openai import AsyncOpenAI, APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
 
-from langchain_community.document_loaders import (
-    DirectoryLoader, 
-    TextLoader, 
-    PyPDFLoader,
-    UnstructuredPDFLoader,
-    Docx2txtLoader
-)
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 from langchain_community.vectorstores import Chroma
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.documents import Document
-from langchain_core.runnables import RunnablePassthrough
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    BaseCallbackHandler,
+    CallbackManagerForRetrieverRun
+)
+from langchain_core.messages import SystemMessage
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables import RunnableLambda, RunnableParallel
 from langchain_core.output_parsers import StrOutputParser
 
 import config
+import metrics
+
+if TYPE_CHECKING:
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    from dedupe import Deduplicator
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+SOURCE_PATTERNS = ["*.pdf", "*.txt", "*.md", "*.docx"]
+
+_PROCESS_STARTED = time.time()
+
+
+@contextmanager
+def index_build_lock():
+    """Exclusive cross-process lock held while an index is built or synced.
+
+    API workers and the build_index CLI share DATA_DIR; only the lock
+    holder may check hashes, build, sync or swap versions.
+    """
+    import fcntl
+    config.ensure_data_dirs()
+    with open(config.INDEX_BUILD_LOCK_PATH, "a") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            logger.info("Another process is building the index; waiting for it to finish...")
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class CachedEmbeddings(Embeddings):
+    """Document embeddings backed by an on-disk, content-addressed SQLite cache.
+
+    Vectors are keyed by sha256(model + chunk text) and stored as float32
+    blobs, so index rebuilds only send new or changed chunks to the API.
+    Query embeddings pass straight through. The database is opened on first
+    use, so workers that only serve an index never touch it.
+    """
+
+    _LOOKUP_BATCH = 500
+
+    def __init__(self, embeddings: Embeddings, db_path: Path, model: str):
+        self.embeddings = embeddings
+        self.model = model
+        self.hits = 0
+        self.misses = 0
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the cache database on first use; call with ``_lock`` held."""
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\x00{text}".encode()).hexdigest()
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), self._LOOKUP_BATCH):
+                batch = keys[start:start + self._LOOKUP_BATCH]
+                rows = self._connection().execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch
+                )
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def _store(self, items: Dict[str, List[float]]):
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, vector) VALUES (?, ?, ?)",
+                [(key, self.model, np.asarray(vec, dtype=np.float32).tobytes()) for key, vec in items.items()]
+            )
+            conn.commit()
+
+    def _split(self, texts: List[str]):
+        keys = [self._key(text) for text in texts]
+        cached = self._lookup(list(dict.fromkeys(keys)))
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                missing.setdefault(key, text)
+        hit_count = sum(1 for key in keys if key in cached)
+        self.hits += hit_count
+        self.misses += len(missing)
+        logger.info(f"Embedding cache: {hit_count} cached, {len(missing)} to embed")
+        return keys, cached, missing
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, cached, missing = self._split(texts)
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            new = dict(zip(missing.keys(), vectors))
+            self._store(new)
+            cached.update(new)
+        return [cached[key] for key in keys]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, cached, missing = await asyncio.to_thread(self._split, texts)
+        if missing:
+            vectors = await self.embeddings.aembed_documents(list(missing.values()))
+            new = dict(zip(missing.keys(), vectors))
+            await asyncio.to_thread(self._store, new)
+            cached.update(new)
+        return [cached[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.embeddings.aembed_query(text)
+
+
+class EmbeddingBatcher(Embeddings):
+    """Concurrent, rate-limit-aware document embedding for index builds.
+
+    Texts are packed into requests of about ``batch_tokens`` estimated tokens
+    and up to ``concurrency`` requests run at once under a tokens-per-minute
+    budget. A 429 pauses every request for the server's Retry-After (or an
+    exponential backoff) and halves both the budget and the number of
+    requests in flight, which recover as requests succeed. Vectors are
+    returned in input order. Query embeddings pass straight through.
+    """
+
+    _MAX_BATCH_INPUTS = 2048
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model: str,
+        api_key: str,
+        base_url: Optional[str],
+        batch_tokens: int,
+        concurrency: int,
+        tpm: int,
+        max_retries: int
+    ):
+        self.embeddings = embeddings
+        self.model = model
+        self.api_key = api_key
+        self.base_url = base_url
+        self.batch_tokens = batch_tokens
+        self.concurrency = max(1, concurrency)
+        self.tpm = tpm
+        self.max_retries = max(1, max_retries)
+        self.requests = 0
+        self.rate_limited = 0
+        self._rate = float(tpm)
+        self._allowance = float(tpm)
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        # Requests allowed in flight; halved on a 429 and grown back by one per window of successes
+        self._window = float(self.concurrency)
+        self._in_flight = 0
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        # ~4 characters per token for English text; avoids a tokenizer round trip per chunk
+        return len(text) // 4 + 1
+
+    def _pack(self, texts: List[str]) -> List[Tuple[int, int, int]]:
+        """Split texts into contiguous (start, end, tokens) batches within the token budget."""
+        batches = []
+        start, tokens = 0, 0
+        for i, text in enumerate(texts):
+            cost = self.estimate_tokens(text)
+            if i > start and (tokens + cost > self.batch_tokens or i - start >= self._MAX_BATCH_INPUTS):
+                batches.append((start, i, tokens))
+                start, tokens = i, 0
+            tokens += cost
+        if start < len(texts):
+            batches.append((start, len(texts), tokens))
+        return batches
+
+    async def _acquire(self, tokens: int, lock: asyncio.Lock):
+        """Wait out any 429 pause, then take ``tokens`` from the per-minute budget."""
+        async with lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                if not self.tpm:
+                    return
+                self._allowance = min(self._rate, self._allowance + (now - self._refilled_at) * self._rate / 60)
+                self._refilled_at = now
+                # A batch larger than the whole budget still goes out once the budget is full
+                needed = min(tokens, self._rate)
+                if self._allowance >= needed:
+                    self._allowance -= needed
+                    return
+                await asyncio.sleep((needed - self._allowance) * 60 / self._rate)
+
+    def _on_rate_limited(self, delay: float):
+        self.rate_limited += 1
+        metrics.RATE_LIMITED.inc(limiter="openai_embeddings")
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        self._window = max(1.0, self._window / 2)
+        if self.tpm:
+            self._rate = max(self.tpm / 16, self._rate / 2)
+            self._allowance = min(self._allowance, 0.0)
+        logger.warning(
+            f"Embedding request rate limited; pausing {delay:.1f}s "
+            f"({int(self._window)} in flight" + (f", budget {self._rate:.0f} TPM)" if self.tpm else ")")
+        )
+
+    def _on_success(self):
+        self._window = min(float(self.concurrency), self._window + 1 / self._window)
+        if self.tpm:
+            self._rate = min(float(self.tpm), self._rate + self.tpm / 20)
+
+    @staticmethod
+    def _retry_after(error: RateLimitError) -> Optional[float]:
+        headers = error.response.headers
+        try:
+            if headers.get("retry-after-ms"):
+                return float(headers["retry-after-ms"]) / 1000
+            if headers.get("retry-after"):
+                return float(headers["retry-after"])
+        except ValueError:
+            pass
+        return None
+
+    async def _enter(self, gate: asyncio.Condition):
+        async with gate:
+            await gate.wait_for(lambda: self._in_flight < int(self._window))
+            self._in_flight += 1
+
+    async def _leave(self, gate: asyncio.Condition):
+        async with gate:
+            self._in_flight -= 1
+            gate.notify_all()
+
+    async def _embed_batch(
+        self,
+        client: AsyncOpenAI,
+        texts: List[str],
+        tokens: int,
+        gate: asyncio.Condition,
+        lock: asyncio.Lock
+    ) -> List[List[float]]:
+        for attempt in range(self.max_retries):
+            backoff = min(60.0, 2 ** attempt) * (1 + random.random() / 4)
+            last_attempt = attempt == self.max_retries - 1
+            await self._enter(gate)
+            try:
+                await self._acquire(tokens, lock)
+                self.requests += 1
+                response = await client.embeddings.create(model=self.model, input=texts)
+                self._on_success()
+                return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+            except RateLimitError as e:
+                if last_attempt:
+                    raise
+                self._on_rate_limited(self._retry_after(e) or backoff)
+                continue
+            except (APIConnectionError, APITimeoutError, InternalServerError) as e:
+                if last_attempt:
+                    raise
+                logger.warning(f"Embedding request failed ({e}); retrying in {backoff:.1f}s")
+            finally:
+                await self._leave(gate)
+            await asyncio.sleep(backoff)
+        raise RuntimeError("Embedding batch exhausted its retries")
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        batches = self._pack(texts)
+        gate = asyncio.Condition()
+        lock = asyncio.Lock()
+        rate_limited = self.rate_limited
+        started = time.perf_counter()
+        async with AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0) as client:
+            results = await asyncio.gather(*(
+                self._embed_batch(client, texts[start:end], tokens, gate, lock)
+                for start, end, tokens in batches
+            ))
+        logger.info(
+            f"Embedded {len(texts)} texts in {len(batches)} requests "
+            f"({self.rate_limited - rate_limited} rate limited, {time.perf_counter() - started:.2f}s)"
+        )
+        # gather keeps batch order and batches are contiguous, so this matches the input order
+        return [vector for batch in results for vector in batch]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.aembed_documents(texts))
+        # Called from code running inside an event loop (e.g. the API lifespan); use a private one
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            return pool.submit(asyncio.run, self.aembed_documents(texts)).result()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.embeddings.aembed_query(text)
+
+
+class QueryEmbedder(Embeddings):
+    """Query embeddings with an LRU cache and an async micro-batcher.
+
+    Vectors are cached per question text as float32 arrays. Async lookups
+    that miss are queued, and everything queued within ``window_ms`` (or
+    ``max_batch`` distinct texts) goes out as one embeddings request, so a
+    burst of concurrent questions costs a single round trip. Identical
+    questions in the same window share one slot.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache_size: int, window_ms: float, max_batch: int):
+        self.embeddings = embeddings
+        self.cache_size = cache_size
+        self.window = window_ms / 1000
+        self.max_batch = max(1, max_batch)
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._batch: Optional[Dict[str, asyncio.Future]] = None
+        self.hits = 0
+        self.misses = 0
+        self.api_calls = 0
+
+    def _get(self, text: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._cache.get(text)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(text)
+            self.hits += 1
+            return vector
+
+    def _put(self, text: str, vector: List[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            self._cache[text] = array
+            self._cache.move_to_end(text)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return array
+
+    def embed_query(self, text: str) -> List[float]:
+        with metrics.stage("query_embedding"):
+            vector = self._get(text)
+            if vector is None:
+                with self._lock:
+                    self.api_calls += 1
+                vector = self._put(text, self.embeddings.embed_query(text))
+            return vector.tolist()
+
+    async def aembed_query(self, text: str) -> List[float]:
+        with metrics.stage("query_embedding"):
+            return await self._aembed_query(text)
+
+    async def _aembed_query(self, text: str) -> List[float]:
+        vector = self._get(text)
+        if vector is not None:
+            return vector.tolist()
+        loop = asyncio.get_running_loop()
+        if self._batch is None:
+            self._batch = {}
+            loop.call_later(self.window, self._flush, self._batch)
+        future = self._batch.get(text)
+        if future is None:
+            future = self._batch[text] = loop.create_future()
+        if len(self._batch) >= self.max_batch:
+            self._flush(self._batch)
+        # Shielded so one caller being cancelled doesn't fail the others waiting on the same text
+        return (await asyncio.shield(future)).tolist()
+
+    def _flush(self, batch: Dict[str, asyncio.Future]):
+        if self._batch is not batch:
+            return
+        self._batch = None
+        asyncio.get_running_loop().create_task(self._embed_batch(batch))
+
+    async def _embed_batch(self, batch: Dict[str, asyncio.Future]):
+        texts = list(batch)
+        with self._lock:
+            self.api_calls += 1
+        try:
+            vectors = await self.embeddings.aembed_documents(texts)
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for text, vector in zip(texts, vectors):
+            array = self._put(text, vector)
+            if not batch[text].done():
+                batch[text].set_result(array)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._cache),
+                "max_entries": self.cache_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "api_calls": self.api_calls,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+class VectorRetriever(BaseRetriever):
+    """Similarity retriever with a native async path.
+
+    The stock Chroma retriever runs the whole sync search in a thread for
+    ``ainvoke``; here the query embedding goes through the async OpenAI
+    client and only the local Chroma lookup is offloaded.
+    """
+
+    vectorstore: Any
+    embeddings: Any
+    k: int = config.RETRIEVAL_K
+
+    def search_by_vector(self, embedding: List[float], k: Optional[int] = None) -> List[Document]:
+        with metrics.stage("vector_search"):
+            return self.vectorstore.similarity_search_by_vector(embedding, k=k or self.k)
+
+    async def asearch_by_vector(self, embedding: List[float], k: Optional[int] = None) -> List[Document]:
+        return await asyncio.to_thread(self.search_by_vector, embedding, k)
+
+    def get_vectors(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        """Stored embeddings for the given chunk IDs, read from the local collection."""
+        found = self.vectorstore.get(ids=ids, include=["embeddings"])
+        return {
+            chunk_id: np.asarray(vector, dtype=np.float32)
+            for chunk_id, vector in zip(found["ids"], found["embeddings"])
+        }
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self.search_by_vector(self.embeddings.embed_query(query))
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return await self.asearch_by_vector(await self.embeddings.aembed_query(query))
+
+
+class LexicalIndex:
+    """In-process BM25 index over the chunks of one Chroma collection.
+
+    Postings are kept CSR-style in numpy arrays (per-term offsets into chunk
+    positions and term frequencies) and persisted together with the chunk
+    texts as a single compressed ``.npz`` next to the collection, so loading
+    it needs no tokenizing and a query is a few array slices.
+    """
+
+    K1 = 1.5
+    B = 0.75
+    _TOKEN = re.compile(r"[a-z0-9]+(?:[.\-/][a-z0-9]+)*")
+    _STOPWORDS = frozenset(
+        "a an and are as at be but by can do does for from how i if in is it me my of on or "
+        "should so than that the their there this to was what when where which who why will "
+        "with you your".split()
+    )
+
+    def __init__(
+        self,
+        terms: List[str],
+        offsets: np.ndarray,
+        postings: np.ndarray,
+        frequencies: np.ndarray,
+        doc_lengths: np.ndarray,
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        source_hash: str
+    ):
+        self.terms = terms
+        self.vocab = {term: i for i, term in enumerate(terms)}
+        self.offsets = offsets
+        self.postings = postings
+        self.frequencies = frequencies
+        self.doc_lengths = doc_lengths
+        self.ids = ids
+        self.texts = texts
+        self.metadatas = metadatas
+        self.source_hash = source_hash
+        n = len(ids)
+        document_frequency = np.diff(offsets)
+        self.idf = np.log(1 + (n - document_frequency + 0.5) / (document_frequency + 0.5)).astype(np.float32)
+        avg_length = float(doc_lengths.mean()) if n else 0.0
+        self._length_norm = (self.K1 * (1 - self.B + self.B * doc_lengths / avg_length)).astype(np.float32) if n else doc_lengths
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def tokenize(cls, text: str) -> List[str]:
+        """Lowercased word tokens; compounds like ``5-year`` or ``4.79`` also yield their parts."""
+        tokens = []
+        for token in cls._TOKEN.findall(text.lower()):
+            if token in cls._STOPWORDS:
+                continue
+            tokens.append(token)
+            if not token.isalnum():
+                tokens.extend(part for part in re.split(r"[.\-/]", token) if part not in cls._STOPWORDS)
+        return tokens
+
+    @classmethod
+    def build(cls, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]], source_hash: str) -> "LexicalIndex":
+        postings_by_term: Dict[str, List[Tuple[int, int]]] = {}
+        doc_lengths = np.zeros(len(ids), dtype=np.int32)
+        for doc, text in enumerate(texts):
+            tokens = cls.tokenize(text)
+            doc_lengths[doc] = len(tokens)
+            for term, frequency in Counter(tokens).items():
+                postings_by_term.setdefault(term, []).append((doc, frequency))
+        terms = sorted(postings_by_term)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        for i, term in enumerate(terms):
+            offsets[i + 1] = offsets[i] + len(postings_by_term[term])
+        postings = np.empty(int(offsets[-1]), dtype=np.int32)
+        frequencies = np.empty(int(offsets[-1]), dtype=np.float32)
+        for i, term in enumerate(terms):
+            entries = postings_by_term[term]
+            postings[offsets[i]:offsets[i + 1]] = [doc for doc, _ in entries]
+            frequencies[offsets[i]:offsets[i + 1]] = [frequency for _, frequency in entries]
+        return cls(terms, offsets, postings, frequencies, doc_lengths, ids, texts, metadatas, source_hash)
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore: Chroma, source_hash: str, page_size: int = 5000) -> "LexicalIndex":
+        ids, texts, metadatas = [], [], []
+        offset = 0
+        while True:
+            page = vectorstore.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            ids.extend(page["ids"])
+            texts.extend(page["documents"])
+            metadatas.extend(metadata or {} for metadata in page["metadatas"])
+            offset += len(page["ids"])
+        return cls.build(ids, texts, metadatas, source_hash)
+
+    def save(self, path: Path):
+        meta = json.dumps({
+            "source_hash": self.source_hash,
+            "terms": self.terms,
+            "ids": self.ids,
+            "texts": self.texts,
+            "metadatas": self.metadatas
+        })
+        # Only the index build lock holder saves, so one temp name is enough
+        tmp_file = path.with_suffix(".tmp")
+        with open(tmp_file, "wb") as f:
+            np.savez_compressed(
+                f,
+                offsets=self.offsets,
+                postings=self.postings,
+                frequencies=self.frequencies,
+                doc_lengths=self.doc_lengths,
+                meta=np.frombuffer(meta.encode(), dtype=np.uint8)
+            )
+        tmp_file.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "LexicalIndex":
+        with np.load(path) as data:
+            meta = json.loads(data["meta"].tobytes().decode())
+            return cls(
+                meta["terms"], data["offsets"], data["postings"], data["frequencies"], data["doc_lengths"],
+                meta["ids"], meta["texts"], meta["metadatas"], meta["source_hash"]
+            )
+
+    def is_keyword_query(self, query: str, max_terms: int) -> bool:
+        """Short queries built on exact tokens (acronyms, numbers) that all occur in the corpus."""
+        terms = [t for t in self._TOKEN.findall(query.lower()) if t not in self._STOPWORDS]
+        if not terms or len(terms) > max_terms or any(t not in self.vocab for t in terms):
+            return False
+        has_number = any(any(c.isdigit() for c in t) for t in terms)
+        return has_number or re.search(r"\b[A-Z]{2,}\b", query) is not None
+
+    def search(self, query: str, k: int) -> List[Document]:
+        term_ids = [self.vocab[t] for t in dict.fromkeys(self.tokenize(query)) if t in self.vocab]
+        if not term_ids or not self.ids:
+            return []
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term_id in term_ids:
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            docs = self.postings[start:end]
+            frequencies = self.frequencies[start:end]
+            scores[docs] += self.idf[term_id] * frequencies * (self.K1 + 1) / (frequencies + self._length_norm[docs])
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            Document(page_content=self.texts[i], metadata=self.metadatas[i])
+            for i in top if scores[i] > 0
+        ]
+
+
+def mmr_select(relevance: np.ndarray, vectors: np.ndarray, k: int, lambda_mult: float) -> List[int]:
+    """Greedy maximal-marginal-relevance over unit ``vectors``; returns the chosen row indices in order."""
+    similarity = vectors @ vectors.T
+    redundancy = np.zeros(len(relevance), dtype=np.float32)
+    available = np.ones(len(relevance), dtype=bool)
+    selected: List[int] = []
+    for _ in range(min(k, len(relevance))):
+        scores = np.where(available, lambda_mult * relevance - (1 - lambda_mult) * redundancy, -np.inf)
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, similarity[best])
+    return selected
+
+
+class HybridRetriever(BaseRetriever):
+    """Vector search fused with the BM25 lexical index by reciprocal rank, then reranked.
+
+    Both sides contribute ``candidate_k`` results and the top ``pool_k`` by
+    RRF score form the candidate pool. Keyword queries (see
+    LexicalIndex.is_keyword_query) take their pool from the lexical index
+    alone, without embedding the query. Without a lexical index the pool is
+    plain vector search.
+
+    With ``rerank`` the pool is cut down to ``k`` chunks on CPU: relevance
+    blends cosine similarity to the query with the share of query terms a
+    chunk contains, and MMR over the stored chunk embeddings drops chunks
+    that repeat ones already chosen (overlapping or near-duplicate pages).
+    """
+
+    vector: VectorRetriever
+    lexical: Optional[Any] = None
+    k: int = config.RETRIEVAL_K
+    candidate_k: int = config.HYBRID_CANDIDATE_K
+    rrf_k: int = config.HYBRID_RRF_K
+    lexical_only_max_terms: int = config.HYBRID_LEXICAL_ONLY_MAX_TERMS
+    rerank: bool = config.RERANK_ENABLED
+    pool_k: int = config.RERANK_POOL_K
+    mmr_lambda: float = config.RERANK_MMR_LAMBDA
+    lexical_weight: float = config.RERANK_LEXICAL_WEIGHT
+
+    def is_lexical_only(self, query: str) -> bool:
+        return self.lexical is not None and self.lexical.is_keyword_query(query, self.lexical_only_max_terms)
+
+    def _pool_size(self) -> int:
+        return max(self.pool_k, self.k) if self.rerank else self.k
+
+    def _vector_k(self) -> int:
+        if self.lexical is None and not self.rerank:
+            return self.k
+        return max(self.candidate_k, self._pool_size())
+
+    def _fuse(self, *rankings: List[Document]) -> List[Document]:
+        scores: Dict[str, float] = {}
+        docs: Dict[str, Document] = {}
+        for ranking in rankings:
+            for rank, doc in enumerate(ranking):
+                key = doc.metadata.get("chunk_id") or doc.page_content
+                scores[key] = scores.get(key, 0.0) + 1 / (self.rrf_k + rank + 1)
+                docs.setdefault(key, doc)
+        return [docs[key] for key in sorted(scores, key=scores.get, reverse=True)[:self._pool_size()]]
+
+    def _lexical_candidates(self, query: str, embedding: Optional[List[float]]) -> Tuple[List[Document], bool]:
+        if self.lexical is None:
+            return [], False
+        with metrics.stage("lexical_search"):
+            lexical_docs = self.lexical.search(query, max(self.candidate_k, self._pool_size()))
+        return lexical_docs, embedding is None and bool(lexical_docs) and self.is_lexical_only(query)
+
+    def _rerank(self, query: str, embedding: Optional[List[float]], pool: List[Document]) -> List[Document]:
+        if not self.rerank or len(pool) <= 1:
+            return pool[:self.k]
+        with metrics.stage("rerank"):
+            return self._mmr_rerank(query, embedding, pool)
+
+    def _mmr_rerank(self, query: str, embedding: Optional[List[float]], pool: List[Document]) -> List[Document]:
+        ids = [doc.metadata.get("chunk_id") for doc in pool]
+        stored = self.vector.get_vectors([chunk_id for chunk_id in ids if chunk_id]) if all(ids) else {}
+        if len(stored) != len(pool):
+            # Chunks indexed before stable IDs can't be matched to their vectors; keep the fused order
+            return pool[:self.k]
+        vectors = np.stack([stored[chunk_id] for chunk_id in ids])
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        
+        query_terms = set(LexicalIndex.tokenize(query))
+        overlap = np.array([
+            len(query_terms.intersection(LexicalIndex.tokenize(doc.page_content))) / len(query_terms)
+            if query_terms else 0.0
+            for doc in pool
+        ], dtype=np.float32)
+        if embedding is None:
+            relevance = overlap
+        else:
+            query_vector = np.array(embedding, dtype=np.float32)
+            query_vector /= max(float(np.linalg.norm(query_vector)), 1e-12)
+            relevance = (1 - self.lexical_weight) * (vectors @ query_vector) + self.lexical_weight * overlap
+        return [pool[i] for i in mmr_select(relevance, vectors, self.k, self.mmr_lambda)]
+
+    def _candidate_pool(
+        self, lexical_docs: List[Document], vector_docs: Optional[List[Document]]
+    ) -> List[Document]:
+        if vector_docs is None:
+            return lexical_docs[:self._pool_size()]
+        if self.lexical is None:
+            return vector_docs[:self._pool_size()]
+        return self._fuse(vector_docs, lexical_docs)
+
+    def search(self, query: str, embedding: Optional[List[float]] = None) -> List[Document]:
+        lexical_docs, lexical_only = self._lexical_candidates(query, embedding)
+        vector_docs = None
+        if not lexical_only:
+            if embedding is None:
+                embedding = self.vector.embeddings.embed_query(query)
+            vector_docs = self.vector.search_by_vector(embedding, self._vector_k())
+        return self._rerank(query, embedding, self._candidate_pool(lexical_docs, vector_docs))
+
+    async def asearch(self, query: str, embedding: Optional[List[float]] = None) -> List[Document]:
+        lexical_docs, lexical_only = self._lexical_candidates(query, embedding)
+        vector_docs = None
+        if not lexical_only:
+            if embedding is None:
+                embedding = await self.vector.embeddings.aembed_query(query)
+            vector_docs = await self.vector.asearch_by_vector(embedding, self._vector_k())
+        pool = self._candidate_pool(lexical_docs, vector_docs)
+        if not self.rerank:
+            return pool[:self.k]
+        return await asyncio.to_thread(self._rerank, query, embedding, pool)
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self.search(query)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return await self.asearch(query)
+
+
+class ContextBudgeter:
+    """Packs ranked chunks into a fixed token budget for the prompt context.
+
+    Tokens are counted with the LLM's tiktoken encoding (a ~4 chars/token
+    estimate if it can't be loaded). Text a chunk repeats from another chunk
+    of the same source, as the splitter's overlap produces, is cut first;
+    then chunks are taken in rank order until the budget is spent, so the
+    lowest-ranked ones are the ones dropped or truncated.
+    """
+
+    SEPARATOR = "\n\n"
+    _MIN_OVERLAP_CHARS = 40
+    _MIN_PARTIAL_TOKENS = 64
+
+    def __init__(self, model: str, budget_tokens: int, max_overlap_chars: int):
+        self.budget_tokens = budget_tokens
+        self.max_overlap_chars = max_overlap_chars
+        self._encoding = None
+        try:
+            import tiktoken
+            try:
+                self._encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self._encoding = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            logger.warning(f"tiktoken unavailable ({e}); estimating context tokens from length")
+
+    def count(self, text: str) -> int:
+        if self._encoding is None:
+            return len(text) // 4 + 1
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    def _truncate(self, text: str, tokens: int) -> str:
+        if self._encoding is None:
+            return text[:tokens * 4]
+        return self._encoding.decode(self._encoding.encode(text, disallowed_special=())[:tokens])
+
+    def _overlap(self, earlier: str, later: str) -> int:
+        """Length of the longest suffix of ``earlier`` that starts ``later``."""
+        for size in range(min(len(earlier), len(later), self.max_overlap_chars), self._MIN_OVERLAP_CHARS - 1, -1):
+            if earlier.endswith(later[:size]):
+                return size
+        return 0
+
+    def _dedupe(self, docs: List[Document]) -> List[str]:
+        """Chunk texts with exact repeats emptied and overlap with higher-ranked same-source chunks cut."""
+        texts = []
+        seen = set()
+        for i, doc in enumerate(docs):
+            text = doc.page_content
+            if text in seen:
+                texts.append("")
+                continue
+            seen.add(text)
+            source = doc.metadata.get("source")
+            for earlier in docs[:i]:
+                if source is None or earlier.metadata.get("source") != source:
+                    continue
+                # The higher-ranked chunk may come just before or just after this one in the source
+                head = self._overlap(earlier.page_content, text)
+                if head:
+                    text = text[head:].lstrip()
+                tail = self._overlap(text, earlier.page_content)
+                if tail:
+                    text = text[:-tail].rstrip()
+            texts.append(text)
+        return texts
+
+    def pack(self, docs: List[Document]) -> Tuple[List[Document], Dict[str, int]]:
+        """Chunks (possibly trimmed) that fit the budget, in rank order, and token stats."""
+        separator_tokens = self.count(self.SEPARATOR)
+        packed: List[Document] = []
+        used = 0
+        # Chunk text only; ``used`` also counts the separators between chunks
+        packed_text = 0
+        for doc, text in zip(docs, self._dedupe(docs)):
+            if not text:
+                continue
+            overhead = separator_tokens if packed else 0
+            tokens = self.count(text)
+            if used + overhead + tokens > self.budget_tokens:
+                remaining = self.budget_tokens - used - overhead
+                if remaining >= self._MIN_PARTIAL_TOKENS:
+                    text = self._truncate(text, remaining)
+                    packed.append(Document(page_content=text, metadata=doc.metadata))
+                    used += overhead + self.count(text)
+                    packed_text += self.count(text)
+                break
+            packed.append(Document(page_content=text, metadata=doc.metadata))
+            used += overhead + tokens
+            packed_text += tokens
+        retrieved_tokens = sum(self.count(doc.page_content) for doc in docs)
+        return packed, {
+            "retrieved_chunks": len(docs),
+            "context_chunks": len(packed),
+            "retrieved_tokens": retrieved_tokens,
+            "context_tokens": used,
+            "trimmed_tokens": retrieved_tokens - packed_text
+        }
+
+
+class LLMMetrics(BaseCallbackHandler):
+    """Records per-call LLM latency, time to the first streamed token and token usage.
+
+    Also totals the prompt tokens the provider served from its prefix cache,
+    for ``/cache-stats``.
+    """
+
+    # Called on the event loop instead of an executor: the bookkeeping is a few dict operations
+    run_inline = True
+
+    def __init__(self):
+        # run_id -> [start time, first token seen]
+        self._runs: Dict[Any, List[Any]] = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: Any, **kwargs: Any):
+        self._runs[run_id] = [time.perf_counter(), False]
+
+    def on_llm_new_token(self, token: str, *, run_id: Any, **kwargs: Any):
+        run = self._runs.get(run_id)
+        if run is not None and not run[1]:
+            run[1] = True
+            metrics.STAGE_SECONDS.observe(time.perf_counter() - run[0], stage="llm_first_token")
+
+    def on_llm_end(self, response: LLMResult, *, run_id: Any, **kwargs: Any):
+        run = self._runs.pop(run_id, None)
+        if run is not None:
+            metrics.STAGE_SECONDS.observe(time.perf_counter() - run[0], stage="llm")
+        prompt_tokens = completion_tokens = cached_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                prompt_tokens += usage.get("input_tokens", 0)
+                completion_tokens += usage.get("output_tokens", 0)
+                cached_tokens += (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+        if not prompt_tokens:
+            return
+        metrics.LLM_TOKENS.inc(prompt_tokens, kind="prompt")
+        metrics.LLM_TOKENS.inc(completion_tokens, kind="completion")
+        metrics.LLM_TOKENS.inc(cached_tokens, kind="cached_prompt")
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += prompt_tokens
+            self.cached_tokens += cached_tokens
+        logger.info(f"LLM prompt: {prompt_tokens} tokens, {cached_tokens} from provider cache")
+
+    def on_llm_error(self, error: BaseException, *, run_id: Any, **kwargs: Any):
+        self._runs.pop(run_id, None)
+
+    def prompt_cache_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "prompt_tokens": self.prompt_tokens,
+                "cached_tokens": self.cached_tokens,
+                "uncached_tokens": self.prompt_tokens - self.cached_tokens,
+                "cached_ratio": self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+            }
+
+
+class AnswerCache:
+    """LRU + TTL cache of query results in front of the QA chain.
+
+    Lookups first try the normalized question text, then fall back to a
+    cosine-similarity scan over the cached query embeddings. Everything is
+    dropped whenever the index source hash changes.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, similarity_threshold: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.source_hash: Optional[str] = None
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: List[str] = []
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def normalize(question: str) -> str:
+        question = re.sub(r"\s+", " ", question.strip().lower())
+        return question.rstrip("?!. ")
+
+    @staticmethod
+    def _unit_vector(embedding: List[float]) -> np.ndarray:
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def sync_source_hash(self, source_hash: str):
+        with self._lock:
+            if source_hash != self.source_hash:
+                if self._entries:
+                    logger.info(f"Source hash changed ({self.source_hash} -> {source_hash}); clearing answer cache")
+                self._entries.clear()
+                self._matrix = None
+                self.source_hash = source_hash
+
+    def _expire(self, now: float):
+        expired = [k for k, e in self._entries.items() if now - e["created_at"] > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+
+    def get_exact(self, question: str) -> Optional[Dict[str, Any]]:
+        key = self.normalize(question)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry["created_at"] > self.ttl_seconds:
+                del self._entries[key]
+                self._matrix = None
+                return None
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            return dict(entry["result"])
+
+    def get_similar(self, embedding: Optional[List[float]]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._expire(time.time())
+            if self._matrix is None:
+                # Entries cached without an embedding (lexical-only queries) are exact-match only
+                self._matrix_keys = [k for k, e in self._entries.items() if e["embedding"] is not None]
+                vectors = [self._entries[k]["embedding"] for k in self._matrix_keys]
+                self._matrix = np.stack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+            if embedding is None or not self._matrix_keys:
+                self.misses += 1
+                return None
+            scores = self._matrix @ self._unit_vector(embedding)
+            best = int(np.argmax(scores))
+            if scores[best] < self.similarity_threshold:
+                self.misses += 1
+                return None
+            key = self._matrix_keys[best]
+            self._entries.move_to_end(key)
+            self.semantic_hits += 1
+            return dict(self._entries[key]["result"])
+
+    def put(self, question: str, embedding: Optional[List[float]], result: Dict[str, Any]):
+        key = self.normalize(question)
+        with self._lock:
+            self._entries[key] = {
+                "result": result,
+                "embedding": self._unit_vector(embedding) if embedding is not None else None,
+                "created_at": time.time()
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._matrix = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+                "source_hash": self.source_hash
+            }
+
+
+class RebuildJobStore:
+    """Rebuild job records in SQLite under DATA_DIR, shared by every worker process.
+
+    The worker that starts a rebuild is rarely the one that answers the
+    status poll, so jobs cannot live in process memory. At most one job is
+    ``running`` at a time; a running job whose process has exited is marked
+    failed when it is next read.
+    """
+
+    _COLUMNS = ("job_id", "status", "started_at", "finished_at", "previous_version", "version", "error")
+
+    def __init__(self, db_path: Path, max_jobs: int = 20):
+        self.db_path = db_path
+        self.max_jobs = max_jobs
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_id TEXT PRIMARY KEY, status TEXT NOT NULL, started_at REAL NOT NULL, finished_at REAL, "
+                "previous_version TEXT, version TEXT, error TEXT, pid INTEGER NOT NULL)"
+            )
+            # Taken up front so two workers cannot both see no running job and start one
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _alive(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def _reap(self, conn: sqlite3.Connection):
+        for job_id, pid in conn.execute("SELECT job_id, pid FROM jobs WHERE status = 'running'").fetchall():
+            if pid != os.getpid() and not self._alive(pid):
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', finished_at = ?, error = ? WHERE job_id = ?",
+                    (time.time(), "Worker exited before the rebuild finished", job_id)
+                )
+
+    def _row(self, conn: sqlite3.Connection, where: str, params: Tuple) -> Optional[Dict[str, Any]]:
+        row = conn.execute(f"SELECT {', '.join(self._COLUMNS)} FROM jobs WHERE {where}", params).fetchone()
+        return dict(zip(self._COLUMNS, row)) if row is not None else None
+
+    def start(self, previous_version: str) -> Tuple[Dict[str, Any], bool]:
+        """The new job record and True, or the already running job and False."""
+        with self._transaction() as conn:
+            self._reap(conn)
+            running = self._row(conn, "status = 'running'", ())
+            if running is not None:
+                return running, False
+            job = {
+                "job_id": os.urandom(8).hex(),
+                "status": "running",
+                "started_at": time.time(),
+                "finished_at": None,
+                "previous_version": previous_version,
+                "version": None,
+                "error": None
+            }
+            conn.execute(
+                f"INSERT INTO jobs ({', '.join(self._COLUMNS)}, pid) VALUES ({', '.join('?' * len(self._COLUMNS))}, ?)",
+                (*job.values(), os.getpid())
+            )
+            conn.execute(
+                "DELETE FROM jobs WHERE job_id NOT IN (SELECT job_id FROM jobs ORDER BY started_at DESC LIMIT ?)",
+                (self.max_jobs,)
+            )
+            return job, True
+
+    def finish(self, job_id: str, status: str, version: Optional[str] = None, error: Optional[str] = None):
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, version = ?, error = ? WHERE job_id = ?",
+                (status, time.time(), version, error, job_id)
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._transaction() as conn:
+            self._reap(conn)
+            return self._row(conn, "job_id = ?", (job_id,))
+
 
 class MortgageRAG:
     
-    def __init__(self):
+    _MAX_REBUILD_JOBS = 20
+    
+    def __init__(self, build: bool = True):
         self.embeddings = None
+        self.document_embeddings = None
         self.vectorstore = None
         self.retriever = None
         self.llm = None
         self.qa_chain = None
+        self.answer_cache = None
+        # Directory of the live index; CHROMA_DB_DIR itself for indexes built before versioning
+        self.index_dir = config.CHROMA_DB_DIR
+        self._swap_lock = threading.Lock()
+        self.rebuild_jobs = RebuildJobStore(config.REBUILD_JOBS_PATH, self._MAX_REBUILD_JOBS)
+        self._pointer_checked_at = time.monotonic()
+        self.index_chunks = 0
+        self.context_budgeter = ContextBudgeter(
+            config.LLM_MODEL,
+            budget_tokens=config.CONTEXT_TOKEN_BUDGET,
+            max_overlap_chars=config.CHUNK_OVERLAP
+        )
+        
+        if config.ANSWER_CACHE_ENABLED:
+            self.answer_cache = AnswerCache(
+                max_entries=config.ANSWER_CACHE_MAX_ENTRIES,
+                ttl_seconds=config.ANSWER_CACHE_TTL_SECONDS,
+                similarity_threshold=config.ANSWER_CACHE_SIMILARITY_THRESHOLD
+            )
         
+        api_key = config.require_openai_api_key()
         logger.info("Initializing OpenAI embeddings...")
         self.embeddings = OpenAIEmbeddings(
             model=config.EMBEDDING_MODEL,
-            openai_api_key=config.OPENAI_API_KEY
+            openai_api_key=api_key,
+            base_url=config.OPENAI_BASE_URL,
+            # tiktoken pre-tokenization only applies to the real OpenAI API
+            check_embedding_ctx_length=config.OPENAI_BASE_URL is None
+        )
+        self.query_embeddings = QueryEmbedder(
+            self.embeddings,
+            cache_size=config.QUERY_EMBEDDING_CACHE_SIZE,
+            window_ms=config.QUERY_EMBEDDING_BATCH_WINDOW_MS,
+            max_batch=config.QUERY_EMBEDDING_MAX_BATCH
+        )
+        self.document_embeddings = CachedEmbeddings(
+            EmbeddingBatcher(
+                self.embeddings,
+                model=config.EMBEDDING_MODEL,
+                api_key=api_key,
+                base_url=config.OPENAI_BASE_URL,
+                batch_tokens=config.EMBEDDING_BATCH_TOKENS,
+                concurrency=config.EMBEDDING_CONCURRENCY,
+                tpm=config.EMBEDDING_TPM,
+                max_retries=config.EMBEDDING_MAX_RETRIES
+            ),
+            config.EMBEDDING_CACHE_PATH,
+            config.EMBEDDING_MODEL
         )
         
         logger.info(f"Initializing LLM: {config.LLM_MODEL}")
+        self.llm_metrics = LLMMetrics()
         self.llm = ChatOpenAI(
             model=config.LLM_MODEL,
             temperature=config.LLM_TEMPERATURE,
-            openai_api_key=config.OPENAI_API_KEY
+            openai_api_key=api_key,
+            base_url=config.OPENAI_BASE_URL,
+            # Usage (including cached prompt tokens) is only reported on streams when asked for
+            stream_usage=True,
+            callbacks=[self.llm_metrics]
         )
         
-        self._initialize_vectorstore()
+        self._initialize_vectorstore(build)
+        metrics.register_collector(self._collect_metrics)
     
-    def _initialize_vectorstore(self):
+    def _collect_metrics(self) -> List[metrics.Family]:
+        """Index size and cache counters, read from the components that already track them."""
+        query = self.query_embeddings.stats()
+        families = [
+            ("index_chunks", "gauge", "Chunks in the active index.", [({}, self.index_chunks)]),
+            ("query_embedding_cache_lookups_total", "counter", "Query embedding cache lookups.", [
+                ({"result": "hit"}, query["hits"]), ({"result": "miss"}, query["misses"])
+            ]),
+            ("query_embedding_api_calls_total", "counter", "Embedding API calls for queries.", [
+                ({}, query["api_calls"])
+            ]),
+        ]
+        if self.answer_cache is not None:
+            answers = self.answer_cache.stats()
+            families += [
+                ("answer_cache_lookups_total", "counter", "Answer cache lookups.", [
+                    ({"result": "exact_hit"}, answers["exact_hits"]),
+                    ({"result": "semantic_hit"}, answers["semantic_hits"]),
+                    ({"result": "miss"}, answers["misses"])
+                ]),
+                ("answer_cache_entries", "gauge", "Answers currently cached.", [({}, answers["entries"])]),
+            ]
+        return families
+    
+    def _initialize_vectorstore(self, build: bool = True):
+        """Open the index; without ``build``, never load documents or embed (install a snapshot or open as is)."""
         try:
-            # Check if forced rebuild is requested via environment variable
-            if config.FORCE_REBUILD_INDEX:
-                logger.info("FORCE_REBUILD_INDEX=true detected. Rebuilding vectorstore...")
-                if config.CHROMA_DB_DIR.exists():
-                    import shutil
-                    shutil.rmtree(config.CHROMA_DB_DIR)
-                    config.CHROMA_DB_DIR.mkdir(parents=True, exist_ok=True)
-                self._build_vectorstore_from_documents()
-            elif config.CHROMA_DB_DIR.exists() and any(config.CHROMA_DB_DIR.iterdir()):
-                # Check if source files have changed since last build
-                current_hash = self._calculate_source_hash()
-                stored_hash = self._get_stored_hash()
-                
-                if current_hash != stored_hash:
-                    logger.info(f"Source files changed (hash mismatch). Rebuilding vectorstore...")
-                    logger.info(f"Stored: {stored_hash}, Current: {current_hash}")
-                    import shutil
-                    shutil.rmtree(config.CHROMA_DB_DIR)
-                    config.CHROMA_DB_DIR.mkdir(parents=True, exist_ok=True)
-                    self._build_vectorstore_from_documents()
-                    self._store_hash(current_hash)
+            if config.INDEX_READ_ONLY:
+                self._open_active_index()
+                return
+            with index_build_lock():
+                if config.INDEX_SNAPSHOT:
+                    self._install_snapshot(config.INDEX_SNAPSHOT, config.INDEX_SNAPSHOT_SHA256)
+                elif not build:
+                    self._open_active_index(publish=True)
                 else:
-                    logger.info("Loading existing ChromaDB vectorstore...")
-                    self.vectorstore = Chroma(
-                        collection_name=config.COLLECTION_NAME,
-                        embedding_function=self.embeddings,
-                        persist_directory=str(config.CHROMA_DB_DIR)
-                    )
-                    logger.info(f"Loaded vectorstore with {self.vectorstore._collection.count()} documents")
-            else:
-                logger.info("No existing vectorstore found. Creating new one...")
-                self._build_vectorstore_from_documents()
-                self._store_hash(self._calculate_source_hash())
-            
-            self.retriever = self.vectorstore.as_retriever(
-                search_kwargs={"k": config.RETRIEVAL_K}
-            )
+                    self._prepare_index()
+        except Exception as e:
+            logger.error(f"Error initializing vectorstore: {e}")
+            raise
+    
+    def _install_snapshot(self, source: str, expected_sha256: Optional[str] = None):
+        """Activate a prebuilt snapshot as is: no hash check, sync or embedding. Call with index_build_lock held."""
+        from snapshot import install_snapshot
+        self.index_dir = self._resolve_index_dir()
+        index_dir = install_snapshot(source, config.INDEX_VERSIONS_DIR, self._manifest_settings(), expected_sha256)
+        logger.info(f"Serving index snapshot {index_dir.name}")
+        self._activate(index_dir, self._open_vectorstore(index_dir))
+    
+    def export_snapshot(self, output: Path) -> Dict[str, Any]:
+        """Package the active index version as a snapshot archive (see snapshot.py)."""
+        from snapshot import create_snapshot
+        with index_build_lock():
+            return create_snapshot(self.index_dir, output, self._manifest_settings())
+    
+    def _open_active_index(self, publish: bool = False):
+        """Serve whatever index is active without building or syncing it.
+
+        Read-only workers write nothing. With ``publish`` (index_build_lock
+        held) a missing lexical index is saved for them first.
+        """
+        index_dir = self._resolve_index_dir()
+        if not self._has_index(index_dir) or self._index_chunk_count(index_dir) == 0:
+            raise RuntimeError(f"No usable index in {index_dir}; run `python build_index.py` first")
+        logger.info(f"Opening index {index_dir}" + ("" if publish else " read-only"))
+        self.index_dir = index_dir
+        self._activate(index_dir, self._open_vectorstore(index_dir), publish=publish)
+    
+    def _prepare_index(self):
+        """Load, sync or build the index. Call with index_build_lock held."""
+        self.index_dir = self._resolve_index_dir()
+        logger.info(f"Active index directory: {self.index_dir}")
+        
+        # Another worker that started alongside this one may already have done the forced rebuild
+        if config.FORCE_REBUILD_INDEX and self._built_since_start(self.index_dir):
+            logger.info("FORCE_REBUILD_INDEX=true, but the active index was built after this process started")
+            vectorstore = self._open_vectorstore(self.index_dir)
+            self._activate(self.index_dir, vectorstore)
+        elif config.FORCE_REBUILD_INDEX:
+            logger.info("FORCE_REBUILD_INDEX=true detected. Building a new index version...")
+            self._activate(*self._build_index_version())
+        elif self._has_index(self.index_dir):
+            # Check if source files have changed since last build
+            current_hash = self._calculate_source_hash()
+            stored_hash = self._get_stored_hash(self.index_dir)
             
-            self._create_qa_chain()
+            manifest = self._get_manifest(self.index_dir) if current_hash != stored_hash else None
             
+            if current_hash != stored_hash and manifest is not None:
+                logger.info("Source files changed (hash mismatch). Syncing vectorstore incrementally...")
+                logger.info(f"Stored: {stored_hash}, Current: {current_hash}")
+                self.vectorstore = self._open_vectorstore(self.index_dir)
+                self.sync_index(manifest)
+                self._store_hash(self.index_dir, current_hash)
+                self._activate(self.index_dir, self.vectorstore)
+            elif current_hash != stored_hash:
+                logger.info("Source files changed and no usable manifest. Building a new index version...")
+                logger.info(f"Stored: {stored_hash}, Current: {current_hash}")
+                self._activate(*self._build_index_version())
+            else:
+                logger.info("Loading existing ChromaDB vectorstore...")
+                vectorstore = self._open_vectorstore(self.index_dir)
+                logger.info(f"Loaded vectorstore with {vectorstore._collection.count()} documents")
+                self._activate(self.index_dir, vectorstore)
+        else:
+            logger.info("No existing vectorstore found. Creating new one...")
+            self._activate(*self._build_index_version(resumable=True))
+    
+    @staticmethod
+    def _read_index_pointer() -> Dict[str, Optional[str]]:
+        """Names of the active and previous index versions under INDEX_VERSIONS_DIR."""
+        try:
+            return json.loads(config.INDEX_POINTER_FILE.read_text())
+        except FileNotFoundError:
+            return {}
         except Exception as e:
-            logger.error(f"Error initializing vectorstore: {e}")
+            logger.warning(f"Could not read index pointer: {e}")
+            return {}
+    
+    @staticmethod
+    def _write_index_pointer(active: Path, previous: Optional[Path]):
+        def version(index_dir: Optional[Path]) -> Optional[str]:
+            return index_dir.name if index_dir is not None and index_dir.parent == config.INDEX_VERSIONS_DIR else None
+        
+        tmp_file = config.INDEX_POINTER_FILE.with_suffix(".tmp")
+        tmp_file.write_text(json.dumps({"active": version(active), "previous": version(previous)}))
+        tmp_file.replace(config.INDEX_POINTER_FILE)
+    
+    @classmethod
+    def _resolve_index_dir(cls) -> Path:
+        active = cls._read_index_pointer().get("active")
+        if active and (config.INDEX_VERSIONS_DIR / active).is_dir():
+            return config.INDEX_VERSIONS_DIR / active
+        return config.CHROMA_DB_DIR
+    
+    @staticmethod
+    def _built_since_start(index_dir: Path) -> bool:
+        hash_file = index_dir / ".source_hash"
+        return (
+            index_dir.parent == config.INDEX_VERSIONS_DIR
+            and hash_file.exists()
+            and hash_file.stat().st_mtime >= _PROCESS_STARTED
+        )
+    
+    def _pointer_check_due(self) -> bool:
+        return time.monotonic() - self._pointer_checked_at >= config.INDEX_POINTER_CHECK_SECONDS
+    
+    def _follow_active_index(self):
+        """Switch to the version another process activated (rebuild or rollback in a sibling worker)."""
+        self._pointer_checked_at = time.monotonic()
+        index_dir = self._resolve_index_dir()
+        if index_dir == self.index_dir or not self._has_index(index_dir):
+            return
+        logger.info(f"Active index changed to {index_dir.name} by another process; switching")
+        self._activate(index_dir, self._open_vectorstore(index_dir), publish=False)
+    
+    @staticmethod
+    def _index_chunk_count(index_dir: Path) -> int:
+        """Chunks in the Chroma database of ``index_dir``, read without opening (or creating) a collection."""
+        db_file = index_dir / "chroma.sqlite3"
+        if not db_file.is_file():
+            return 0
+        try:
+            with closing(sqlite3.connect(f"file:{db_file}?mode=ro", uri=True)) as conn:
+                return conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read {db_file}: {e}")
+            return 0
+    
+    @classmethod
+    def _has_index(cls, index_dir: Path) -> bool:
+        """Whether ``index_dir`` holds a real collection: a Chroma database with a manifest or with chunks.
+
+        Stray files (a source hash, HNSW segments without their database) do
+        not count. A database with a manifest but no chunks yet is a build
+        that stopped early, which sync_index resumes.
+        """
+        if not (index_dir / "chroma.sqlite3").is_file():
+            return False
+        return (index_dir / ".manifest.json").exists() or cls._index_chunk_count(index_dir) > 0
+    
+    def _build_index_version(self, resumable: bool = False) -> Tuple[Path, Chroma]:
+        """Build a complete index into a fresh version directory without touching the live one.
+
+        With ``resumable`` (nothing live to protect) the pointer moves to the
+        new version before the build, so an interrupted build is picked up by
+        sync_index on the next start instead of being discarded.
+        """
+        version = time.strftime("%Y%m%dT%H%M%S", time.gmtime()) + f"-{os.urandom(3).hex()}"
+        index_dir = config.INDEX_VERSIONS_DIR / version
+        index_dir.mkdir(parents=True)
+        if resumable:
+            self._write_index_pointer(index_dir, None)
+        try:
+            source_hash = self._calculate_source_hash()
+            vectorstore = self._build_vectorstore_from_documents(index_dir)
+            self._store_hash(index_dir, source_hash)
+        except Exception:
+            if not resumable:
+                import shutil
+                shutil.rmtree(index_dir, ignore_errors=True)
             raise
+        return index_dir, vectorstore
+    
+    def _load_lexical_index(
+        self, index_dir: Path, vectorstore: Chroma, rebuild: bool = False, persist: bool = True
+    ) -> Optional[LexicalIndex]:
+        """The BM25 index stored next to the collection, rebuilt when missing or built from other sources.
+
+        Without ``persist`` (a worker that only serves the index) a rebuilt
+        index is kept in memory and the index directory is left untouched.
+        """
+        if not config.HYBRID_RETRIEVAL_ENABLED:
+            return None
+        index_file = index_dir / ".bm25.npz"
+        source_hash = self._get_content_digest(index_dir)
+        if index_file.exists() and not rebuild:
+            try:
+                lexical = LexicalIndex.load(index_file)
+                if lexical.source_hash == source_hash:
+                    logger.info(f"Loaded lexical index: {len(lexical)} chunks, {len(lexical.terms)} terms")
+                    return lexical
+            except Exception as e:
+                logger.warning(f"Could not load lexical index: {e}")
+        started = time.perf_counter()
+        lexical = LexicalIndex.from_vectorstore(vectorstore, source_hash)
+        if persist:
+            try:
+                lexical.save(index_file)
+            except Exception as e:
+                logger.warning(f"Could not write lexical index: {e}")
+        else:
+            logger.warning(f"Lexical index in {index_dir} is missing or stale; keeping a rebuilt one in memory only")
+        logger.info(
+            f"Built lexical index: {len(lexical)} chunks, {len(lexical.terms)} terms "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+        return lexical
+    
+    def _activate(self, index_dir: Path, vectorstore: Chroma, rebuild_lexical: bool = False, publish: bool = True):
+        """Point queries at ``index_dir``; in-flight queries finish on the chain they started with.
+
+        With ``publish`` (index_build_lock held) the lexical index is saved
+        next to the collection, the version is recorded as active for every
+        process and versions no longer needed are pruned.
+        """
+        lexical = self._load_lexical_index(index_dir, vectorstore, rebuild=rebuild_lexical, persist=publish)
+        index_chunks = vectorstore._collection.count()
+        retriever = self._create_retriever(vectorstore, lexical)
+        qa_chain = self._create_qa_chain(retriever)
+        with self._swap_lock:
+            if index_dir != self.index_dir:
+                previous = self.index_dir
+            else:
+                previous_name = self._read_index_pointer().get("previous")
+                previous = config.INDEX_VERSIONS_DIR / previous_name if previous_name else None
+            if publish:
+                self._write_index_pointer(index_dir, previous)
+            self.index_dir = index_dir
+            self.vectorstore = vectorstore
+            self.retriever = retriever
+            self.qa_chain = qa_chain
+            self.index_chunks = index_chunks
+            self._pointer_checked_at = time.monotonic()
+        if self.answer_cache is not None:
+            self.answer_cache.sync_source_hash(self._get_content_digest(index_dir))
+        if publish:
+            # Sibling workers may still serve the previous version until they notice the pointer
+            self._prune_index_versions(keep={index_dir, previous})
+    
+    @staticmethod
+    def _prune_index_versions(keep: set):
+        """Delete every version directory except the active one and its rollback target."""
+        if not config.INDEX_VERSIONS_DIR.exists():
+            return
+        import shutil
+        for version_dir in config.INDEX_VERSIONS_DIR.iterdir():
+            if version_dir.is_dir() and version_dir not in keep:
+                logger.info(f"Removing old index version {version_dir.name}")
+                shutil.rmtree(version_dir, ignore_errors=True)
     
     def _calculate_source_hash(self) -> str:
         """Calculate hash of all source documents to detect changes."""
@@ -103,7 +1533,7 @@ class MortgageRAG:
             return "empty"
         
         file_hashes = []
-        for ext in ["*.pdf", "*.txt", "*.md", "*.docx"]:
+        for ext in SOURCE_PATTERNS:
             for file_path in sorted(config.RAW_DOCS_DIR.glob(f"**/{ext}")):
                 if file_path.is_file():
                     try:
@@ -120,9 +1550,9 @@ class MortgageRAG:
         combined = "|".join(file_hashes)
         return hashlib.sha256(combined.encode()).hexdigest()[:16]
     
-    def _get_stored_hash(self) -> str:
+    def _get_stored_hash(self, index_dir: Path) -> str:
         """Get the stored hash from last build."""
-        hash_file = config.CHROMA_DB_DIR / ".source_hash"
+        hash_file = index_dir / ".source_hash"
         if hash_file.exists():
             try:
                 return hash_file.read_text().strip()
@@ -130,193 +1560,578 @@ class MortgageRAG:
                 logger.warning(f"Could not read hash file: {e}")
         return ""
     
-    def _store_hash(self, hash_value: str):
+    def _store_hash(self, index_dir: Path, hash_value: str):
         """Store the current source hash."""
-        hash_file = config.CHROMA_DB_DIR / ".source_hash"
+        hash_file = index_dir / ".source_hash"
         try:
             hash_file.write_text(hash_value)
             logger.info(f"Stored source hash: {hash_value}")
         except Exception as e:
             logger.warning(f"Could not write hash file: {e}")
     
+    def _get_content_digest(self, index_dir: Path) -> str:
+        """Digest of what the index holds, from its manifest; the mtime-based source hash for older indexes.
+
+        Keys the lexical index and the answer cache, so a sync that only
+        re-stamps touched files invalidates neither.
+        """
+        digest_file = index_dir / ".content_digest"
+        if digest_file.exists():
+            try:
+                return digest_file.read_text().strip()
+            except Exception as e:
+                logger.warning(f"Could not read content digest: {e}")
+        return self._get_stored_hash(index_dir)
+    
     def _load_email_file(self, file_path: Path) -> List[Document]:
         logger.info(f"Note: Email file detected. Please pre-process with email_processor.py for PII redaction")
         logger.info(f"Skipping direct loading of: {file_path.name}")
         return []
 
-    def _build_vectorstore_from_documents(self):
-        logger.info("Building vectorstore from documents...")
-        
-        if not config.RAW_DOCS_DIR.exists():
-            logger.warning("raw_docs directory doesn't exist. Creating empty vectorstore.")
-            self.vectorstore = Chroma(
-                collection_name=config.COLLECTION_NAME,
-                embedding_function=self.embeddings,
-                persist_directory=str(config.CHROMA_DB_DIR)
-            )
-            return
-        
-        all_documents = []
+    @staticmethod
+    def _gather_source_files(raw_docs_dir: Optional[Path] = None) -> List[Path]:
+        """List indexable files, preferring the scraped 'web' folder but including raw_docs as well.
 
-        # Prefer scraped 'web' folder if present, but include raw_docs as well
-        web_dir = config.RAW_DOCS_DIR / 'web'
-        data_roots = [web_dir, config.RAW_DOCS_DIR] if web_dir.exists() else [config.RAW_DOCS_DIR]
+        The order is stable (sorted per pattern and folder), so the
+        near-duplicate filter keeps the same copy on every build.
+        """
+        raw_docs_dir = raw_docs_dir or config.RAW_DOCS_DIR
+        web_dir = raw_docs_dir / 'web'
+        data_roots = [web_dir, raw_docs_dir] if web_dir.exists() else [raw_docs_dir]
 
         logger.info(f"Loading documents from: {', '.join(str(p) for p in data_roots)}")
 
-        def gather_files(pattern: str):
-            seen = []
-            seen_paths = set()
+        files = []
+        seen_paths = set()
+        for pattern in SOURCE_PATTERNS:
             for root in data_roots:
                 if not root.exists():
                     continue
-                for p in root.glob(f"**/{pattern}"):
-                    if p.resolve() not in seen_paths:
-                        seen.append(p)
+                for p in sorted(root.glob(f"**/{pattern}")):
+                    if p.is_file() and p.resolve() not in seen_paths:
+                        files.append(p)
                         seen_paths.add(p.resolve())
-            return seen
-
-        pdf_files = gather_files("*.pdf")
-        if pdf_files:
-            logger.info(f"Found {len(pdf_files)} PDF files")
-            for pdf_file in pdf_files:
-                try:
-                    loader = PyPDFLoader(str(pdf_file))
-                    docs = loader.load()
-                    for doc in docs:
-                        doc.metadata["type"] = "pdf"
-                    all_documents.extend(docs)
-                    logger.info(f"Loaded PDF: {pdf_file.name}")
-                except Exception as e:
-                    logger.error(f"Error loading {pdf_file}: {e}")
-        
-        txt_files = gather_files("*.txt")
-        if txt_files:
-            logger.info(f"Found {len(txt_files)} text files")
-            for txt_file in txt_files:
-                try:
-                    loader = TextLoader(str(txt_file), encoding="utf-8")
-                    docs = loader.load()
-                    for doc in docs:
-                        doc.metadata["type"] = "text"
-                    all_documents.extend(docs)
-                    logger.info(f"Loaded text file: {txt_file.name}")
-                except Exception as e:
-                    logger.error(f"Error loading {txt_file}: {e}")
-        
-        mbox_files = gather_files("*.mbox")
-        if mbox_files:
-            logger.warning(f"Found {len(mbox_files)} mbox files - Please pre-process with email_processor.py first!")
+
+        mbox_count = sum(1 for _ in raw_docs_dir.glob("**/*.mbox"))
+        if mbox_count:
+            logger.warning(f"Found {mbox_count} mbox files - Please pre-process with email_processor.py first!")
             logger.warning("Mbox files should be converted to .txt with PII redaction before indexing")
-        
-        docx_files = gather_files("*.docx")
-        if docx_files:
-            logger.info(f"Found {len(docx_files)} Word documents")
-            for docx_file in docx_files:
-                try:
-                    loader = Docx2txtLoader(str(docx_file))
-                    docs = loader.load()
-                    for doc in docs:
-                        doc.metadata["type"] = "docx"
-                    all_documents.extend(docs)
-                    logger.info(f"Loaded Word doc: {docx_file.name}")
-                except Exception as e:
-                    logger.error(f"Error loading {docx_file}: {e}")
-        
-        md_files = gather_files("*.md")
-        if md_files:
-            logger.info(f"Found {len(md_files)} markdown files")
-            for md_file in md_files:
-                try:
-                    loader = TextLoader(str(md_file), encoding="utf-8")
-                    docs = loader.load()
-                    for doc in docs:
-                        doc.metadata["type"] = "markdown"
-                    all_documents.extend(docs)
-                    logger.info(f"Loaded markdown: {md_file.name}")
-                except Exception as e:
-                    logger.error(f"Error loading {md_file}: {e}")
-        
-        logger.info(f"Total documents loaded: {len(all_documents)}")
-        
-        if not all_documents:
-            logger.warning("No documents loaded. Creating empty vectorstore.")
-            self.vectorstore = Chroma(
-                collection_name=config.COLLECTION_NAME,
-                embedding_function=self.embeddings,
-                persist_directory=str(config.CHROMA_DB_DIR)
-            )
-            return
-        
-        logger.info("Splitting documents into chunks...")
-        text_splitter = RecursiveCharacterTextSplitter(
+        return files
+
+    @staticmethod
+    def _create_text_splitter() -> "RecursiveCharacterTextSplitter":
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+        return RecursiveCharacterTextSplitter(
             chunk_size=config.CHUNK_SIZE,
             chunk_overlap=config.CHUNK_OVERLAP,
             length_function=len,
             separators=["\n\n", "\n", " ", ""]
         )
-        chunks = text_splitter.split_documents(all_documents)
-        logger.info(f"Created {len(chunks)} chunks from documents")
-        
-        logger.info("Creating embeddings and storing in ChromaDB...")
-        self.vectorstore = Chroma.from_documents(
-            documents=chunks,
-            embedding=self.embeddings,
+
+    @staticmethod
+    def _file_digest(file_path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _manifest_key(file_path: Path) -> str:
+        try:
+            return file_path.resolve().relative_to(config.RAW_DOCS_DIR.resolve()).as_posix()
+        except ValueError:
+            return file_path.resolve().as_posix()
+
+    @staticmethod
+    def _manifest_settings() -> Dict[str, Any]:
+        return {
+            "embedding_model": config.EMBEDDING_MODEL,
+            "chunk_size": config.CHUNK_SIZE,
+            "chunk_overlap": config.CHUNK_OVERLAP,
+            "collection_name": config.COLLECTION_NAME,
+            "dedupe": {
+                "document_distance": config.DEDUPE_DOCUMENT_DISTANCE,
+                "chunk_distance": config.DEDUPE_CHUNK_DISTANCE,
+                # Near-duplicate documents keep their distinct chunks; indexes that dropped them whole are redone
+                "drop_documents": False
+            } if config.DEDUPE_ENABLED else None
+        }
+
+    def _manifest_entry(
+        self, file_path: Path, chunks: List[Document], dedupe: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        stat = file_path.stat()
+        return {
+            "sha256": self._file_digest(file_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "chunk_ids": [chunk.metadata["chunk_id"] for chunk in chunks],
+            **(dedupe or {})
+        }
+
+    def _get_manifest(self, index_dir: Path) -> Optional[Dict[str, Any]]:
+        """Per-file manifest from the last build, or None if missing or built with other settings."""
+        manifest_file = index_dir / ".manifest.json"
+        if not manifest_file.exists():
+            return None
+        try:
+            manifest = json.loads(manifest_file.read_text())
+        except Exception as e:
+            logger.warning(f"Could not read manifest: {e}")
+            return None
+        if manifest.get("settings") != self._manifest_settings():
+            logger.info("Index settings changed since last build; manifest is stale")
+            return None
+        return manifest
+
+    def _store_manifest(self, index_dir: Path, files: Dict[str, Dict[str, Any]]):
+        manifest_file = index_dir / ".manifest.json"
+        try:
+            tmp_file = manifest_file.with_suffix(".tmp")
+            tmp_file.write_text(json.dumps({"settings": self._manifest_settings(), "files": files}))
+            tmp_file.replace(manifest_file)
+            # Chunk IDs hash each chunk's source, position and text, so they change exactly when the index does
+            chunk_ids = "\n".join(f"{key}:{','.join(files[key]['chunk_ids'])}" for key in sorted(files))
+            (index_dir / ".content_digest").write_text(hashlib.sha256(chunk_ids.encode()).hexdigest()[:16])
+            logger.info(f"Stored manifest for {len(files)} files")
+        except Exception as e:
+            logger.warning(f"Could not write manifest: {e}")
+
+    def _iter_file_chunks(self, files: List[Path]) -> Iterator[Tuple[Path, Optional[List[Document]]]]:
+        """Split files into chunks as the loader pipeline hands them over; failed files yield None."""
+        from loaders import iter_loaded_files
+        text_splitter = self._create_text_splitter()
+        for file_path, docs, error in iter_loaded_files(files, config.LOADER_WORKERS):
+            if error is not None:
+                logger.error(f"Error loading {file_path}: {error}")
+                yield file_path, None
+                continue
+            chunks = self._assign_chunk_ids(text_splitter.split_documents(docs))
+            logger.info(f"Loaded {file_path.name}: {len(chunks)} chunks")
+            yield file_path, chunks
+
+    @staticmethod
+    def _create_deduplicator(manifest_files: Dict[str, Dict[str, Any]], skip: set) -> Optional["Deduplicator"]:
+        """Near-duplicate filter primed with the files already indexed, except those in ``skip``."""
+        if not config.DEDUPE_ENABLED:
+            return None
+        from dedupe import Deduplicator
+        deduplicator = Deduplicator(config.DEDUPE_DOCUMENT_DISTANCE, config.DEDUPE_CHUNK_DISTANCE)
+        for key, entry in manifest_files.items():
+            if key not in skip:
+                deduplicator.load(key, entry)
+        return deduplicator
+
+    def _open_vectorstore(self, index_dir: Path) -> Chroma:
+        return Chroma(
             collection_name=config.COLLECTION_NAME,
-            persist_directory=str(config.CHROMA_DB_DIR)
+            embedding_function=self.document_embeddings,
+            persist_directory=str(index_dir)
         )
-        logger.info("Vectorstore created and persisted successfully")
+
+    def _index_files(
+        self,
+        vectorstore: Chroma,
+        index_dir: Path,
+        files: List[Path],
+        manifest_files: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, int]:
+        """Stream files through load -> split -> embed -> upsert in fixed-size batches.
+
+        Only one batch of chunks (plus the loader's bounded in-flight files) is
+        held in memory. After every committed batch the manifest is rewritten
+        with the files whose chunks are all stored, so an interrupted build
+        resumes from there via sync_index. An existing manifest entry for a
+        file is treated as the version being replaced and its chunks are
+        deleted once the new version has loaded.
+        """
+        stats = {"files": 0, "chunks_added": 0, "chunks_removed": 0, "duplicate_documents": 0, "duplicate_chunks": 0}
+        deduplicator = self._create_deduplicator(manifest_files, {self._manifest_key(p) for p in files})
+        batch: List[Document] = []
+        batch_keys: List[str] = []
+        outstanding: Dict[str, int] = {}
+        loaded_entries: Dict[str, Dict[str, Any]] = {}
+        started = time.perf_counter()
+        
+        def commit(key: str):
+            manifest_files[key] = loaded_entries.pop(key)
+            del outstanding[key]
+            stats["files"] += 1
+        
+        def flush():
+            if batch:
+                vectorstore.add_documents(batch, ids=[chunk.metadata["chunk_id"] for chunk in batch])
+                stats["chunks_added"] += len(batch)
+                for key in batch_keys:
+                    outstanding[key] -= 1
+                batch.clear()
+                batch_keys.clear()
+            for key in [k for k, remaining in outstanding.items() if remaining == 0]:
+                commit(key)
+            self._store_manifest(index_dir, manifest_files)
+            elapsed = time.perf_counter() - started
+            logger.info(
+                f"Indexed {stats['chunks_added']} chunks from {stats['files']}/{len(files)} files "
+                f"({stats['chunks_added'] / elapsed if elapsed else 0:.1f} chunks/s)"
+            )
+        
+        for file_path, chunks in self._iter_file_chunks(files):
+            if chunks is None:
+                continue
+            key = self._manifest_key(file_path)
+            previous = manifest_files.get(key)
+            if previous and previous["chunk_ids"]:
+                vectorstore.delete(ids=previous["chunk_ids"])
+                stats["chunks_removed"] += len(previous["chunk_ids"])
+            dedupe = None
+            if deduplicator is not None:
+                kept, dedupe = deduplicator.filter(key, [chunk.page_content for chunk in chunks])
+                chunks = [chunks[i] for i in kept]
+                stats["duplicate_chunks"] += dedupe["dropped_chunks"]
+                stats["duplicate_documents"] += dedupe["duplicate_document"]
+            loaded_entries[key] = self._manifest_entry(file_path, chunks, dedupe)
+            outstanding[key] = len(chunks)
+            if not chunks:
+                commit(key)
+            for chunk in chunks:
+                batch.append(chunk)
+                batch_keys.append(key)
+                if len(batch) >= config.INDEX_BATCH_SIZE:
+                    flush()
+        flush()
+        if stats["duplicate_chunks"]:
+            total = stats["chunks_added"] + stats["duplicate_chunks"]
+            logger.info(
+                f"Dedupe dropped {stats['duplicate_chunks']} of {total} chunks "
+                f"({stats['duplicate_chunks'] / total:.0%}) before embedding, "
+                f"{stats['duplicate_documents']} documents were near-duplicates; only their distinct chunks were kept"
+            )
+        return stats
+
+    def _build_vectorstore_from_documents(self, index_dir: Path) -> Chroma:
+        logger.info(f"Building vectorstore from documents in {index_dir}...")
+        
+        vectorstore = self._open_vectorstore(index_dir)
+        
+        if not config.RAW_DOCS_DIR.exists():
+            logger.warning("raw_docs directory doesn't exist. Creating empty vectorstore.")
+            return vectorstore
+        
+        source_files = self._gather_source_files()
+        logger.info(f"Found {len(source_files)} source files")
+        
+        # An empty manifest up front marks the build as resumable if it gets interrupted
+        manifest_files: Dict[str, Dict[str, Any]] = {}
+        self._store_manifest(index_dir, manifest_files)
+        
+        logger.info(f"Creating embeddings and storing in ChromaDB in batches of {config.INDEX_BATCH_SIZE}...")
+        stats = self._index_files(vectorstore, index_dir, source_files, manifest_files)
+        
+        if not stats["chunks_added"]:
+            logger.warning("No documents loaded. Created empty vectorstore.")
+            return vectorstore
+        logger.info(f"Vectorstore created and persisted successfully: {stats['chunks_added']} chunks from {stats['files']} files")
+        return vectorstore
+
+    def sync_index(self, manifest: Dict[str, Any]) -> Dict[str, int]:
+        """Bring the open vectorstore in line with RAW_DOCS_DIR using the per-file manifest.
+
+        Files whose size and mtime match the manifest are skipped without
+        reading them; files whose content hash matches are only re-stamped.
+        Only removed, added or modified files touch the collection. This is
+        also how an interrupted build picks up where it stopped.
+        """
+        old_files = manifest.get("files", {})
+        new_files = {}
+        stats = {
+            "unchanged": 0, "added": 0, "updated": 0, "removed": 0,
+            "chunks_added": 0, "chunks_removed": 0, "duplicate_chunks": 0
+        }
+        
+        changed = []
+        paths = {}
+        for file_path in self._gather_source_files():
+            key = self._manifest_key(file_path)
+            paths[key] = file_path
+            previous = old_files.get(key)
+            if previous:
+                # Kept until the new version is stored, so a failed load leaves the old chunks in place
+                new_files[key] = previous
+            try:
+                stat = file_path.stat()
+                if previous and previous["size"] == stat.st_size and previous["mtime_ns"] == stat.st_mtime_ns:
+                    stats["unchanged"] += 1
+                    continue
+                if previous and previous["sha256"] == self._file_digest(file_path):
+                    new_files[key] = {**previous, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+                    stats["unchanged"] += 1
+                    continue
+            except Exception as e:
+                logger.error(f"Error reading {file_path}: {e}")
+                continue
+            changed.append(file_path)
+            stats["updated" if previous else "added"] += 1
+        
+        # Files whose dropped duplicates point at a changed or removed file are deduped again,
+        # so content that only survived in the old version of that file comes back
+        affected = {self._manifest_key(p) for p in changed} | (set(old_files) - set(new_files))
+        while True:
+            dependents = [
+                key for key, entry in new_files.items()
+                if key not in affected and key in paths and affected.intersection(entry.get("duplicate_of", ()))
+            ]
+            if not dependents:
+                break
+            affected.update(dependents)
+            changed.extend(paths[key] for key in dependents)
+            stats["unchanged"] -= len(dependents)
+            stats["updated"] += len(dependents)
+        
+        for key, previous in old_files.items():
+            if key in new_files:
+                continue
+            if previous["chunk_ids"]:
+                self.vectorstore.delete(ids=previous["chunk_ids"])
+                stats["chunks_removed"] += len(previous["chunk_ids"])
+            stats["removed"] += 1
+            logger.info(f"Removed {key}: {len(previous['chunk_ids'])} chunks")
+        
+        if changed:
+            logger.info(f"Re-indexing {len(changed)} added or modified files")
+            index_stats = self._index_files(self.vectorstore, self.index_dir, changed, new_files)
+            stats["chunks_added"] += index_stats["chunks_added"]
+            stats["chunks_removed"] += index_stats["chunks_removed"]
+            stats["duplicate_chunks"] += index_stats["duplicate_chunks"]
+        else:
+            self._store_manifest(self.index_dir, new_files)
+        logger.info(f"Index sync complete: {stats}")
+        return stats
     
-    def _create_qa_chain(self):
-        prompt = ChatPromptTemplate.from_template(config.SYSTEM_PROMPT)
+    @staticmethod
+    def _assign_chunk_ids(chunks: List[Document]) -> List[Document]:
+        """Give every chunk a stable ID derived from its source, position and text."""
+        positions: Dict[str, int] = {}
+        for chunk in chunks:
+            source = str(chunk.metadata.get("source", ""))
+            seq = positions.get(source, 0)
+            positions[source] = seq + 1
+            digest = hashlib.sha256(f"{source}|{seq}|{chunk.page_content}".encode()).hexdigest()
+            chunk.metadata["chunk_id"] = digest[:32]
+        return chunks
+
+    def _create_retriever(self, vectorstore: Chroma, lexical: Optional[LexicalIndex]) -> HybridRetriever:
+        return HybridRetriever(
+            vector=VectorRetriever(
+                vectorstore=vectorstore,
+                embeddings=self.query_embeddings,
+                k=config.RETRIEVAL_K
+            ),
+            lexical=lexical,
+            k=config.RERANK_K if config.RERANK_ENABLED else config.RETRIEVAL_K
+        )
+
+    def _create_qa_chain(self, retriever: HybridRetriever):
+        # A SystemMessage instance is passed through untemplated, so the prefix is byte-identical every request
+        prompt = ChatPromptTemplate.from_messages([
+            SystemMessage(content=config.SYSTEM_PROMPT),
+            ("human", config.CONTEXT_PROMPT)
+        ])
         
         def format_docs(docs):
             return "\n\n".join(doc.page_content for doc in docs)
         
-        self.qa_chain = (
+        answer_chain = (
             {
-                "context": self.retriever | format_docs,
-                "question": RunnablePassthrough()
+                "context": lambda x: format_docs(x["docs"]),
+                "question": lambda x: x["question"]
             }
             | prompt
             | self.llm
             | StrOutputParser()
         )
+        
+        budgeter = self.context_budgeter
+        fixed_tokens = budgeter.count(config.SYSTEM_PROMPT) + budgeter.count(
+            config.CONTEXT_PROMPT.replace("{context}", "").replace("{question}", "")
+        )
+        
+        def fit_budget(docs: List[Document], question: str) -> List[Document]:
+            with metrics.stage("prompt_assembly"):
+                packed, usage = budgeter.pack(docs)
+                question_tokens = budgeter.count(question)
+            prompt_tokens = fixed_tokens + usage["context_tokens"] + question_tokens
+            metrics.PROMPT_TOKENS.observe(prompt_tokens)
+            logger.info(
+                f"Prompt tokens: {prompt_tokens} "
+                f"({fixed_tokens} fixed, {question_tokens} question, "
+                f"{usage['context_tokens']}/{budgeter.budget_tokens} context from "
+                f"{usage['context_chunks']}/{usage['retrieved_chunks']} chunks, "
+                f"{usage['trimmed_tokens']} trimmed)"
+            )
+            return packed
+        
+        # The chain is bound to one retriever so an index swap never mixes versions mid-query.
+        def retrieve(inputs: Dict[str, Any]) -> List[Document]:
+            docs = retriever.search(inputs["question"], inputs.get("embedding"))
+            return fit_budget(docs, inputs["question"])
+        
+        async def aretrieve(inputs: Dict[str, Any]) -> List[Document]:
+            docs = await retriever.asearch(inputs["question"], inputs.get("embedding"))
+            # Token counting is CPU-bound, so keep it off the event loop like the rerank
+            return await asyncio.to_thread(fit_budget, docs, inputs["question"])
+        
+        # Retrieve once; the same budgeted docs feed the prompt and the returned sources.
+        # Input is {"question", "embedding"}; a precomputed embedding skips re-embedding.
+        return RunnableParallel(
+            docs=RunnableLambda(retrieve, afunc=aretrieve),
+            question=itemgetter("question")
+        ).assign(answer=answer_chain)
+    
+    def _query_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        source_docs = result["docs"]
+        sources = self._format_sources(source_docs)
+        
+        logger.info(f"Query processed successfully. Retrieved {len(sources)} source chunks.")
+        
+        return {
+            "answer": result["answer"],
+            "sources": sources,
+            "chunk_ids": [doc.metadata.get("chunk_id") for doc in source_docs]
+        }
+    
+    @staticmethod
+    def _error_result() -> Dict[str, Any]:
+        return {
+            "answer": "I apologize, but I encountered an error processing your question. Please try again or contact our mortgage advisors directly.",
+            "sources": [],
+            "chunk_ids": []
+        }
+    
+    @staticmethod
+    def _format_sources(docs: List[Document]) -> List[Dict[str, Any]]:
+        sources = []
+        for doc in docs:
+            source_info = {
+                "content": doc.page_content[:300] + "..." if len(doc.page_content) > 300 else doc.page_content,
+                "metadata": doc.metadata
+            }
+            sources.append(source_info)
+        return sources
+    
+    def _cached_exact(self, question: str) -> Optional[Dict[str, Any]]:
+        # The cache was synced to the index's content digest when it was activated
+        if self.answer_cache is None:
+            return None
+        return self.answer_cache.get_exact(question)
     
     def query(self, question: str) -> Dict[str, Any]:
         try:
             logger.info(f"Processing query: {question[:100]}...")
+            if self._pointer_check_due():
+                self._follow_active_index()
             
-            # Get the answer
-            answer = self.qa_chain.invoke(question)
+            embedding = None
+            if self.answer_cache is not None:
+                cached = self._cached_exact(question)
+                if cached is None and not self.retriever.is_lexical_only(question):
+                    embedding = self.query_embeddings.embed_query(question)
+                    cached = self.answer_cache.get_similar(embedding)
+                if cached is not None:
+                    logger.info("Answer served from cache")
+                    metrics.QUERIES.inc(source="cache")
+                    return cached
             
-            # Get source documents separately
-            source_docs = self.retriever.invoke(question)
+            result = self.qa_chain.invoke({"question": question, "embedding": embedding})
+            result = self._query_result(result)
+            if self.answer_cache is not None:
+                self.answer_cache.put(question, embedding, result)
+            metrics.QUERIES.inc(source="llm")
+            return result
             
-            sources = []
-            for i, doc in enumerate(source_docs, 1):
-                source_info = {
-                    "content": doc.page_content[:300] + "..." if len(doc.page_content) > 300 else doc.page_content,
-                    "metadata": doc.metadata
-                }
-                sources.append(source_info)
+        except Exception as e:
+            logger.error(f"Error processing query: {e}")
+            metrics.QUERIES.inc(source="error")
+            return self._error_result()
+    
+    async def aquery(self, question: str) -> Dict[str, Any]:
+        """Async counterpart of query() that never blocks the event loop."""
+        try:
+            logger.info(f"Processing query: {question[:100]}...")
+            if self._pointer_check_due():
+                await asyncio.to_thread(self._follow_active_index)
             
-            logger.info(f"Query processed successfully. Retrieved {len(sources)} source chunks.")
+            embedding = None
+            if self.answer_cache is not None:
+                cached = self._cached_exact(question)
+                if cached is None and not self.retriever.is_lexical_only(question):
+                    embedding = await self.query_embeddings.aembed_query(question)
+                    cached = self.answer_cache.get_similar(embedding)
+                if cached is not None:
+                    logger.info("Answer served from cache")
+                    metrics.QUERIES.inc(source="cache")
+                    return cached
             
-            return {
-                "answer": answer,
-                "sources": sources
-            }
+            result = await self.qa_chain.ainvoke({"question": question, "embedding": embedding})
+            result = self._query_result(result)
+            if self.answer_cache is not None:
+                self.answer_cache.put(question, embedding, result)
+            metrics.QUERIES.inc(source="llm")
+            return result
             
         except Exception as e:
             logger.error(f"Error processing query: {e}")
-            return {
-                "answer": "I apologize, but I encountered an error processing your question. Please try again or contact our mortgage advisors directly.",
-                "sources": []
-            }
+            metrics.QUERIES.inc(source="error")
+            return self._error_result()
+    
+    async def astream_query(self, question: str) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a query as events: ``sources`` first, then ``token`` deltas, then ``done``."""
+        try:
+            logger.info(f"Processing streaming query: {question[:100]}...")
+            if self._pointer_check_due():
+                await asyncio.to_thread(self._follow_active_index)
+            
+            embedding = None
+            if self.answer_cache is not None:
+                cached = self._cached_exact(question)
+                if cached is None and not self.retriever.is_lexical_only(question):
+                    embedding = await self.query_embeddings.aembed_query(question)
+                    cached = self.answer_cache.get_similar(embedding)
+                if cached is not None:
+                    logger.info("Answer served from cache")
+                    metrics.QUERIES.inc(source="cache")
+                    yield {"event": "sources", "data": {"sources": cached["sources"]}}
+                    yield {"event": "token", "data": {"delta": cached["answer"]}}
+                    yield {"event": "done", "data": {"chunk_ids": cached["chunk_ids"]}}
+                    return
+            
+            source_docs: List[Document] = []
+            answer_parts: List[str] = []
+            async for chunk in self.qa_chain.astream({"question": question, "embedding": embedding}):
+                if "docs" in chunk:
+                    source_docs = chunk["docs"]
+                    yield {"event": "sources", "data": {"sources": self._format_sources(source_docs)}}
+                if chunk.get("answer"):
+                    answer_parts.append(chunk["answer"])
+                    yield {"event": "token", "data": {"delta": chunk["answer"]}}
+            
+            result = self._query_result({"answer": "".join(answer_parts), "docs": source_docs})
+            if self.answer_cache is not None:
+                self.answer_cache.put(question, embedding, result)
+            metrics.QUERIES.inc(source="llm")
+            yield {"event": "done", "data": {"chunk_ids": result["chunk_ids"]}}
+            
+        except Exception as e:
+            logger.error(f"Error processing streaming query: {e}")
+            metrics.QUERIES.inc(source="error")
+            yield {"event": "error", "data": {"answer": self._error_result()["answer"]}}
     
     def add_documents(self, file_paths: List[str]):
+        if config.INDEX_READ_ONLY:
+            # Writes into the version every worker is serving, unlike a blue/green rebuild
+            raise RuntimeError("INDEX_READ_ONLY is set; add documents to raw_docs and rebuild instead")
         try:
+            from langchain_community.document_loaders import TextLoader
             logger.info(f"Adding {len(file_paths)} new documents...")
             
             documents = []
@@ -324,44 +2139,77 @@ class MortgageRAG:
                 loader = TextLoader(file_path, encoding="utf-8")
                 documents.extend(loader.load())
             
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=config.CHUNK_SIZE,
-                chunk_overlap=config.CHUNK_OVERLAP,
-                length_function=len,
-                separators=["\n\n", "\n", " ", ""]
-            )
-            chunks = text_splitter.split_documents(documents)
+            chunks = self._assign_chunk_ids(self._create_text_splitter().split_documents(documents))
             
-            self.vectorstore.add_documents(chunks)
+            self.vectorstore.add_documents(chunks, ids=[chunk.metadata["chunk_id"] for chunk in chunks])
             logger.info(f"Successfully added {len(chunks)} chunks to vectorstore")
+            self._activate(self.index_dir, self.vectorstore, rebuild_lexical=True)
             
         except Exception as e:
             logger.error(f"Error adding documents: {e}")
             raise
     
-    def rebuild_index(self):
-        logger.info("Rebuilding vectorstore from scratch...")
+    def rebuild_index(self) -> Path:
+        """Build a fresh index version and swap it in; the live index keeps serving meanwhile.
         
-        if config.CHROMA_DB_DIR.exists():
-            import shutil
-            shutil.rmtree(config.CHROMA_DB_DIR)
-            config.CHROMA_DB_DIR.mkdir(parents=True, exist_ok=True)
+        Allowed with INDEX_READ_ONLY: the new version is written under the
+        build lock and other workers switch to it through the ACTIVE pointer.
+        """
+        logger.info("Rebuilding vectorstore into a new index version...")
         
-        self._build_vectorstore_from_documents()
+        with index_build_lock():
+            index_dir, vectorstore = self._build_index_version()
+            self._activate(index_dir, vectorstore)
         
-        self.retriever = self.vectorstore.as_retriever(
-            search_kwargs={"k": config.RETRIEVAL_K}
-        )
-        self._create_qa_chain()
+        logger.info(f"Vectorstore rebuilt successfully; now serving {index_dir.name}")
+        return index_dir
+    
+    def rollback_index(self) -> Path:
+        """Swap back to the index version that was live before the last rebuild."""
+        with index_build_lock():
+            previous = self._read_index_pointer().get("previous")
+            if not previous or not (config.INDEX_VERSIONS_DIR / previous).is_dir():
+                raise ValueError("No previous index version to roll back to")
+            index_dir = config.INDEX_VERSIONS_DIR / previous
+            logger.info(f"Rolling back to index version {previous}...")
+            self._activate(index_dir, self._open_vectorstore(index_dir))
+        return index_dir
+    
+    def start_rebuild(self) -> Dict[str, Any]:
+        """Start rebuild_index on a background thread and return its job record.
         
-        logger.info("Vectorstore rebuilt successfully")
+        Only one rebuild runs at a time across all workers; while one is in
+        progress its job is returned instead of starting another. Job records
+        are shared, so any worker can answer ``get_rebuild_job``.
+        """
+        job, started = self.rebuild_jobs.start(self.index_dir.name)
+        if started:
+            job_id = job["job_id"]
+            threading.Thread(target=self._run_rebuild, args=(job_id,), name=f"rebuild-{job_id}", daemon=True).start()
+        return job
+    
+    def _run_rebuild(self, job_id: str):
+        try:
+            index_dir = self.rebuild_index()
+        except Exception as e:
+            logger.error(f"Rebuild job {job_id} failed: {e}")
+            self.rebuild_jobs.finish(job_id, "failed", error=str(e))
+            return
+        self.rebuild_jobs.finish(job_id, "succeeded", version=index_dir.name)
+    
+    def get_rebuild_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.rebuild_jobs.get(job_id)
 
 
 _rag_instance = None
+_rag_instance_lock = threading.Lock()
 
 
 def get_rag_instance() -> MortgageRAG:
+    """The process-wide MortgageRAG, created on first use in each worker process."""
     global _rag_instance
     if _rag_instance is None:
-        _rag_instance = MortgageRAG()
+        with _rag_instance_lock:
+            if _rag_instance is None:
+                _rag_instance = MortgageRAG()
     return _rag_instance
@@ -1,15 +1,21 @@
 import os
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+import asyncio
+import collections
+import hashlib
+import itertools
+import json
 import logging
+import sqlite3
+import httpx
 import requests
-from bs4 import BeautifulSoup
-import html2text
-from urllib.parse import urljoin, urlparse, urldefrag
+from urllib.parse import ParseResult, parse_qsl, urlencode, urljoin, urlparse, urldefrag
 import re
 import time
 
 import config
+from html_extract import extract_page
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,9 +24,7 @@ logger = logging.getLogger(__name__)
 class WebScraper:
     
     def __init__(self):
-        self.html_converter = html2text.HTML2Text()
-        self.html_converter.ignore_links = False
-        self.html_converter.ignore_images = True
+        config.ensure_data_dirs()
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
@@ -32,17 +36,12 @@ class WebScraper:
             response = self.session.get(url, timeout=30)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            for script in soup(["script", "style", "nav", "footer", "header"]):
-                script.decompose()
-            
-            text = self.html_converter.handle(str(soup))
+            text, _ = self._extract(response.content)
             
             if output_filename:
                 output_path = config.RAW_DOCS_DIR / output_filename
                 with open(output_path, 'w', encoding='utf-8') as f:
-                    f.write(f"# Scraped from: {url}\n\n")
+                    f.write(f"{SCRAPED_HEADER}{url}\n\n")
                     f.write(text)
                 logger.info(f"Saved scraped content to {output_path}")
             
@@ -61,85 +60,508 @@ class WebScraper:
             if i < len(urls):
                 time.sleep(delay)
     
+    @staticmethod
+    def _extract(content: bytes) -> Tuple[str, List[str]]:
+        """Markdown text of an HTML page (without scripts and page chrome) and its raw hrefs."""
+        return extract_page(content)
+    
     def scrape_mortgage_site(self, base_url: str, max_pages: int = 10):
-        visited = set()
-        to_visit = [base_url]
-        scraped_count = 0
-        parsed_base = urlparse(base_url)
-        base_domain = parsed_base.netloc
-        base_path = parsed_base.path if parsed_base.path else '/'
-        if not base_path.endswith('/'):
-            base_path = base_path + '/'
+        return self.scrape_sites([base_url], max_pages)
+    
+    def scrape_sites(self, base_urls: List[str], max_pages: int = 10) -> Dict[str, int]:
+        """Crawl every base URL concurrently (up to ``max_pages`` each) into raw_docs/web."""
         web_dir = config.RAW_DOCS_DIR / 'web'
         web_dir.mkdir(parents=True, exist_ok=True)
+        cache = CrawlCache(config.CRAWL_CACHE_PATH)
+        crawler = AsyncCrawler(
+            self._extract,
+            per_host_concurrency=config.SCRAPER_PER_HOST_CONCURRENCY,
+            host_delay=config.SCRAPER_HOST_DELAY_SECONDS,
+            max_connections=config.SCRAPER_MAX_CONNECTIONS,
+            timeout=config.SCRAPER_TIMEOUT_SECONDS,
+            user_agent=self.session.headers['User-Agent'],
+            cache=cache,
+            max_depth=config.SCRAPER_MAX_DEPTH,
+            path_budget=config.SCRAPER_PATH_BUDGET,
+            priority_keywords=config.SCRAPER_PRIORITY_KEYWORDS,
+            resume=config.SCRAPER_RESUME
+        )
+        try:
+            counts = asyncio.run(crawler.crawl(base_urls, web_dir, max_pages))
+        finally:
+            cache.close()
+        logger.info(
+            f"Scraping complete. Crawled {sum(counts.values())} pages from {len(counts)} sites: "
+            f"{crawler.stats['written']} written, {crawler.stats['unchanged']} unchanged, "
+            f"{crawler.stats['not_modified']} not modified (304), {crawler.stats['removed']} stale copies removed."
+        )
+        return counts
+
+
+# Query parameters that only track the visitor; dropped so each page is queued once
+TRACKING_PARAMS = {'fbclid', 'gclid', 'msclkid', 'mc_cid', 'mc_eid', '_ga', '_gl', 'ref', 'source',
+                   'sessionid', 'sid', 'phpsessid', 'jsessionid'}
+# Never HTML; skipped before they are requested
+SKIP_EXTENSIONS = ('.pdf', '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.ico', '.css', '.js', '.json',
+                   '.xml', '.rss', '.atom', '.zip', '.gz', '.mp3', '.mp4', '.mov', '.woff', '.woff2',
+                   '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.csv')
+# Path segments of pages that fan out into many near-empty listings
+LOW_VALUE_SEGMENTS = {'search', 'feed', 'feeds', 'rss', 'tag', 'tags', 'category', 'author', 'archive',
+                      'archives', 'page', 'print', 'share', 'login', 'signin', 'calendar', 'comments', 'wp-json'}
+# First line of every scraped file; names the page it came from
+SCRAPED_HEADER = '# Scraped from: '
+
+
+def normalize_url(u: str) -> str:
+    """Canonical form of a link: no fragment or tracking parameters, sorted query, lowercase host."""
+    u, _ = urldefrag(u)
+    parsed = urlparse(u)
+    scheme = parsed.scheme.lower()
+    netloc = parsed.netloc.lower()
+    if (scheme == 'http' and netloc.endswith(':80')) or (scheme == 'https' and netloc.endswith(':443')):
+        netloc = netloc.rsplit(':', 1)[0]
+    params = [
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith('utm_')
+    ]
+    return parsed._replace(
+        scheme=scheme, netloc=netloc, path=parsed.path or '/', query=urlencode(sorted(params)), fragment=''
+    ).geturl()
+
+
+def safe_filename_from_url(u: str) -> str:
+    """Output filename for a page; the same URL always maps to the same file."""
+    parsed = urlparse(u)
+    path = parsed.path or '/'
+    slug = f"{parsed.netloc}{path}"
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", slug).strip("_")
+    if not slug:
+        slug = "root"
+    slug = slug[:120]
+    # The slug drops the query string and may be truncated, so a short URL hash keeps names unique
+    digest = hashlib.sha1(u.encode()).hexdigest()[:10]
+    return f"scraped_{slug}_{digest}.txt"
+
+
+def scraped_files_by_url(output_dir: Path) -> Dict[str, List[Path]]:
+    """Existing scraped files in ``output_dir``, by the canonical URL in their header line."""
+    files: Dict[str, List[Path]] = {}
+    for path in sorted(output_dir.glob('scraped_*.txt')):
+        try:
+            with open(path, encoding='utf-8') as f:
+                first = f.readline()
+        except (OSError, UnicodeDecodeError):
+            continue
+        if first.startswith(SCRAPED_HEADER):
+            files.setdefault(normalize_url(first[len(SCRAPED_HEADER):].strip()), []).append(path)
+    return files
 
-        def normalize(u: str) -> str:
-            u, _ = urldefrag(u)
-            parsed = urlparse(u)
-            normalized = parsed._replace(fragment='').geturl()
-            return normalized
-
-        def safe_filename_from_url(u: str, idx: int) -> str:
-            parsed = urlparse(u)
-            path = parsed.path or '/'
-            slug = f"{parsed.netloc}{path}"
-            slug = re.sub(r"[^A-Za-z0-9]+", "_", slug).strip("_")
-            if not slug:
-                slug = "root"
-            slug = slug[:120]
-            return f"scraped_{slug}_{idx}.txt"
-        
-        while to_visit and scraped_count < max_pages:
-            url = to_visit.pop(0)
-            url = normalize(url)
 
-            if url in visited:
+def content_hash(text: str) -> str:
+    """Hash of extracted text with whitespace normalized, so reflowed markup does not count as a change."""
+    return hashlib.sha256(" ".join(text.split()).encode()).hexdigest()
+
+
+class CrawlCache:
+    """What the last crawl saw for each URL, in SQLite: validators, content hash, output file and links.
+    
+    The crawler sends the stored ETag / Last-Modified as conditional headers
+    and rewrites a page's output file only when its content hash changes, so
+    unchanged files keep their mtime and do not trigger a re-index. Links are
+    kept so a crawl can continue through pages that answered 304.
+    """
+    
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+    
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path))
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, content_hash TEXT NOT NULL, "
+                "filename TEXT NOT NULL, links TEXT NOT NULL, fetched_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS frontier ("
+                "site TEXT NOT NULL, key TEXT NOT NULL, url TEXT NOT NULL, depth INTEGER NOT NULL, "
+                "score REAL NOT NULL, done INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (site, key))"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+    
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute("SELECT * FROM pages WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        entry = dict(row)
+        entry['links'] = json.loads(entry['links'])
+        return entry
+    
+    def put(self, url: str, etag: Optional[str], last_modified: Optional[str], content_hash: str,
+            filename: str, links: List[str]):
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO pages (url, etag, last_modified, content_hash, filename, links, fetched_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (url, etag, last_modified, content_hash, filename, json.dumps(links), time.time())
+        )
+        conn.commit()
+    
+    def load_frontier(self, site: str) -> List[Dict[str, Any]]:
+        rows = self._connection().execute(
+            "SELECT key, url, depth, score, done FROM frontier WHERE site = ?", (site,)
+        )
+        return [dict(row) for row in rows]
+    
+    def add_frontier(self, site: str, entries: List[Tuple[str, str, int, float]]):
+        """Record queued (key, url, depth, score) entries for ``site``."""
+        conn = self._connection()
+        conn.executemany(
+            "INSERT OR IGNORE INTO frontier (site, key, url, depth, score) VALUES (?, ?, ?, ?, ?)",
+            [(site, *entry) for entry in entries]
+        )
+        conn.commit()
+    
+    def mark_frontier_done(self, site: str, key: str):
+        conn = self._connection()
+        conn.execute("UPDATE frontier SET done = 1 WHERE site = ? AND key = ?", (site, key))
+        conn.commit()
+    
+    def clear_frontier(self, site: str):
+        conn = self._connection()
+        conn.execute("DELETE FROM frontier WHERE site = ?", (site,))
+        conn.commit()
+    
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class CrawlFrontier:
+    """The crawl queue of one site: canonical-URL dedupe, depth and path budgets, priority order.
+    
+    URLs come out best score first, then shallowest, then in discovery
+    order. The score favors paths containing a priority keyword and demotes
+    search, feed, tag and query-string pages. Dedupe is a set lookup and the
+    queue a heap, so a link-heavy page costs O(links * log n). With a
+    ``CrawlCache`` the frontier is saved as it grows, and a crawl that was
+    interrupted resumes from it on the next run. A crawl that drained its
+    queue or stopped at its page limit clears it, so the next run starts over
+    and revalidates every page.
+    """
+    
+    def __init__(
+        self,
+        base_url: str,
+        max_depth: Optional[int] = None,
+        path_budget: Optional[int] = None,
+        priority_keywords: Sequence[str] = (),
+        cache: Optional[CrawlCache] = None
+    ):
+        self.site = base_url
+        self.max_depth = max_depth
+        self.path_budget = path_budget
+        self.priority_keywords = [k.lower() for k in priority_keywords]
+        self.cache = cache
+        self.queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self.seen: Set[str] = set()
+        self._raw_seen: Set[str] = set()
+        self._path_counts: collections.Counter = collections.Counter()
+        self._order = itertools.count()
+        parsed = urlparse(base_url)
+        self._domain = parsed.netloc
+        self._base_path = parsed.path if parsed.path.endswith('/') else parsed.path + '/'
+    
+    @staticmethod
+    def _key(parsed: ParseResult) -> str:
+        # ``/rates`` and ``/rates/`` are the same page
+        if len(parsed.path) > 1 and parsed.path.endswith('/'):
+            parsed = parsed._replace(path=parsed.path.rstrip('/'))
+        return parsed.geturl()
+    
+    @staticmethod
+    def _path_bucket(parsed: ParseResult) -> str:
+        if parsed.query:
+            # Query-string variants of one page (search results, pagination) share its budget
+            return parsed.path
+        return parsed.path.rstrip('/').rsplit('/', 1)[0] or '/'
+    
+    def _in_scope(self, parsed: ParseResult) -> bool:
+        path = parsed.path if parsed.path.endswith('/') else parsed.path + '/'
+        return parsed.netloc == self._domain and path.startswith(self._base_path)
+    
+    def _score(self, parsed: ParseResult) -> float:
+        path = parsed.path.lower()
+        score = 10.0 * sum(1 for keyword in self.priority_keywords if keyword in path)
+        score -= 10.0 * len(LOW_VALUE_SEGMENTS.intersection(path.split('/')))
+        if parsed.query:
+            score -= 5.0
+        return score
+    
+    def start(self, resume: bool = True) -> int:
+        """Queue the saved unfinished frontier, or the base URL; returns pages resumed."""
+        rows = self.cache.load_frontier(self.site) if self.cache else []
+        pending = [row for row in rows if not row['done']]
+        if not (resume and pending):
+            if rows:
+                self.cache.clear_frontier(self.site)
+            self.push([self.site], 0)
+            return 0
+        for row in rows:
+            self.seen.add(row['key'])
+            self._path_counts[self._path_bucket(urlparse(row['url']))] += 1
+        for row in pending:
+            self.queue.put_nowait((-row['score'], row['depth'], next(self._order), row['url']))
+        return len(pending)
+    
+    def push(self, urls: List[str], depth: int) -> int:
+        """Queue the new, in-scope, within-budget URLs among ``urls``; returns how many were queued."""
+        if self.max_depth is not None and depth > self.max_depth:
+            return 0
+        queued = []
+        for raw_url in urls:
+            # Most links on a page were already seen verbatim; skip those before parsing
+            if raw_url in self._raw_seen:
+                continue
+            self._raw_seen.add(raw_url)
+            url = normalize_url(raw_url)
+            parsed = urlparse(url)
+            key = self._key(parsed)
+            if key in self.seen:
+                continue
+            self.seen.add(key)
+            if not self._in_scope(parsed) or parsed.path.lower().endswith(SKIP_EXTENSIONS):
                 continue
+            bucket = self._path_bucket(parsed)
+            if self.path_budget is not None and self._path_counts[bucket] >= self.path_budget:
+                continue
+            self._path_counts[bucket] += 1
+            score = self._score(parsed)
+            self.queue.put_nowait((-score, depth, next(self._order), url))
+            queued.append((key, url, depth, score))
+        if queued and self.cache:
+            self.cache.add_frontier(self.site, queued)
+        return len(queued)
+    
+    def done(self, url: str):
+        """Mark ``url`` as crawled so a resumed run skips it."""
+        if self.cache:
+            self.cache.mark_frontier_done(self.site, self._key(urlparse(url)))
+    
+    def finish(self):
+        """Forget the saved frontier once the crawl ended without being interrupted."""
+        if self.cache:
+            self.cache.clear_frontier(self.site)
+
+
+class HostLimiter:
+    """Per-host politeness: at most ``concurrency`` requests in flight, starts ``delay`` seconds apart."""
+    
+    def __init__(self, concurrency: int, delay: float):
+        self.delay = delay
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        self._next_start = 0.0
+    
+    async def __aenter__(self):
+        await self._semaphore.acquire()
+        loop = asyncio.get_running_loop()
+        # Reserve the next start slot before sleeping so concurrent waiters queue up behind it
+        start = max(loop.time(), self._next_start)
+        self._next_start = start + self.delay
+        if start > loop.time():
+            await asyncio.sleep(start - loop.time())
+    
+    async def __aexit__(self, *exc):
+        self._semaphore.release()
 
-            visited.add(url)
+
+class AsyncCrawler:
+    """Breadth-first crawler for several sites at once over one pooled keep-alive client.
+    
+    Each base URL is crawled within its host and path prefix. Hosts are
+    independent: politeness delay and concurrency apply per host, so adding
+    sites adds throughput instead of queueing behind one global delay. Page
+    parsing runs in worker threads to keep the event loop free for I/O.
+    
+    With a ``CrawlCache``, fetches are conditional and output files are only
+    written when the extracted text changed; ``stats`` counts pages that were
+    ``written``, ``unchanged`` (200 with the same content) or ``not_modified`` (304).
+    Files already in the output directory are matched to their URL by header
+    line: a page keeps its existing file and other copies of it are
+    ``removed``, so renamed outputs never leave stale text indexed.
+    The cache also holds each site's ``CrawlFrontier``, so unfinished crawls resume.
+    """
+    
+    def __init__(
+        self,
+        extract: Callable[[bytes], Tuple[str, List[str]]],
+        per_host_concurrency: int = 2,
+        host_delay: float = 1.0,
+        max_connections: int = 32,
+        timeout: float = 30.0,
+        user_agent: Optional[str] = None,
+        cache: Optional[CrawlCache] = None,
+        max_depth: Optional[int] = None,
+        path_budget: Optional[int] = None,
+        priority_keywords: Sequence[str] = (),
+        resume: bool = True
+    ):
+        self.extract = extract
+        self.per_host_concurrency = max(1, per_host_concurrency)
+        self.host_delay = host_delay
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.cache = cache
+        self.max_depth = max_depth
+        self.path_budget = path_budget
+        self.priority_keywords = priority_keywords
+        self.resume = resume
+        self.stats: collections.Counter = collections.Counter()
+        self._hosts: Dict[str, HostLimiter] = {}
+        self._existing: Dict[str, List[Path]] = {}
+    
+    def _host(self, url: str) -> HostLimiter:
+        netloc = urlparse(url).netloc
+        if netloc not in self._hosts:
+            self._hosts[netloc] = HostLimiter(self.per_host_concurrency, self.host_delay)
+        return self._hosts[netloc]
+    
+    async def crawl(self, base_urls: List[str], output_dir: Path, max_pages: int) -> Dict[str, int]:
+        """Pages crawled per base URL, whether written, unchanged or not modified."""
+        self.stats.clear()
+        self._existing = scraped_files_by_url(output_dir)
+        headers = {'User-Agent': self.user_agent} if self.user_agent else None
+        limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+        async with httpx.AsyncClient(
+            headers=headers, limits=limits, timeout=self.timeout, follow_redirects=True
+        ) as client:
+            counts = await asyncio.gather(*(
+                self._crawl_site(client, normalize_url(base_url), output_dir, max_pages) for base_url in base_urls
+            ))
+        return dict(zip(base_urls, counts))
+    
+    async def _crawl_site(self, client: httpx.AsyncClient, base_url: str, output_dir: Path, max_pages: int) -> int:
+        frontier = CrawlFrontier(
+            base_url, self.max_depth, self.path_budget, self.priority_keywords, cache=self.cache
+        )
+        resumed = frontier.start(self.resume)
+        if resumed:
+            logger.info(f"Resuming crawl of {base_url} with {resumed} queued pages")
+        claimed = 0
+        saved = 0
+        stopped_early = False
+        
+        async def fetch_page(url: str, depth: int) -> bool:
+            cached = self.cache.get(url) if self.cache else None
+            existing = self._existing.pop(url, [])
+            if cached:
+                filename = cached['filename']
+            elif existing:
+                # Keep the name of a file from an earlier crawl (or an older naming scheme) for this page
+                filename = existing[0].name
+            else:
+                filename = safe_filename_from_url(url)
+            output_path = output_dir / filename
             
-            try:
-                response = self.session.get(url, timeout=30)
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                for script in soup(["script", "style", "nav", "footer", "header"]):
-                    script.decompose()
-                
-                text = self.html_converter.handle(str(soup))
-                
-                filename = safe_filename_from_url(url, scraped_count)
-                output_path = web_dir / filename
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    f.write(f"# Scraped from: {url}\n\n")
+            def remove_stale_copies():
+                # Other copies of this page would stay indexed next to it with stale content
+                for path in existing:
+                    if path.name != filename:
+                        path.unlink(missing_ok=True)
+                        self.stats['removed'] += 1
+                        logger.info(f"Removed stale copy of {url}: {path.name}")
+            request_headers = {}
+            # Only revalidate when the output file is still there to keep
+            if cached and output_path.exists():
+                if cached['etag']:
+                    request_headers['If-None-Match'] = cached['etag']
+                if cached['last_modified']:
+                    request_headers['If-Modified-Since'] = cached['last_modified']
+            
+            async with self._host(url):
+                response = await client.get(url, headers=request_headers)
+            if response.status_code == 304:
+                self.stats['not_modified'] += 1
+                logger.info(f"Not modified: {url}")
+                remove_stale_copies()
+                frontier.push(cached['links'], depth + 1)
+                return True
+            response.raise_for_status()
+            if 'html' not in response.headers.get('content-type', 'text/html'):
+                logger.info(f"Skipping non-HTML {url}")
+                return False
+            text, hrefs = await asyncio.to_thread(self.extract, response.content)
+            
+            page_url = str(response.url)
+            links = [normalize_url(urljoin(page_url, href)) for href in hrefs]
+            digest = content_hash(text)
+            if cached and cached['content_hash'] == digest and output_path.exists():
+                self.stats['unchanged'] += 1
+                logger.info(f"Unchanged: {url}")
+            else:
+                # Write then rename so an interrupted crawl never leaves a truncated file behind
+                tmp_path = output_path.with_suffix('.tmp')
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(f"{SCRAPED_HEADER}{url}\n\n")
                     f.write(text)
-                
+                os.replace(tmp_path, output_path)
+                self.stats['written'] += 1
                 logger.info(f"Scraped {url} -> {filename}")
-                scraped_count += 1
-                
-                for link in soup.find_all('a', href=True):
-                    full_url = urljoin(url, link['href'])
-                    full_url = normalize(full_url)
-                    parsed_full = urlparse(full_url)
-                    full_path = parsed_full.path if parsed_full.path else '/'
-                    if not full_path.endswith('/'):
-                        full_path_check = full_path + '/'
+            if self.cache:
+                self.cache.put(
+                    url, response.headers.get('etag'), response.headers.get('last-modified'),
+                    digest, filename, links
+                )
+            remove_stale_copies()
+            
+            frontier.push(links, depth + 1)
+            return True
+        
+        async def worker():
+            nonlocal claimed, saved, stopped_early
+            while True:
+                _, depth, _, url = await frontier.queue.get()
+                try:
+                    if claimed >= max_pages:
+                        stopped_early = True
+                        continue
+                    # Claim a page before fetching so concurrent workers never exceed max_pages
+                    claimed += 1
+                    try:
+                        ok = await fetch_page(url, depth)
+                    except Exception as e:
+                        logger.error(f"Error scraping {url}: {e}")
+                        ok = False
+                    frontier.done(url)
+                    if ok:
+                        saved += 1
                     else:
-                        full_path_check = full_path
-
-                    if (parsed_full.netloc == base_domain and
-                        full_path_check.startswith(base_path) and
-                        full_url not in visited and
-                        full_url not in to_visit):
-                        to_visit.append(full_url)
-                
-                time.sleep(1.0)
-                
-            except Exception as e:
-                logger.error(f"Error scraping {url}: {e}")
+                        claimed -= 1
+                finally:
+                    frontier.queue.task_done()
         
-        logger.info(f"Scraping complete. Scraped {scraped_count} pages.")
+        workers = [asyncio.create_task(worker()) for _ in range(self.per_host_concurrency)]
+        try:
+            await frontier.queue.join()
+        finally:
+            for task in workers:
+                task.cancel()
+        # Only an interrupted crawl never gets here and so keeps its frontier; a
+        # finished one starts over next run, revalidating the pages it scraped
+        frontier.finish()
+        if stopped_early:
+            logger.info(f"Crawled {base_url}: {saved} pages; stopped at max_pages")
+        else:
+            logger.info(f"Crawled {base_url}: {saved} pages")
+        return saved
 
 
 if __name__ == "__main__":
@@ -156,5 +578,4 @@ if __name__ == "__main__":
         "https://www.canada.ca/en/financial-consumer-agency/services/buying-home.html"
     ]
     
-    for url in urls:
-        scraper.scrape_mortgage_site(url, max_pages=15)
+    scraper.scrape_sites(urls, max_pages=15)
@@ -0,0 +1,195 @@
+"""Packaged index snapshots: build an index once, ship it, open it without building.
+
+A snapshot is a gzipped tarball of one index version directory (Chroma
+data, BM25 arrays, manifest and source hash) plus ``snapshot.json``. That
+file records the index settings and the sha256 of every file. A
+``<archive>.sha256`` file next to it, in ``sha256sum`` format, checksums the
+archive itself.
+
+Kept free of the OpenAI/Chroma stack so installing a snapshot needs nothing
+but the standard library.
+"""
+import hashlib
+import json
+import logging
+import shutil
+import tarfile
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+METADATA_FILE = "snapshot.json"
+FORMAT_VERSION = 1
+_CHUNK = 1 << 20
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_CHUNK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _is_remote(source: str) -> bool:
+    return source.startswith(("http://", "https://"))
+
+
+def create_snapshot(index_dir: Path, output: Path, settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Package ``index_dir`` into ``output`` and write ``output.sha256``; returns the metadata."""
+    files = {}
+    for path in sorted(p for p in index_dir.rglob("*") if p.is_file()):
+        rel = path.relative_to(index_dir).as_posix()
+        if path.suffix == ".tmp" or rel == METADATA_FILE:
+            continue
+        files[rel] = {"size": path.stat().st_size, "sha256": file_sha256(path)}
+    hash_file = index_dir / ".source_hash"
+    metadata = {
+        "format": FORMAT_VERSION,
+        "version": index_dir.name,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "source_hash": hash_file.read_text().strip() if hash_file.exists() else "",
+        "settings": settings,
+        "files": files
+    }
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp_output = output.with_name(output.name + ".tmp")
+    with tarfile.open(tmp_output, "w:gz") as tar:
+        for rel in files:
+            tar.add(index_dir / rel, arcname=rel, recursive=False)
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as meta:
+            json.dump(metadata, meta, indent=2)
+        try:
+            tar.add(meta.name, arcname=METADATA_FILE)
+        finally:
+            Path(meta.name).unlink()
+    tmp_output.replace(output)
+
+    checksum = file_sha256(output)
+    output.with_name(output.name + ".sha256").write_text(f"{checksum}  {output.name}\n")
+    logger.info(f"Wrote index snapshot {output} ({len(files)} files, sha256 {checksum[:12]})")
+    return {**metadata, "sha256": checksum}
+
+
+def _expected_checksum(source: str, expected_sha256: Optional[str]) -> Optional[str]:
+    """The pinned checksum, else the one published next to the archive, if any."""
+    if expected_sha256:
+        return expected_sha256.strip().lower()
+    sidecar = source + ".sha256"
+    try:
+        if _is_remote(source):
+            with urllib.request.urlopen(sidecar, timeout=30) as response:
+                text = response.read().decode()
+        else:
+            text = Path(sidecar).read_text()
+    except (OSError, ValueError):
+        return None
+    return text.split()[0].lower() if text.strip() else None
+
+
+def _fetch(source: str, dest_dir: Path) -> Path:
+    """A local path to the archive; remote archives are streamed to ``dest_dir``."""
+    if not _is_remote(source):
+        return Path(source)
+    archive = dest_dir / "snapshot.tar.gz"
+    logger.info(f"Downloading index snapshot from {source}...")
+    with urllib.request.urlopen(source, timeout=60) as response, open(archive, "wb") as f:
+        shutil.copyfileobj(response, f, _CHUNK)
+    return archive
+
+
+def _extract(archive: Path, dest: Path, settings: Dict[str, Any]) -> Dict[str, Any]:
+    with tarfile.open(archive, "r:gz") as tar:
+        meta_file = tar.extractfile(METADATA_FILE)
+        if meta_file is None:
+            raise ValueError(f"{archive} has no {METADATA_FILE}")
+        metadata = json.load(meta_file)
+        if metadata.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format {metadata.get('format')!r}")
+        if metadata.get("settings") != settings:
+            raise ValueError(
+                f"Snapshot was built with {metadata.get('settings')}, but this server uses {settings}"
+            )
+        files = metadata["files"]
+        # Only the regular files the metadata lists, which also rules out absolute paths and ../ escapes
+        members = [m for m in tar.getmembers() if m.name != METADATA_FILE]
+        unexpected = [m.name for m in members if m.name not in files or not m.isfile()]
+        if unexpected or len(members) != len(files):
+            raise ValueError(f"Snapshot contents do not match its metadata: {unexpected[:5]}")
+        for member in members:
+            target = dest / member.name
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with tar.extractfile(member) as src, open(target, "wb") as out:
+                shutil.copyfileobj(src, out, _CHUNK)
+    for rel, info in files.items():
+        if file_sha256(dest / rel) != info["sha256"]:
+            raise ValueError(f"Checksum mismatch for {rel} in snapshot")
+    return metadata
+
+
+def installed_snapshot(index_dir: Path) -> Optional[Dict[str, Any]]:
+    """Metadata of the snapshot ``index_dir`` was installed from, if it was."""
+    try:
+        return json.loads((index_dir / METADATA_FILE).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _find_installed(versions_dir: Path, checksum: str) -> Optional[Path]:
+    for version_dir in versions_dir.iterdir():
+        installed = installed_snapshot(version_dir) if version_dir.is_dir() else None
+        if installed and installed.get("sha256") == checksum:
+            return version_dir
+    return None
+
+
+def install_snapshot(
+    source: str,
+    versions_dir: Path,
+    settings: Dict[str, Any],
+    expected_sha256: Optional[str] = None
+) -> Path:
+    """Verify and unpack the snapshot at ``source`` (path or URL) into ``versions_dir``.
+
+    The archive checksum (pinned or from the ``.sha256`` file) and every
+    file checksum are verified before the version directory appears. A
+    version that is already installed is reused as is.
+    """
+    versions_dir.mkdir(parents=True, exist_ok=True)
+    checksum = _expected_checksum(source, expected_sha256)
+    installed = _find_installed(versions_dir, checksum) if checksum else None
+    if installed is not None:
+        logger.info(f"Index snapshot {checksum[:12]} already installed as {installed.name}")
+        return installed
+    if not checksum:
+        logger.warning(f"No checksum published for {source}; verifying per-file checksums only")
+
+    staging = Path(tempfile.mkdtemp(prefix=".snapshot-", dir=versions_dir))
+    try:
+        archive = _fetch(source, staging)
+        actual = file_sha256(archive)
+        if checksum and actual != checksum:
+            raise ValueError(f"Snapshot checksum mismatch: expected {checksum}, got {actual}")
+        installed = None if checksum else _find_installed(versions_dir, actual)
+        if installed is not None:
+            logger.info(f"Index snapshot {actual[:12]} already installed as {installed.name}")
+            return installed
+        unpacked = staging / "index"
+        unpacked.mkdir()
+        metadata = _extract(archive, unpacked, settings)
+        metadata["sha256"] = actual
+        (unpacked / METADATA_FILE).write_text(json.dumps(metadata, indent=2))
+
+        version_dir = versions_dir / metadata["version"]
+        if version_dir.exists():
+            version_dir = versions_dir / f"{metadata['version']}-{actual[:8]}"
+        unpacked.rename(version_dir)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    logger.info(f"Installed index snapshot {metadata['version']} ({len(metadata['files'])} files) as {version_dir.name}")
+    return version_dir
@@ -601,18 +601,34 @@
     showTypingIndicator();
 
     try {
-      const response = await fetch(`${CONFIG.API_URL}/chat`, {
+      const response = await fetch(`${CONFIG.API_URL}/chat/stream`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ message }),
       });
 
-      if (!response.ok) throw new Error('Network response was not ok');
-
-      const data = await response.json();
+      if (!response.ok || !response.body) throw new Error('Network response was not ok');
+
+      let answer = '';
+      let contentDiv = null;
+
+      await readEventStream(response, (event, data) => {
+        if (event === 'token') {
+          if (!contentDiv) {
+            hideTypingIndicator();
+            contentDiv = addMessage('', 'bot');
+          }
+          answer += data.delta;
+          renderStreamingMessage(contentDiv, answer);
+        } else if (event === 'error') {
+          throw new Error(data.answer);
+        }
+      });
 
-      hideTypingIndicator();
-      addMessage(data.answer, 'bot');
+      if (!contentDiv) {
+        hideTypingIndicator();
+        addMessage(answer, 'bot');
+      }
     } catch (error) {
       console.error('Error:', error);
       hideTypingIndicator();
@@ -623,6 +639,38 @@
     }
   }
 
+  async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const frame = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+
+        let event = 'message';
+        let data = '';
+        frame.split('\n').forEach((line) => {
+          if (line.startsWith('event:')) event = line.slice(6).trim();
+          else if (line.startsWith('data:')) data += line.slice(5).trim();
+        });
+        if (data) onEvent(event, JSON.parse(data));
+      }
+    }
+  }
+
+  function renderStreamingMessage(contentDiv, text) {
+    const messagesContainer = document.getElementById('chat-messages');
+    contentDiv.innerHTML = parseMarkdown(text);
+    messagesContainer.scrollTop = messagesContainer.scrollHeight;
+  }
+
   function parseMarkdown(text) {
     const urlPlaceholders = [];
     let html = text.replace(/\[([^\]]+)\]\(([^)]+)\)/g, (match, linkText, url) => {
@@ -703,6 +751,7 @@
 
     messagesContainer.appendChild(messageDiv);
     messagesContainer.scrollTop = messagesContainer.scrollHeight;
+    return messageDiv.querySelector('.message-content');
   }
 
   function showTypingIndicator() {